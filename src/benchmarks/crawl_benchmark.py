@@ -0,0 +1,147 @@
+"""
+An offline, reproducible benchmark of the crawl engine.
+
+A synthetic Notion-like site (see `synthetic_site.py`) is served on localhost, SoupsMaker crawls it
+headless from its root page, and the benchmark reports:
+1. Throughput (pages per minute) and coverage (pages crawled out of the pages on the site);
+2. Per-page latency percentiles and per-phase percentiles, from the crawl trace;
+3. Peak resident memory of the crawler and its browser processes, sampled while crawling.
+The crawl state, docs and trace of a benchmark run are kept in a temporary directory,
+so the real crawl progress and saved docs are never touched.
+
+Run it with e.g. `python -m src.benchmarks.crawl_benchmark --pages 2000 --cap 8 --output results.json`.
+The results can be written as json, so that CI can compare them against a previous run.
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from src.benchmarks.synthetic_site import SyntheticSite, SyntheticSiteServer
+from src.scraping.crawl_state import CrawlState
+from src.scraping.doc_store import DocStore
+from src.scraping.instrumentation import CrawlTracer, Histogram
+from src.scraping.scrape import SoupsMaker
+from src.utils.memory import process_tree_rss
+
+# How often (in seconds) the resident memory is sampled while crawling
+RSS_SAMPLE_INTERVAL = 0.5
+
+
+class BenchmarkSoupsMaker(SoupsMaker):
+    """A SoupsMaker that crawls from scratch without prompting and keeps its crawl state,
+    docs, trace, logs, link graph and archive in the given working directory.
+    """
+
+    def __init__(self, workdir: Path, **soupsmaker_kwargs: Any) -> None:
+        super().__init__(graph_path=workdir / "link_graph.sqlite3", archive_dir=workdir / "html_archive",
+                         concurrency_log_path=workdir / "concurrency_timeline.csv", **soupsmaker_kwargs)
+        dirs = [workdir / "html", workdir / "text", workdir / "json", workdir / "blocks"]
+        for d in dirs:
+            d.mkdir(parents=True, exist_ok=True)
+        self.doc_store = DocStore(*dirs)
+        self.tracer = CrawlTracer(workdir / "crawl_trace.jsonl")
+        self._tab_log_path = workdir / "tab_lifecycle.csv"
+
+    def _start_by_mode(self) -> None:
+        """Always start fresh, with an in-memory crawl state."""
+        self.crawl_state = CrawlState(":memory:", checkpoint_every=self.checkpoint_every)
+        self.crawl_state.add_pending([self.starting_url])
+        self.links = self._new_visited()
+        self.to_visit = {self.starting_url}
+
+
+async def _sample_peak_rss(peak: list[int]) -> None:
+    """Keep peak[0] at the highest resident memory seen, until cancelled."""
+    while True:
+        peak[0] = max(peak[0], process_tree_rss())
+        await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+
+async def run_benchmark(site: SyntheticSite, cap: int = 8, **soupsmaker_kwargs: Any) -> dict[str, Any]:
+    """Crawl the given synthetic site headless and return the benchmark results.
+    Keyword arguments are passed to SoupsMaker.
+    """
+    with SyntheticSiteServer(site) as server, tempfile.TemporaryDirectory() as tmp:
+        soupsmaker = BenchmarkSoupsMaker(Path(tmp), starting_url=(server.root_url, server.base_url),
+                                         cap=cap, headless=True, **soupsmaker_kwargs)
+        peak = [process_tree_rss()]
+        sampler = asyncio.create_task(_sample_peak_rss(peak))
+        start = time.monotonic()
+        try:
+            await soupsmaker.crawl()
+        finally:
+            sampler.cancel()
+        elapsed = time.monotonic() - start
+
+        records = []
+        if soupsmaker.tracer.trace_path.exists():
+            with open(soupsmaker.tracer.trace_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+
+    latency = Histogram(size=max(1, len(records)))
+    for record in records:
+        latency.add(record["total"])
+    # Failed pages are in soupsmaker.links too
+    pages_crawled = len(soupsmaker.links) - len(soupsmaker.failed_links)
+
+    return {
+        "pages_on_site": site.num_pages,
+        "pages_crawled": pages_crawled,
+        "pages_failed": len(soupsmaker.failed_links),
+        "duplicates_prevented": soupsmaker.duplicates_prevented,
+        "seconds": round(elapsed, 2),
+        "pages_per_minute": round(pages_crawled / elapsed * 60, 1),
+        "latency_seconds": {f"p{p}": round(latency.percentile(p), 3) for p in (50, 95, 99)},
+        "phase_seconds": {
+            phase: {f"p{p}": round(h.percentile(p), 3) for p in (50, 95, 99)}
+            for phase, h in soupsmaker.tracer.histograms.items() if h.samples
+        },
+        "peak_rss_mb": round(peak[0] / 1e6, 1),
+        "requests_served": server.requests_served,
+        "cap": cap,
+    }
+
+
+def print_report(results: dict[str, Any]) -> None:
+    """Print the given benchmark results."""
+    print(f"Crawled {results['pages_crawled']}/{results['pages_on_site']} pages "
+          f"({results['pages_failed']} failed, {results['duplicates_prevented']} duplicates prevented) "
+          f"in {results['seconds']}s with {results['cap']} tabs.")
+    print(f"Throughput: {results['pages_per_minute']} pages/min")
+    latency = results["latency_seconds"]
+    print(f"Page latency p50/p95/p99: {latency['p50']}/{latency['p95']}/{latency['p99']}s")
+    for phase, p in results["phase_seconds"].items():
+        print(f"  {phase}: {p['p50']}/{p['p95']}/{p['p99']}s")
+    print(f"Peak RSS: {results['peak_rss_mb']} MB")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark SoupsMaker against a local synthetic site.")
+    parser.add_argument("--pages", type=int, default=1000, help="number of pages on the site")
+    parser.add_argument("--fanout", type=int, default=5, help="child pages linked from each page")
+    parser.add_argument("--extra-links", type=int, default=3, help="random cross links on each page")
+    parser.add_argument("--blocks", type=int, default=30, help="text blocks on each page")
+    parser.add_argument("--api-delay", type=float, default=0.02,
+                        help="seconds before each loadPageChunk response")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the link graph and text")
+    parser.add_argument("--cap", type=int, default=8, help="number of crawl tabs")
+    parser.add_argument("--parser", default="html.parser", help="html parser backend")
+    parser.add_argument("--output", type=Path, help="write the results to this json file")
+    args = parser.parse_args(argv)
+
+    site = SyntheticSite(num_pages=args.pages, fanout=args.fanout, extra_links=args.extra_links,
+                         blocks_per_page=args.blocks, api_delay=args.api_delay, seed=args.seed)
+    results = asyncio.run(run_benchmark(site, cap=args.cap, parser=args.parser))
+    print_report(results)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""
+A local, Notion-like synthetic site for benchmarking the crawler without network access.
+
+Pages are generated on the fly from their index, so sites of many thousands of pages cost
+no disk space. Like a published Notion site, every page:
+1. Has a `#notion-app` container and a title slug followed by a 32-hex-digit page ID in its url;
+2. Lazy-loads its content blocks in chunks from `/api/v3/loadPageChunk` as it is scrolled;
+3. Links to other pages with slug variants (renamed titles, bare IDs, dashed UUIDs, query strings).
+A fraction of the pages first serve a "proceed anyway" interstitial.
+
+The link graph is a tree with `fanout` children per page (so every page is reachable from
+the root page), plus `extra_links` random cross links per page.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from src.scraping.urls import dashed_uuid, notion_page_id
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<div id="notion-app">
+  <h1>{title}</h1>
+  <div id="blocks"></div>
+</div>
+<script>
+(() => {{
+  const pageId = "{page_id}";
+  const numChunks = {num_chunks};
+  let nextChunk = 0;
+  let loading = false;
+
+  const loadNextChunk = async () => {{
+    if (loading || nextChunk >= numChunks) return;
+    loading = true;
+    const response = await fetch("/api/v3/loadPageChunk", {{
+      method: "POST",
+      headers: {{"Content-Type": "application/json"}},
+      body: JSON.stringify({{pageId: pageId, chunkNumber: nextChunk}}),
+    }});
+    const chunk = await response.json();
+    const container = document.getElementById("blocks");
+    for (const block of chunk.blocks) {{
+      const div = document.createElement("div");
+      div.className = "notion-selectable notion-text-block";
+      div.setAttribute("data-block-id", block.id);
+      div.appendChild(document.createTextNode(block.text + " "));
+      for (const link of block.links) {{
+        const a = document.createElement("a");
+        a.href = link.href;
+        a.textContent = link.title;
+        div.appendChild(a);
+      }}
+      container.appendChild(div);
+    }}
+    nextChunk++;
+    loading = false;
+  }};
+
+  // Like Notion, load the first chunk right away and the others when scrolled to the bottom
+  loadNextChunk();
+  window.addEventListener("scroll", () => {{
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 50) {{
+      loadNextChunk();
+    }}
+  }});
+}})();
+</script>
+</body>
+</html>
+"""
+
+INTERSTITIAL_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Leaving a safe page</title></head>
+<body>
+<p>This page may contain content that has not been reviewed.</p>
+<a href="{path}?proceed=1">proceed anyway</a>
+</body>
+</html>
+"""
+
+WORDS = ("satellite", "orbit", "payload", "thermal", "antenna", "battery", "ground", "station",
+         "mission", "telemetry", "attitude", "control", "structure", "review", "design", "test")
+
+
+class SyntheticSite:
+    """A synthetic Notion-like site, generated deterministically from its parameters.
+
+    Instance Attributes:
+      - num_pages: number of distinct pages.
+      - fanout: number of child pages each page links to in the tree.
+      - extra_links: number of random cross links on each page.
+      - blocks_per_page: number of text blocks on each page.
+      - chunk_size: number of blocks loaded per `loadPageChunk` call.
+      - interstitial_rate: fraction of pages served behind a "proceed anyway" interstitial.
+      - variant_rate: fraction of links that use a slug variant instead of the page's own url.
+      - api_delay: time (in seconds) the server waits before answering a `loadPageChunk` call.
+      - page_ids: the page ID of every page, by index.
+
+    Representation Invariants:
+      - self.num_pages >= 1
+      - 1 <= self.chunk_size
+    """
+    # Private Instance Attributes:
+    #   - _index: page ID -> index of the page.
+    #   - _seed: the seed of the random link graph and text.
+
+    num_pages: int
+    fanout: int
+    extra_links: int
+    blocks_per_page: int
+    chunk_size: int
+    interstitial_rate: float
+    variant_rate: float
+    api_delay: float
+    page_ids: list[str]
+
+    _index: dict[str, int]
+    _seed: int
+
+    def __init__(self, num_pages: int = 1000, fanout: int = 5, extra_links: int = 3,
+                 blocks_per_page: int = 30, chunk_size: int = 10,
+                 interstitial_rate: float = 0.05, variant_rate: float = 0.3,
+                 api_delay: float = 0.02, seed: int = 0) -> None:
+        self.num_pages = num_pages
+        self.fanout = fanout
+        self.extra_links = extra_links
+        self.blocks_per_page = blocks_per_page
+        self.chunk_size = chunk_size
+        self.interstitial_rate = interstitial_rate
+        self.variant_rate = variant_rate
+        self.api_delay = api_delay
+        self.page_ids = [hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).hexdigest()
+                         for i in range(num_pages)]
+
+        self._index = {page_id: i for i, page_id in enumerate(self.page_ids)}
+        self._seed = seed
+
+    def title(self, index: int) -> str:
+        """Return the title of the page with the given index."""
+        rng = random.Random(f"{self._seed}:title:{index}")
+        return " ".join(rng.choice(WORDS).capitalize() for _ in range(3)) + f" {index}"
+
+    def path(self, index: int) -> str:
+        """Return the canonical path (title slug and page ID) of the page with the given index."""
+        return "/" + self.title(index).replace(" ", "-") + "-" + self.page_ids[index]
+
+    def is_interstitial(self, index: int) -> bool:
+        """Return whether the page with the given index is served behind an interstitial.
+        The root page never is.
+        """
+        return index > 0 and random.Random(f"{self._seed}:gate:{index}").random() < self.interstitial_rate
+
+    def children(self, index: int) -> list[int]:
+        """Return the indices of the pages linked from the page with the given index."""
+        first = index * self.fanout + 1
+        linked = list(range(first, min(first + self.fanout, self.num_pages)))
+        rng = random.Random(f"{self._seed}:links:{index}")
+        linked += [rng.randrange(self.num_pages) for _ in range(self.extra_links)]
+        return linked
+
+    def link_href(self, index: int, rng: random.Random) -> str:
+        """Return an href to the page with the given index, which may be a slug variant."""
+        if rng.random() >= self.variant_rate:
+            return self.path(index)
+        page_id = self.page_ids[index]
+        return rng.choice([
+            f"/Old-{self.title(index).replace(' ', '-')}-{page_id}",
+            f"/{page_id}",
+            f"/{dashed_uuid(page_id)}",
+            f"{self.path(index)}?pvs=4",
+            f"{self.path(index)}#heading",
+        ])
+
+    def page_html(self, index: int) -> str:
+        """Return the html of the page with the given index, before any chunk is loaded."""
+        num_chunks = -(-self.blocks_per_page // self.chunk_size)
+        return PAGE_TEMPLATE.format(title=self.title(index), page_id=self.page_ids[index],
+                                    num_chunks=num_chunks)
+
+    def chunk(self, index: int, chunk_number: int) -> dict:
+        """Return the `loadPageChunk` response of the given chunk of the page with the given index.
+        Links are spread evenly over the blocks, so the last ones are only found after scrolling.
+        """
+        rng = random.Random(f"{self._seed}:chunk:{index}:{chunk_number}")
+        children = self.children(index)
+        start = chunk_number * self.chunk_size
+        blocks = []
+        for b in range(start, min(start + self.chunk_size, self.blocks_per_page)):
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+            linked = [child for j, child in enumerate(children)
+                      if j * self.blocks_per_page // len(children) == b]
+            blocks.append({
+                "id": hashlib.blake2b(f"{self.page_ids[index]}:{b}".encode(), digest_size=16).hexdigest(),
+                "text": text,
+                "links": [{"href": self.link_href(i, rng), "title": self.title(i)} for i in linked],
+            })
+        return {"blocks": blocks}
+
+    def index_of(self, path: str) -> Optional[int]:
+        """Return the index of the page at the given path (any slug variant), or None."""
+        page_id = notion_page_id(path)
+        return self._index.get(page_id) if page_id is not None else None
+
+
+class SyntheticSiteServer:
+    """Serves a SyntheticSite over HTTP on localhost from a background thread.
+
+    Instance Attributes:
+      - site: the site being served.
+      - base_url: the base url of the site, e.g. "http://127.0.0.1:8123/".
+      - requests_served: number of requests answered.
+    """
+    # Private Instance Attributes:
+    #   - _server: the HTTP server.
+    #   - _thread: the thread running the server.
+
+    site: SyntheticSite
+    base_url: str
+    requests_served: int
+
+    _server: ThreadingHTTPServer
+    _thread: Optional[threading.Thread]
+
+    def __init__(self, site: SyntheticSite, port: int = 0) -> None:
+        self.site = site
+        self.requests_served = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self))
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+        self._thread = None
+
+    @property
+    def root_url(self) -> str:
+        """The url of the root page of the site."""
+        return self.base_url + self.site.path(0).lstrip("/")
+
+    def start(self) -> None:
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and close the server socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "SyntheticSiteServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def _make_handler(server: SyntheticSiteServer) -> type[BaseHTTPRequestHandler]:
+    """Return a request handler class serving the site of the given server."""
+    site = server.site
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            parsed = urlparse(self.path)
+            index = site.index_of(parsed.path)
+            if index is None:
+                self._send(404, "text/plain", "Not found")
+            elif site.is_interstitial(index) and "proceed" not in parse_qs(parsed.query):
+                self._send(200, "text/html", INTERSTITIAL_TEMPLATE.format(path=parsed.path))
+            else:
+                self._send(200, "text/html", site.page_html(index))
+
+        def do_POST(self) -> None:
+            if urlparse(self.path).path != "/api/v3/loadPageChunk":
+                self._send(404, "text/plain", "Not found")
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            index = site.index_of("/" + str(body.get("pageId", "")))
+            if index is None:
+                self._send(404, "application/json", "{}")
+                return
+            time.sleep(site.api_delay)
+            self._send(200, "application/json", json.dumps(site.chunk(index, int(body.get("chunkNumber", 0)))))
+
+        def _send(self, status: int, content_type: str, content: str) -> None:
+            data = content.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            server.requests_served += 1
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass  # keep the benchmark output readable
+
+    return Handler
@@ -0,0 +1,113 @@
+"""
+A memory benchmark of the crawler's visited set and to-visit set.
+
+For every size (10^5 and 10^6 urls by default), synthetic Notion urls (random title slugs and
+page IDs) are added to:
+1. A set of url strings (how SoupsMaker.links used to be stored);
+2. A VisitedUrls (16-byte page keys in an open-addressing table), with and without a Bloom filter;
+3. A set of (url, base_url) tuples, with a separate base url string per tuple (as read back from
+the crawl state) and with an interned base url.
+The memory allocated by each structure (including the url strings it keeps alive) is measured with
+tracemalloc, together with the time of building it (slowed down by tracemalloc)
+and of looking up as many unseen urls.
+
+Run it with e.g. `python -m src.benchmarks.visited_benchmark --sizes 100000 1000000`.
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Iterator, Optional
+
+from src.scraping.visited import VisitedUrls
+
+BASE_URL = "https://utat-ss.notion.site/"
+WORDS = ["Space", "Systems", "Payload", "Onboard", "Software", "Meeting", "Notes", "Design",
+         "Review", "Thermal", "Power", "Structures", "Mission", "Ops", "Ground", "Station"]
+
+
+def synthetic_urls(n: int, seed: int) -> Iterator[str]:
+    """Yield n Notion-like urls with title slugs of 1 to 6 words and random page IDs."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        slug = "-".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+        yield f"{BASE_URL}{slug}-{rng.getrandbits(128):032x}"
+
+
+def _measure(build: Callable[[], Any]) -> tuple[Any, int, float]:
+    """Return the structure built by build, the bytes it allocated and the seconds it took."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    structure = build()
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, allocated, elapsed
+
+
+def _lookup_seconds(structure: Any, n: int) -> float:
+    """Return the seconds taken to look up n urls that are not in the given visited set."""
+    start = time.perf_counter()
+    for url in synthetic_urls(n, seed=1):
+        _ = url in structure
+    return time.perf_counter() - start
+
+
+def run_benchmark(size: int) -> list[dict[str, Any]]:
+    """Measure every structure at the given number of urls and return one result per structure."""
+    candidates = {
+        "set[str] of urls": lambda: set(synthetic_urls(size, seed=0)),
+        "VisitedUrls": lambda: VisitedUrls(synthetic_urls(size, seed=0)),
+        "VisitedUrls + Bloom filter": lambda: VisitedUrls(synthetic_urls(size, seed=0),
+                                                          bloom_capacity=size),
+    }
+    results = []
+    for name, build in candidates.items():
+        structure, allocated, elapsed = _measure(build)
+        results.append({"structure": name, "urls": size, "mb": round(allocated / 1e6, 1),
+                        "bytes_per_url": round(allocated / size, 1), "build_seconds": round(elapsed, 2),
+                        "lookup_seconds": round(_lookup_seconds(structure, size), 2)})
+        del structure
+
+    to_visit = {
+        "to_visit, base url per tuple": lambda: {(url, "".join(BASE_URL)) for url in synthetic_urls(size, 0)},
+        "to_visit, interned base url": lambda: {(url, sys.intern("".join(BASE_URL)))
+                                                for url in synthetic_urls(size, 0)},
+    }
+    for name, build in to_visit.items():
+        structure, allocated, elapsed = _measure(build)
+        results.append({"structure": name, "urls": size, "mb": round(allocated / 1e6, 1),
+                        "bytes_per_url": round(allocated / size, 1), "build_seconds": round(elapsed, 2),
+                        "lookup_seconds": None})
+        del structure
+    return results
+
+
+def print_report(results: list[dict[str, Any]]) -> None:
+    """Print the given benchmark results as a table."""
+    print(f"{'structure':<32}{'urls':>10}{'MB':>9}{'B/url':>8}{'build s':>9}{'lookup s':>10}")
+    for r in results:
+        lookup = "" if r["lookup_seconds"] is None else r["lookup_seconds"]
+        print(f"{r['structure']:<32}{r['urls']:>10}{r['mb']:>9}{r['bytes_per_url']:>8}"
+              f"{r['build_seconds']:>9}{lookup:>10}")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the memory of the crawler's visited set.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+                        help="numbers of urls to measure")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_benchmark(size))
+    print_report(results)
+
+
+if __name__ == '__main__':
+    main()
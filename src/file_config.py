@@ -11,19 +11,24 @@ SCRAPING_DIR = DATA_DIR / "scraping"
 HTML_DIR = SCRAPING_DIR / "html_docs"
 TEXT_DIR = SCRAPING_DIR / "text_docs"
 JSON_DIR = SCRAPING_DIR / "json_docs"
+BLOCKS_DIR = SCRAPING_DIR / "block_docs"
 PROGRESS_DIR = SCRAPING_DIR / "progress"
+ARCHIVE_DIR = SCRAPING_DIR / "html_archive"
 
 # Context dirs
 CONTEXT_DIR = DATA_DIR / "context"
 
 # DB dir
 DB_DIR = DATA_DIR / "chroma_langchain_db"
+# Chunk IDs stored in the vector store, by page (see src/processing/manifest.py)
+EMBED_MANIFEST_PATH = DATA_DIR / "embed_manifest.json"
 
 # Ensure directories exist
 for d in [
     HTML_DIR,
     TEXT_DIR,
     JSON_DIR,
+    BLOCKS_DIR,
     PROGRESS_DIR,
     CONTEXT_DIR,
     DB_DIR,
@@ -35,6 +40,14 @@ ALL_LINKS_PATH = PROGRESS_DIR / "all_links_visited.csv"
 VISITED_LINKS_PATH = PROGRESS_DIR / "progress_links.csv"
 TO_VISIT_LINKS_PATH = PROGRESS_DIR / "progress_to_visit.csv"
 FAILED_LINKS_PATH = PROGRESS_DIR / "progress_failed_links.csv"
+CRAWL_STATE_PATH = PROGRESS_DIR / "crawl_state.sqlite3"
+LINK_GRAPH_PATH = PROGRESS_DIR / "link_graph.sqlite3"
+CONCURRENCY_LOG_PATH = PROGRESS_DIR / "concurrency_timeline.csv"
+TRACE_PATH = PROGRESS_DIR / "crawl_trace.jsonl"
+TAB_LOG_PATH = PROGRESS_DIR / "tab_lifecycle.csv"
+
+# Persistent browser profile (HTTP cache) shared by crawl runs, see SoupsMaker.user_data_dir
+BROWSER_PROFILE_DIR = DATA_DIR / "browser_profile"
 
 # Context files
 BIG_CONTEXT_PATH = CONTEXT_DIR / "big_context.json"
@@ -1,5 +1,6 @@
 """Contain functions that load json files, split text into chunks (LangChain `Document` objects)
-with source url attached, embed them, and store them into a chroma vector store."""
+with source url attached, embed them, and store them into a chroma vector store,
+either all at once (`embed_and_store`) or incrementally (`sync_vector_store`)."""
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
@@ -7,6 +8,7 @@ from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from uuid import uuid4
 import shutil
+from typing import Iterable, Optional
 
 from dotenv import load_dotenv
 import os
@@ -14,6 +16,9 @@ import time
 import json
 
 from src.file_config import *
+from src.scraping.blocks import group_blocks
+from src.scraping.doc_store import doc_key
+from src.processing.manifest import EmbedManifest, chunk_id
 
 
 def load_json_from_dir(dir_path: str) -> list[dict[str, str]]:
@@ -32,7 +37,9 @@ def load_json_from_dir(dir_path: str) -> list[dict[str, str]]:
 
 def split_content(collection: list[dict[str, str]], chunk_size: int = 512) -> list[Document]:
     """Split given list of mappings into langchain `Document` object. Each object
-    will have metadata attr "source" mapping to the correct url.
+    will have metadata attr "source" mapping to the correct url, "page_id" mapping to
+    the page's identity key (if the mapping has one), and "partial" set to True
+    if the page was saved before it finished loading.
     Chunk size is the number of characters each splitted chunk should contain.
     """
 
@@ -46,12 +53,16 @@ def split_content(collection: list[dict[str, str]], chunk_size: int = 512) -> li
     documents = []
     for mapping in collection:
         text = mapping.get("text")
-        source = mapping.get("source")
+        metadata = {"source": mapping.get("source")}
+        if mapping.get("page_id") is not None:
+            metadata["page_id"] = mapping["page_id"]
+        if mapping.get("partial"):
+            metadata["partial"] = True
         
         documents.extend(
             text_splitter.create_documents(
                 texts=[text], 
-                metadatas=[{"source": source}]
+                metadatas=[metadata]
             )
         )
     
@@ -60,11 +71,47 @@ def split_content(collection: list[dict[str, str]], chunk_size: int = 512) -> li
     return documents
 
 
-def embed_and_store(docs: list[Document], fresh_store: bool = False) -> None:
-    """Given a list of langchain `Document` objects, embed them and store them
-    into a chroma database saved at persist_dir. If fresh_store is set to True,
-    the old persist_dir will be first removed.
+def load_blocks_from_dir(dir_path: str) -> list[list[dict]]:
+    """
+    Given a directory path, load all .jsonl block docs into lists of block mappings, one list per page.
+    """
+    pages = []
+    for filename in os.listdir(dir_path):
+        with open(os.path.join(dir_path, filename), 'r', encoding='utf-8') as f:
+            blocks = [json.loads(line) for line in f if line.strip()]
+        if blocks:
+            pages.append(blocks)
+    return pages
+
+
+def split_blocks(pages: list[list[dict]], chunk_size: int = 512) -> list[Document]:
+    """Split the given pages of blocks into langchain `Document` objects on their structure
+    (see `group_blocks`): chunks never span two sections and carry their section's headings.
+    Each object has metadata "source" and "page_id", "section" (its headings) and "block_id"
+    (the ID of its first block). Chunks still longer than chunk_size are split further by characters.
     """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=20,
+        length_function=len,
+        is_separator_regex=False,
+    )
+
+    documents = []
+    for blocks in pages:
+        page_metadata = {"source": blocks[0]["source"], "page_id": blocks[0]["page_id"]}
+        for text, metadata in group_blocks(blocks, chunk_size=chunk_size):
+            documents.extend(
+                text_splitter.create_documents(
+                    texts=[text],
+                    metadatas=[{**page_metadata, **metadata}]
+                )
+            )
+    return documents
+
+
+def open_vector_store() -> Chroma:
+    """Return the chroma vector store saved at DB_DIR, with the OpenAI embedding function."""
     # Load api key
     load_dotenv()
     key = os.environ.get("OPENAI_API_KEY")
@@ -72,22 +119,31 @@ def embed_and_store(docs: list[Document], fresh_store: bool = False) -> None:
     embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=key)
     print("Embeddings Function Created")
 
+    return Chroma(
+        collection_name="my_collection",
+        embedding_function=embeddings,
+        persist_directory=DB_DIR,
+    )
+
+
+def embed_and_store(docs: list[Document], fresh_store: bool = False) -> None:
+    """Given a list of langchain `Document` objects, embed them and store them
+    into a chroma database saved at persist_dir. If fresh_store is set to True,
+    the old persist_dir will be first removed.
+    """
     # Remove database if mode is fresh
     if fresh_store:
         confirm = input("Are you sure you want to erase previous database? " \
         "Type 'yes' to continue: ")
         if confirm:
             shutil.rmtree(DB_DIR)
+            EmbedManifest().clear()
         else:
             print("Switched to add mode. Adding new docs to database...")
             time.sleep(5)
 
     # Vector store
-    vector_store = Chroma(
-        collection_name="my_collection",
-        embedding_function=embeddings,
-        persist_directory=DB_DIR,
-    )
+    vector_store = open_vector_store()
 
     uuids = [str(uuid4()) for _ in range(len(docs))]
     batch_size = 5461    # max batch size for chromadb to embed and store at once
@@ -102,10 +158,83 @@ def embed_and_store(docs: list[Document], fresh_store: bool = False) -> None:
     
     print("Documents successfully embedded and added to vector store.")
 
+
+def sync_vector_store(docs: list[Document], manifest: Optional[EmbedManifest] = None,
+                      vector_store: Optional[Chroma] = None, prune_missing: bool = True,
+                      page_ids: Iterable[str] = (), batch_size: int = 5461) -> tuple[int, int]:
+    """Incrementally bring the vector store in line with the given langchain `Document` objects
+    (the chunks of some pages, in page order), and return the number of chunks embedded and deleted.
+
+    Every chunk gets a deterministic ID from its page, position and content (see `chunk_id`).
+    Only chunks whose ID is not in the manifest are embedded, and the stored chunks of these pages
+    that are no longer current are deleted. Pages without any chunk left can be given in page_ids.
+    If prune_missing is True, the docs are the whole workspace: the chunks of every page in
+    the manifest that is not among them are deleted too.
+    Chunks stored before a page was in the manifest (e.g. by `embed_and_store`, with random IDs
+    and only a source url) are found by their page (see `EmbedManifest.pop_unmanaged`) and deleted,
+    even if the page has no chunks any more.
+    """
+    if manifest is None:
+        manifest = EmbedManifest()
+    if vector_store is None:
+        vector_store = open_vector_store()
+
+    pages: dict[str, list[Document]] = {page_id: [] for page_id in page_ids}
+    for doc in docs:
+        page_id = doc.metadata.get("page_id") or doc_key(doc.metadata["source"])
+        pages.setdefault(page_id, []).append(doc)
+
+    embedded, deleted = 0, 0
+    batch: dict[str, list[str]] = {}       # page ID -> current chunk IDs of the pages in the batch
+    to_add: list[tuple[str, Document]] = []
+    to_delete: list[str] = []
+
+    def flush() -> None:
+        nonlocal embedded, deleted
+        to_delete.extend(manifest.pop_unmanaged([page_id for page_id in batch if page_id not in manifest.pages],
+                                                vector_store))
+        for i in range(0, len(to_delete), batch_size):
+            vector_store.delete(ids=to_delete[i:i + batch_size])
+        if to_add:
+            vector_store.add_documents(documents=[doc for _, doc in to_add], ids=[i for i, _ in to_add])
+        for page_id, ids in batch.items():
+            if ids:
+                manifest.set_page(page_id, ids)
+            else:
+                manifest.remove_page(page_id)
+        manifest.save()
+        embedded += len(to_add)
+        deleted += len(to_delete)
+        batch.clear()
+        to_add.clear()
+        to_delete.clear()
+
+    for page_id, page_docs in pages.items():
+        ids = [chunk_id(page_id, offset, doc.page_content) for offset, doc in enumerate(page_docs)]
+        new_ids, stale_ids = manifest.diff(page_id, ids)
+        if not new_ids and not stale_ids and ids:
+            continue    # unchanged
+        new = set(new_ids)
+        batch[page_id] = ids
+        to_add.extend((i, doc) for i, doc in zip(ids, page_docs) if i in new)
+        to_delete.extend(stale_ids)
+        if len(to_add) >= batch_size:
+            flush()
+
+    if prune_missing:
+        for page_id in [page_id for page_id in manifest.pages if page_id not in pages]:
+            batch[page_id] = []
+            to_delete.extend(manifest.pages[page_id])
+    flush()
+
+    print(f"Vector store synced: {embedded} chunks embedded, {deleted} chunks deleted, "
+          f"{sum(map(len, manifest.pages.values()))} chunks of {len(manifest.pages)} pages stored.")
+    return embedded, deleted
+
 if __name__ == '__main__':
-    embed_and_store(
+    # Only new or changed chunks are embedded (use embed_and_store(..., fresh_store=True) to rebuild)
+    sync_vector_store(
         split_content(
             load_json_from_dir(JSON_DIR)
-        ),
-        fresh_store=True
+        )
     )
\ No newline at end of file
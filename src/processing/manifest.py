@@ -0,0 +1,105 @@
+"""
+A manifest of the chunks stored in the vector store, for incremental, idempotent embedding.
+
+Every chunk gets a deterministic ID derived from its page, its position in the page and a hash of
+its content (see `chunk_id`), and the manifest records the chunk IDs stored for every page.
+Comparing the IDs of a page's current chunks with the manifest tells which chunks are new or
+changed (to embed) and which are stale (to delete), so re-embedding an unchanged workspace costs
+no embedding calls, and a one-page edit costs one page of them. Storing a chunk again under the same
+ID replaces it, so an interrupted run can simply be run again.
+Chunks stored without the manifest (e.g. by `embed_and_store`, with random IDs and only a source url)
+are found by their page (see `EmbedManifest.pop_unmanaged`), so that they can be replaced too.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+from src.file_config import EMBED_MANIFEST_PATH
+from src.scraping.doc_store import doc_key
+from src.utils.files import atomic_write_text
+
+
+def chunk_id(page_id: str, offset: int, text: str) -> str:
+    """Return the deterministic ID of the chunk at the given offset (its position among the
+    chunks of its page) with the given text.
+
+    >>> chunk_id("660068a07b694305b56c483962e927c5", 3, "Payload")
+    '660068a07b694305b56c483962e927c5-3-a7962e82887115d8'
+    """
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{page_id}-{offset}-{digest}"
+
+
+class EmbedManifest:
+    """The chunk IDs stored in the vector store for every page, saved as a json file.
+
+    Instance Attributes:
+      - path: the json file of the manifest.
+      - pages: page ID -> IDs of the chunks of that page in the vector store.
+    """
+    # Private Instance Attributes:
+    #   - _unmanaged: page ID -> IDs of the chunks of that page in the vector store that are not
+    #   in the manifest, or None until the vector store has been read (see `pop_unmanaged`).
+
+    path: Path
+    pages: dict[str, list[str]]
+
+    _unmanaged: Optional[dict[str, list[str]]]
+
+    def __init__(self, path: str | Path = EMBED_MANIFEST_PATH) -> None:
+        self.path = Path(path)
+        self.pages = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.pages = json.loads(f.read() or "{}")
+        self._unmanaged = None
+
+    def diff(self, page_id: str, ids: list[str]) -> tuple[list[str], list[str]]:
+        """Return the given chunk IDs of a page that are not stored yet,
+        and the stored chunk IDs of the page that are not among the given ones.
+        """
+        stored = set(self.pages.get(page_id, []))
+        current = set(ids)
+        return [i for i in ids if i not in stored], [i for i in self.pages.get(page_id, []) if i not in current]
+
+    def set_page(self, page_id: str, ids: list[str]) -> None:
+        """Record that the given chunk IDs are the chunks of the page stored in the vector store."""
+        self.pages[page_id] = list(ids)
+
+    def remove_page(self, page_id: str) -> None:
+        """Record that the page has no chunks in the vector store."""
+        self.pages.pop(page_id, None)
+
+    def pop_unmanaged(self, page_ids: list[str], vector_store: Any) -> list[str]:
+        """Return the IDs of the chunks of the given pages that are in the vector store but not in
+        the manifest (e.g. stored by `embed_and_store`), and forget them (the caller deletes them).
+        Such chunks are matched to their page by their page_id metadata or, if they only have
+        a source url, by the page of that url (see `doc_key`), so any url variant of a page matches.
+        The metadata of the whole vector store is only read the first time.
+        """
+        if not page_ids:
+            return []
+        if self._unmanaged is None:
+            managed = {i for ids in self.pages.values() for i in ids}
+            stored = vector_store.get(include=["metadatas"])
+            self._unmanaged = {}
+            for i, metadata in zip(stored["ids"], stored["metadatas"]):
+                if i not in managed:
+                    metadata = metadata or {}
+                    page_id = metadata.get("page_id") or doc_key(metadata.get("source") or "")
+                    self._unmanaged.setdefault(page_id, []).append(i)
+        return [i for page_id in page_ids for i in self._unmanaged.pop(page_id, [])]
+
+    def save(self) -> None:
+        """Atomically write the manifest to its json file."""
+        atomic_write_text(self.path, json.dumps(self.pages))
+
+    def clear(self) -> None:
+        """Forget every page, and remove the manifest file (e.g. when the vector store is erased)."""
+        self.pages = {}
+        self._unmanaged = None
+        if self.path.exists():
+            os.remove(self.path)
@@ -0,0 +1,197 @@
+"""Contain a streaming pipeline that embeds pages into the chroma vector store while the crawl
+is still running, instead of reading all json docs back after the crawl has finished.
+
+Every page SoupsMaker saves goes through a bounded queue (so a slow embedding API slows the crawl
+down instead of piling pages up in memory) to a consumer task that splits it into chunks,
+and embeds and upserts the chunks in batches. A batch is flushed when it is large enough,
+or when no new page has arrived for a while, so content becomes searchable shortly after its page
+is crawled. Saving json docs to disk stays optional (`save_json`).
+
+Chunks are stored under deterministic IDs and recorded in the embedding manifest
+(see `sync_vector_store`), so re-crawling a page replaces its chunks, and only its new or changed
+chunks are embedded.
+"""
+
+import asyncio
+import time
+from typing import Any, Optional
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from src.processing.embed_with_source import open_vector_store, split_content, sync_vector_store
+from src.processing.manifest import EmbedManifest
+from src.scraping.doc_store import json_doc
+from src.scraping.parsing import ParsedPage
+from src.scraping.scrape import SoupsMaker
+
+# Sent through the queue to tell the consumer that no more pages will come
+_END = None
+
+
+class StreamIngestor:
+    """Splits, embeds and upserts pages into the vector store as they are crawled.
+
+    Instance Attributes:
+      - chunk_size: number of characters per chunk (see `split_content`).
+      - batch_size: number of chunks embedded and upserted at once.
+      - flush_interval: time (in seconds) without new pages after which a smaller batch is flushed.
+      - pages_ingested: number of pages whose chunks are in the vector store.
+      - chunks_upserted: number of chunks embedded and stored (unchanged chunks are not).
+      - pages_failed: number of pages that could not be split, or whose batch could not be
+      embedded or stored.
+      - first_searchable: seconds from start until the first batch was stored, or None.
+    """
+    # Private Instance Attributes:
+    #   - _vector_store: the vector store, opened on start.
+    #   - _manifest: the chunk IDs stored for every page (see `EmbedManifest`).
+    #   - _queue: the bounded queue of json docs (see `json_doc`) waiting to be ingested.
+    #   - _consumer: the consumer task, while running.
+    #   - _pages: json docs of the pages in the current batch.
+    #   - _chunks: chunks of the current batch.
+    #   - _start: the time the ingestor was started.
+
+    chunk_size: int
+    batch_size: int
+    flush_interval: float
+    pages_ingested: int
+    chunks_upserted: int
+    pages_failed: int
+    first_searchable: Optional[float]
+
+    _vector_store: Optional[Chroma]
+    _manifest: EmbedManifest
+    _queue: asyncio.Queue
+    _consumer: Optional[asyncio.Task]
+    _pages: list[dict[str, Any]]
+    _chunks: list[Document]
+    _start: float
+
+    def __init__(self, chunk_size: int = 512, batch_size: int = 256, flush_interval: float = 5.0,
+                 max_queued_pages: int = 64, vector_store: Optional[Chroma] = None,
+                 manifest: Optional[EmbedManifest] = None) -> None:
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pages_ingested = 0
+        self.chunks_upserted = 0
+        self.pages_failed = 0
+        self.first_searchable = None
+
+        self._vector_store = vector_store
+        self._manifest = EmbedManifest() if manifest is None else manifest
+        self._queue = asyncio.Queue(maxsize=max_queued_pages)
+        self._consumer = None
+        self._pages = []
+        self._chunks = []
+        self._start = time.monotonic()
+
+    def start(self) -> None:
+        """Open the vector store (if not given) and start the consumer task."""
+        if self._vector_store is None:
+            self._vector_store = open_vector_store()
+        self._start = time.monotonic()
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def put(self, parsed: ParsedPage) -> None:
+        """Queue the given page for ingestion, waiting while the queue is full.
+        If the consumer task has stopped, the page is counted as failed instead.
+        """
+        if self._consumer is not None and self._consumer.done():
+            self.pages_failed += 1
+            return
+        await self._queue.put(json_doc(parsed))
+
+    async def close(self) -> None:
+        """Ingest every queued page, then stop the consumer task."""
+        if self._consumer is None:
+            return
+        if not self._consumer.done():
+            await self._queue.put(_END)
+            await asyncio.wait({self._consumer})
+        if self._consumer.cancelled() or self._consumer.exception() is not None:
+            # The consumer died before the end of the stream: the pages still queued are lost
+            self.pages_failed += self._queue.qsize()
+            print("The ingestion consumer stopped early. Error:",
+                  "cancelled" if self._consumer.cancelled() else self._consumer.exception())
+        self._consumer = None
+        print(f"Streamed {self.pages_ingested} pages ({self.chunks_upserted} chunks) into the vector store, "
+              f"{self.pages_failed} pages failed.")
+
+    async def _consume(self) -> None:
+        """Take pages from the queue and flush them in batches until the end of the stream."""
+        while True:
+            try:
+                mapping = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                # No new page for a while: make what has been crawled so far searchable
+                await self._flush()
+                continue
+
+            if mapping is _END:
+                await self._flush()
+                return
+
+            try:
+                chunks = split_content([mapping], chunk_size=self.chunk_size)
+            except Exception as e:
+                self.pages_failed += 1
+                print("An error occurs when splitting a page. Error:", e)
+                continue
+            self._pages.append(mapping)
+            self._chunks.extend(chunks)
+            if len(self._chunks) >= self.batch_size:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        """Embed and upsert the chunks of the current batch (off the event loop)."""
+        if not self._pages:
+            return
+        pages, chunks = self._pages, self._chunks
+        self._pages, self._chunks = [], []
+
+        loop = asyncio.get_running_loop()
+        try:
+            embedded = await loop.run_in_executor(None, self._upsert, pages, chunks)
+        except Exception as e:
+            self.pages_failed += len(pages)
+            print("An error occurs when embedding a batch of pages. Error:", e)
+            return
+
+        self.pages_ingested += len(pages)
+        self.chunks_upserted += embedded
+        if self.first_searchable is None:
+            self.first_searchable = time.monotonic() - self._start
+            print(f"First pages searchable {self.first_searchable:.1f} seconds after the crawl started.")
+        print(f"Upserted {embedded} new or changed chunks of {len(pages)} pages into the vector store.")
+
+    def _upsert(self, pages: list[dict[str, Any]], chunks: list[Document]) -> int:
+        """Replace the chunks of the given pages in the vector store with the given chunks,
+        embedding only new or changed chunks, and return the number of chunks embedded.
+        """
+        embedded, _ = sync_vector_store(chunks, self._manifest, self._vector_store, prune_missing=False,
+                                        page_ids=[mapping["page_id"] for mapping in pages])
+        return embedded
+
+
+async def run_streaming_pipeline(chunk_size: int = 512, batch_size: int = 256,
+                                 **soupsmaker_kwargs: Any) -> None:
+    """Crawl with SoupsMaker and stream every new or changed page into the vector store.
+    Keyword arguments are passed to SoupsMaker (e.g. save_json=False to skip the json docs).
+    Save progress on KeyboardInterrupt.
+    """
+    ingestor = StreamIngestor(chunk_size=chunk_size, batch_size=batch_size)
+    ingestor.start()
+    soupsmaker = SoupsMaker(on_page=ingestor.put, **soupsmaker_kwargs)
+    try:
+        await soupsmaker.main()
+    except asyncio.CancelledError:
+        print("Process of adding links interrupted. ")
+        soupsmaker.save_progress()  # save progress if interrupted
+    finally:
+        await ingestor.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(run_streaming_pipeline(cap=8, resume=False, save_html=False, save_text=False,
+                                       save_json=False))
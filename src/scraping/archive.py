@@ -0,0 +1,311 @@
+"""
+A compressed, append-only archive of raw html snapshots.
+
+Saving every page as a prettified html file (`save_html`) makes the html larger than the original,
+spends CPU on prettifying, and leaves thousands of loose files. Instead, the archive appends
+the raw html of every page as a WARC-style record (url, fetch time, page ID, html) to segment files:
+1. Every record is its own gzip member, so a segment is a valid `.warc.gz` file that standard tools
+can read, and any single record can be decompressed on its own;
+2. A segment is closed and a new one started once it reaches `segment_bytes`;
+3. An SQLite index maps every record to its segment, offset and compressed length, so the latest
+snapshot of a page is read with one seek, without scanning the segments.
+Notion pages repeat the same markup and inline styles over and over, so they compress very well.
+
+Records are written to the segment before they are indexed (and the index is committed in
+batches), so a crash can only leave records that are missing from the index: `rebuild_index`
+recovers them by scanning the segments.
+"""
+
+import gzip
+import sqlite3
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from src.file_config import ARCHIVE_DIR
+from src.scraping.doc_store import json_doc
+from src.scraping.parsing import parse_page
+
+INDEX_NAME = "index.sqlite3"
+SEGMENT_PATTERN = "segment-{:05d}.warc.gz"
+# Headers carrying the Notion page ID (or document key) of a record, and whether it is partial
+PAGE_ID_HEADER = "WARC-Page-ID"
+PARTIAL_HEADER = "WARC-Page-Partial"
+# Bytes read at a time when scanning a segment for its records
+SCAN_CHUNK = 1 << 16
+
+
+@dataclass
+class ArchiveRecord:
+    """One html snapshot read from an HtmlArchive.
+
+    Instance Attributes:
+      - url: the url of the page.
+      - page_id: the page's document key (see `doc_key`).
+      - fetched_at: when the page was fetched (seconds since the epoch).
+      - html: the raw html of the page.
+      - partial: whether the page was captured before it finished loading.
+    """
+    url: str
+    page_id: str
+    fetched_at: float
+    html: str
+    partial: bool = False
+
+
+class HtmlArchive:
+    """Raw html snapshots stored as gzip-compressed WARC records in segment files,
+    with an SQLite index of every record's location.
+
+    Instance Attributes:
+      - archive_dir: the directory of the segments and the index.
+      - segment_bytes: size (in bytes) after which a new segment is started.
+      - commit_every: number of appended records per committed batch of the index.
+      - compress_level: gzip compression level (1 is fastest, 9 is smallest).
+
+    Representation Invariants:
+      - self.segment_bytes > 0
+      - 1 <= self.compress_level <= 9
+    """
+    # Private Instance Attributes:
+    #   - _conn: the index connection, opened on first use.
+    #   - _segment: the open segment file being appended to, or None.
+    #   - _segment_no: the number of the segment being appended to.
+    #   - _uncommitted: number of records appended since the last commit of the index.
+
+    archive_dir: Path
+    segment_bytes: int
+    commit_every: int
+    compress_level: int
+
+    _conn: Optional[sqlite3.Connection]
+    _segment: Optional[Any]
+    _segment_no: int
+    _uncommitted: int
+
+    def __init__(self, archive_dir: str | Path = ARCHIVE_DIR, segment_bytes: int = 64_000_000,
+                 commit_every: int = 20, compress_level: int = 6) -> None:
+        self.archive_dir = Path(archive_dir)
+        self.segment_bytes = segment_bytes
+        self.commit_every = commit_every
+        self.compress_level = compress_level
+
+        self._conn = None
+        self._segment = None
+        self._segment_no = 0
+        self._uncommitted = 0
+
+    def append(self, url: str, html: str, page_id: str, partial: bool = False,
+               fetched_at: Optional[float] = None) -> None:
+        """Append the raw html of the page at url as a new record.
+        Later records of the same page supersede earlier ones.
+        """
+        if fetched_at is None:
+            fetched_at = time.time()
+        member = gzip.compress(_warc_record(url, html, page_id, partial, fetched_at), self.compress_level)
+
+        segment = self._open_segment()
+        offset = segment.tell()
+        segment.write(member)
+        segment.flush()
+
+        self._connect().execute(
+            "INSERT INTO records (page_id, url, fetched_at, segment, offset, length, raw_length) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (page_id, url, fetched_at, self._segment_no, offset, len(member), len(html.encode("utf-8"))),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.flush()
+
+    def get(self, page_id: str) -> Optional[ArchiveRecord]:
+        """Return the latest record of the given page, or None if it is not archived."""
+        row = self._connect().execute(
+            "SELECT segment, offset, length FROM records WHERE page_id = ? ORDER BY seq DESC LIMIT 1",
+            (page_id,),
+        ).fetchone()
+        return self._read(*row) if row is not None else None
+
+    def latest(self) -> Iterator[ArchiveRecord]:
+        """Yield the latest record of every archived page, in segment order
+        (so that every segment is read sequentially).
+        """
+        rows = self._connect().execute(
+            "SELECT segment, offset, length FROM records "
+            "WHERE seq IN (SELECT MAX(seq) FROM records GROUP BY page_id) ORDER BY segment, offset"
+        ).fetchall()
+        for row in rows:
+            yield self._read(*row)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of records and pages, and the raw and compressed sizes (in bytes)."""
+        records, pages, raw, stored = self._connect().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT page_id), COALESCE(SUM(raw_length), 0), "
+            "COALESCE(SUM(length), 0) FROM records"
+        ).fetchone()
+        return {"records": records, "pages": pages, "raw_bytes": raw, "stored_bytes": stored}
+
+    def rebuild_index(self) -> int:
+        """Index every record in the segments that is missing from the index
+        (e.g. after a crash), and return the number of records recovered.
+        """
+        self.flush()
+        conn = self._connect()
+        recovered = 0
+        for path in sorted(self.archive_dir.glob("segment-*.warc.gz")):
+            segment_no = int(path.name[len("segment-"):-len(".warc.gz")])
+            indexed = {offset for (offset,) in conn.execute(
+                "SELECT offset FROM records WHERE segment = ?", (segment_no,))}
+            data = memoryview(path.read_bytes())
+            offset = 0
+            while offset < len(data):
+                # Decompress one gzip member, reading it in chunks to find where it ends
+                decompressor = zlib.decompressobj(wbits=31)
+                parts = []
+                pos = offset
+                try:
+                    while not decompressor.eof and pos < len(data):
+                        parts.append(decompressor.decompress(data[pos:pos + SCAN_CHUNK]))
+                        pos += SCAN_CHUNK
+                except zlib.error:
+                    pass
+                if not decompressor.eof:
+                    print(f"Truncated record at offset {offset} of {path.name}, ignored.")
+                    break
+                length = min(pos, len(data)) - offset - len(decompressor.unused_data)
+                if offset not in indexed:
+                    parsed = _parse_warc_record(b"".join(parts))
+                    conn.execute(
+                        "INSERT INTO records (page_id, url, fetched_at, segment, offset, length, raw_length) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (parsed.page_id, parsed.url, parsed.fetched_at, segment_no, offset, length,
+                         len(parsed.html.encode("utf-8"))),
+                    )
+                    recovered += 1
+                offset += length
+        conn.commit()
+        return recovered
+
+    def flush(self) -> None:
+        """Commit the index, so that every appended record can be found after a crash."""
+        if self._conn is not None:
+            self._conn.commit()
+        self._uncommitted = 0
+
+    def close(self) -> None:
+        """Commit the index and close the open segment and the index."""
+        self.flush()
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the index connection, creating the archive directory and index if needed."""
+        if self._conn is None:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.archive_dir / INDEX_NAME)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    seq INTEGER PRIMARY KEY,
+                    page_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    segment INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    raw_length INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS records_page_id ON records (page_id)")
+            self._conn.commit()
+        return self._conn
+
+    def _open_segment(self) -> Any:
+        """Return the segment to append to, starting a new one if the current one is full."""
+        if self._segment is not None and self._segment.tell() < self.segment_bytes:
+            return self._segment
+        if self._segment is not None:
+            self._segment.close()
+            self._segment_no += 1
+        else:
+            # Continue after the last segment of a previous run
+            self._connect()
+            existing = sorted(self.archive_dir.glob("segment-*.warc.gz"))
+            if existing:
+                self._segment_no = int(existing[-1].name[len("segment-"):-len(".warc.gz")])
+                if existing[-1].stat().st_size >= self.segment_bytes:
+                    self._segment_no += 1
+        self._segment = open(self.archive_dir / SEGMENT_PATTERN.format(self._segment_no), "ab")
+        return self._segment
+
+    def _read(self, segment: int, offset: int, length: int) -> ArchiveRecord:
+        """Read and decompress the record at the given location."""
+        if self._segment is not None:
+            self._segment.flush()
+        with open(self.archive_dir / SEGMENT_PATTERN.format(segment), "rb") as f:
+            f.seek(offset)
+            member = f.read(length)
+        return _parse_warc_record(gzip.decompress(member))
+
+
+def _warc_record(url: str, html: str, page_id: str, partial: bool, fetched_at: float) -> bytes:
+    """Return the given page as an (uncompressed) WARC resource record."""
+    body = html.encode("utf-8")
+    date = datetime.fromtimestamp(fetched_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    headers = [
+        "WARC/1.1",
+        "WARC-Type: resource",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {date}",
+        f"WARC-Target-URI: {url}",
+        f"{PAGE_ID_HEADER}: {page_id}",
+        f"{PARTIAL_HEADER}: {'true' if partial else 'false'}",
+        "Content-Type: text/html; charset=utf-8",
+        f"Content-Length: {len(body)}",
+    ]
+    return "\r\n".join(headers).encode("utf-8") + b"\r\n\r\n" + body + b"\r\n\r\n"
+
+
+def _parse_warc_record(record: bytes) -> ArchiveRecord:
+    """Return the page stored in the given (uncompressed) WARC record."""
+    head, _, rest = record.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.decode("utf-8").split("\r\n")[1:]:
+        name, _, value = line.partition(": ")
+        headers[name] = value
+    body = rest[:int(headers["Content-Length"])]
+    fetched_at = datetime.strptime(headers["WARC-Date"], "%Y-%m-%dT%H:%M:%S.%fZ") \
+        .replace(tzinfo=timezone.utc).timestamp()
+    return ArchiveRecord(url=headers["WARC-Target-URI"], page_id=headers[PAGE_ID_HEADER],
+                         fetched_at=fetched_at, html=body.decode("utf-8"),
+                         partial=headers.get(PARTIAL_HEADER) == "true")
+
+
+def archive_json_docs(archive_dir: str | Path = ARCHIVE_DIR,
+                      parser: str = "html.parser") -> list[dict[str, Any]]:
+    """Return json documents (see `json_doc`) of the latest snapshot of every page archived in
+    archive_dir or its subdirectories (e.g. the archives of sharded crawls), re-extracting their text
+    with the given parser backend, so that they can be chunked and embedded again.
+    """
+    latest = {}
+    for index in sorted(Path(archive_dir).rglob(INDEX_NAME)):
+        archive = HtmlArchive(index.parent)
+        for record in archive.latest():
+            if record.page_id not in latest or latest[record.page_id].fetched_at < record.fetched_at:
+                latest[record.page_id] = record
+        archive.close()
+
+    docs = []
+    for record in latest.values():
+        parsed = parse_page(record.html, record.url, record.url, parser)
+        parsed.partial = record.partial
+        docs.append(json_doc(parsed))
+    return docs
@@ -0,0 +1,168 @@
+"""
+Structured, block-level extraction of Notion pages.
+
+Flattening a page to its text loses its headings, lists, tables and toggles before it is chunked.
+Instead, every rendered Notion block (an element with a `data-block-id`) becomes a typed Block
+with its own text (excluding the text of nested blocks), in document order. The type comes from
+the block's `notion-<type>-block` class: headings keep their level (1 to 3), list items, table rows
+(cells separated by " | "), callouts, code, quotes and toggles are told apart, and the nesting depth
+of every block is kept. Text outside of any block (page title, breadcrumbs, non-Notion pages)
+comes first, as a title block.
+
+`group_blocks` then chunks the blocks of a page on their structure: a chunk never spans two
+sections, and every chunk carries the headings of its section.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Optional
+
+TITLE = "title"
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+LIST_ITEM = "list_item"
+TABLE_ROW = "table_row"
+CALLOUT = "callout"
+CODE = "code"
+QUOTE = "quote"
+TOGGLE = "toggle"
+
+# Notion block type (from the `notion-<type>-block` class) -> (block type, heading level)
+NOTION_TYPES = {
+    "header": (HEADING, 1),
+    "sub_header": (HEADING, 2),
+    "sub_sub_header": (HEADING, 3),
+    "text": (PARAGRAPH, 0),
+    "bulleted_list": (LIST_ITEM, 0),
+    "numbered_list": (LIST_ITEM, 0),
+    "to_do": (LIST_ITEM, 0),
+    "table_row": (TABLE_ROW, 0),
+    "callout": (CALLOUT, 0),
+    "code": (CODE, 0),
+    "quote": (QUOTE, 0),
+    "toggle": (TOGGLE, 0),
+    "title": (TITLE, 0),
+}
+
+NOTION_CLASS = re.compile(r"^notion-([a-z_]+)-block$")
+SKIPPED_TAGS = {"script", "style", "template", "noscript"}
+
+
+@dataclass
+class Block:
+    """One Notion block of a page.
+
+    Instance Attributes:
+      - block_id: the Notion block ID, or None for the text outside of any block.
+      - type: one of the block types above, or the Notion type (e.g. "divider", "image", "page")
+      of other blocks, or "block" if it is unknown.
+      - text: the block's own text, without the text of its nested blocks.
+      - level: the heading level (1 to 3) of a heading, otherwise 0.
+      - depth: the number of blocks the block is nested in.
+    """
+    block_id: Optional[str]
+    type: str
+    text: str
+    level: int = 0
+    depth: int = 0
+
+
+def make_block(block_id: Optional[str], notion_type: str, text: str, depth: int = 0) -> Block:
+    """Return the block with the given Notion type (e.g. "sub_header"), classified.
+
+    >>> make_block("b1", "sub_header", "Goals")
+    Block(block_id='b1', type='heading', text='Goals', level=2, depth=0)
+    >>> make_block("b2", "divider", "").type, make_block("b3", "", "x").type
+    ('divider', 'block')
+    """
+    block_type, level = NOTION_TYPES.get(notion_type, (notion_type or "block", 0))
+    return Block(block_id, block_type, text, level, depth)
+
+
+def notion_type_of(tag_name: str, classes: list[str]) -> str:
+    """Return the Notion type of an element with the given tag and classes, or "" if unknown."""
+    if tag_name.lower() == "tr":
+        return "table_row"
+    for name in classes:
+        match = NOTION_CLASS.match(name)
+        if match:
+            return match.group(1)
+    return ""
+
+
+def soup_blocks(soup: Any) -> list[Block]:
+    """Return the blocks of the given BeautifulSoup document, in document order."""
+    from bs4 import NavigableString
+
+    elements = soup.find_all(attrs={"data-block-id": True})
+    own_text = {id(element): [] for element in elements}
+    outside = []
+    for string in soup.find_all(string=True):
+        # Plain text only: not comments, doctypes, or script and style contents
+        if type(string) is not NavigableString or string.parent.name in SKIPPED_TAGS:
+            continue
+        text = string.strip()
+        if not text:
+            continue
+        parent = string.find_parent(attrs={"data-block-id": True})
+        (own_text[id(parent)] if parent is not None else outside).append(text)
+
+    blocks = [make_block(None, "title", "\n".join(outside))] if outside else []
+    for element in elements:
+        if element.name == "tr":
+            text = " | ".join(cell.get_text(" ", strip=True) for cell in element.find_all(["td", "th"]))
+        else:
+            text = "\n".join(own_text[id(element)])
+        if text.strip(" |"):
+            depth = len(element.find_parents(attrs={"data-block-id": True}))
+            blocks.append(make_block(element["data-block-id"],
+                                     notion_type_of(element.name, element.get("class", [])), text, depth))
+    return blocks
+
+
+def group_blocks(blocks: list[dict[str, Any]], chunk_size: int = 512) -> list[tuple[str, dict[str, Any]]]:
+    """Group the given blocks of a page (as saved in its JSONL doc) into chunks of at most
+    about chunk_size characters, cutting at every heading, and return (text, metadata) pairs.
+    A chunk's metadata holds its section (its headings, e.g. "Payload > Thermal") and the ID of
+    its first block, and its text starts with its section (instead of its heading, if it starts
+    with one), so that every chunk keeps its context. A single block longer than chunk_size
+    becomes a chunk of its own.
+
+    >>> blocks = [{"type": "heading", "level": 1, "text": "Payload", "block_id": "h"},
+    ...           {"type": "paragraph", "level": 0, "text": "Camera specs.", "block_id": "p1"},
+    ...           {"type": "paragraph", "level": 0, "text": "Lens specs.", "block_id": "p2"}]
+    >>> [text for text, _ in group_blocks(blocks, chunk_size=25)]
+    ['Payload\\nCamera specs.', 'Payload\\nLens specs.']
+    """
+    chunks = []
+    headings: list[tuple[int, str]] = []
+    current: list[dict[str, Any]] = []
+
+    def section() -> str:
+        return " > ".join(text for _, text in headings)
+
+    def body() -> list[str]:
+        return [block["text"] for i, block in enumerate(current) if i > 0 or block["type"] != HEADING]
+
+    def flush() -> None:
+        if not current:
+            return
+        texts = ([section()] if headings else []) + body()
+        metadata = {"section": section()}
+        if current[0].get("block_id") is not None:
+            metadata["block_id"] = current[0]["block_id"]
+        chunks.append(("\n".join(texts), metadata))
+        current.clear()
+
+    for block in blocks:
+        if block["type"] == HEADING:
+            flush()
+            headings = [(level, text) for level, text in headings if level < block["level"]]
+            headings.append((block["level"], block["text"].replace("\n", " ")))
+        elif current:
+            size = len(section()) + sum(len(text) + 1 for text in body()) + 1 + len(block["text"])
+            if size > chunk_size:
+                flush()
+        current.append(block)
+    flush()
+    return chunks
@@ -0,0 +1,95 @@
+"""
+HTTP cache statistics of a crawl, collected from the Chrome DevTools Protocol (Chromium only).
+
+With a persistent browser profile (see `SoupsMaker.user_data_dir`), Notion's JS bundles, CSS and
+other static assets are served from the browser's disk cache on later runs instead of being
+downloaded again. For every finished request, the Network domain tells whether it was served
+from the (memory or disk) cache and how many bytes went over the network, which gives the cache
+hit ratio and an estimate of the bytes not downloaded (the decoded size of cached responses).
+"""
+
+from playwright.async_api import Page
+
+
+class CacheStats:
+    """Counts cache hits and bytes of the requests made by the pages it is attached to.
+
+    Instance Attributes:
+      - requests: number of finished requests.
+      - cache_hits: number of finished requests served from the memory or disk cache.
+      - bytes_downloaded: bytes received over the network.
+      - bytes_from_cache: decoded bytes of the responses served from the cache,
+      i.e. (about) the bytes not downloaded.
+    """
+    # Private Instance Attributes:
+    #   - _cached: ids of in-flight requests that are served from the cache.
+    #   - _received: request id -> decoded bytes received so far, for in-flight requests.
+
+    requests: int
+    cache_hits: int
+    bytes_downloaded: int
+    bytes_from_cache: int
+
+    _cached: set[str]
+    _received: dict[str, int]
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cache_hits = 0
+        self.bytes_downloaded = 0
+        self.bytes_from_cache = 0
+
+        self._cached = set()
+        self._received = {}
+
+    async def attach(self, page: Page) -> None:
+        """Start counting the requests of the given page."""
+        session = await page.context.new_cdp_session(page)
+        session.on("Network.requestServedFromCache", self._on_served_from_cache)
+        session.on("Network.responseReceived", self._on_response)
+        session.on("Network.dataReceived", self._on_data)
+        session.on("Network.loadingFinished", self._on_finished)
+        session.on("Network.loadingFailed", self._on_failed)
+        await session.send("Network.enable")
+
+    @property
+    def hit_ratio(self) -> float:
+        """The fraction of finished requests served from the cache."""
+        return self.cache_hits / self.requests if self.requests else 0.0
+
+    def summary(self) -> str:
+        """Return a one-line summary of the cache statistics."""
+        return (f"HTTP cache: {self.cache_hits}/{self.requests} requests served from cache "
+                f"({self.hit_ratio:.0%}), about {self.bytes_from_cache / 1e6:.1f} MB not downloaded, "
+                f"{self.bytes_downloaded / 1e6:.1f} MB downloaded.")
+
+    def _on_served_from_cache(self, params: dict) -> None:
+        """Mark the request as served from the memory cache."""
+        self._cached.add(params["requestId"])
+
+    def _on_response(self, params: dict) -> None:
+        """Mark the request as served from the cache if its response came from the disk or prefetch cache."""
+        response = params["response"]
+        if response.get("fromDiskCache") or response.get("fromPrefetchCache"):
+            self._cached.add(params["requestId"])
+
+    def _on_data(self, params: dict) -> None:
+        """Add the decoded bytes of a chunk of the response to the bytes received for its request."""
+        request_id = params["requestId"]
+        self._received[request_id] = self._received.get(request_id, 0) + params.get("dataLength", 0)
+
+    def _on_finished(self, params: dict) -> None:
+        """Count the finished request, its bytes downloaded, and whether it was a cache hit."""
+        request_id = params["requestId"]
+        received = self._received.pop(request_id, 0)
+        self.requests += 1
+        self.bytes_downloaded += int(params.get("encodedDataLength", 0))
+        if request_id in self._cached:
+            self._cached.discard(request_id)
+            self.cache_hits += 1
+            self.bytes_from_cache += received
+
+    def _on_failed(self, params: dict) -> None:
+        """Forget the failed request, which is not counted."""
+        self._cached.discard(params["requestId"])
+        self._received.pop(params["requestId"], None)
@@ -0,0 +1,173 @@
+"""
+An AIMD (additive increase, multiplicative decrease) controller for the number of active crawl tabs.
+
+After every window of finished pages, the controller looks at:
+1. Page-load latency (median of the window, compared with the best median seen so far);
+2. The error rate (pages that ended up in failed_links);
+3. HTTP 429 (throttled) and 5xx responses from the crawled site (other hosts, e.g. analytics, are ignored);
+4. The resident memory of the crawler and its browser processes.
+If any of these signals congestion, the limit is cut multiplicatively; otherwise it grows by one tab.
+"""
+
+import asyncio
+import csv
+import statistics
+import time
+from typing import Optional
+from pathlib import Path
+from urllib.parse import urlparse
+
+from src.file_config import CONCURRENCY_LOG_PATH
+from src.utils.memory import process_tree_rss
+
+
+class AimdController:
+    """Controls how many crawl tabs may be active at a time, within [min_tabs, max_tabs].
+
+    Instance Attributes:
+      - min_tabs: lower bound of the limit.
+      - max_tabs: upper bound of the limit.
+      - limit: the current maximum number of active tabs.
+      - window: number of finished pages per adjustment.
+      - decrease_factor: factor the limit is multiplied by on congestion.
+      - latency_factor: congestion is signalled when the window's median latency exceeds
+      latency_factor times the best window median seen so far.
+      - max_error_rate: congestion is signalled above this fraction of failed pages in a window.
+      - max_rss: congestion is signalled above this resident memory (in bytes), if given.
+      - base_url: only responses from the host of this url count as throttled, or from any host if None.
+      - timeline: (seconds since start, limit, reason) for every adjustment.
+
+    Representation Invariants:
+      - 1 <= self.min_tabs <= self.limit <= self.max_tabs
+    """
+    # Private Instance Attributes:
+    #   - _active: number of tabs currently active.
+    #   - _slot_freed: set whenever a tab is released or the limit grows.
+    #   - _latencies: latencies (in seconds) of the pages finished in the current window.
+    #   - _failures: number of failed pages in the current window.
+    #   - _throttled: number of 429 / 5xx responses seen in the current window.
+    #   - _best_latency: the best window median latency seen so far.
+    #   - _start: the time the controller was created.
+    #   - _log_path: the csv file the timeline is written to.
+
+    min_tabs: int
+    max_tabs: int
+    limit: int
+    window: int
+    decrease_factor: float
+    latency_factor: float
+    max_error_rate: float
+    max_rss: Optional[int]
+    base_url: Optional[str]
+    timeline: list[tuple[float, int, str]]
+
+    _active: int
+    _slot_freed: asyncio.Event
+    _latencies: list[float]
+    _failures: int
+    _throttled: int
+    _best_latency: float
+    _start: float
+    _log_path: Path
+
+    def __init__(self, min_tabs: int, max_tabs: int, window: int = 10,
+                 decrease_factor: float = 0.5, latency_factor: float = 2.0,
+                 max_error_rate: float = 0.2, max_rss: Optional[int] = None,
+                 base_url: Optional[str] = None, log_path: Path = CONCURRENCY_LOG_PATH) -> None:
+        self.min_tabs = max(1, min(min_tabs, max_tabs))
+        self.max_tabs = max_tabs
+        self.limit = max(self.min_tabs, max_tabs // 2)
+        self.window = window
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.max_error_rate = max_error_rate
+        self.max_rss = max_rss
+        self.base_url = base_url
+        self.timeline = []
+
+        self._active = 0
+        self._slot_freed = asyncio.Event()
+        self._latencies = []
+        self._failures = 0
+        self._throttled = 0
+        self._best_latency = float("inf")
+        self._start = time.monotonic()
+        self._log_path = log_path
+
+        with open(self._log_path, "w", newline="") as f:
+            csv.writer(f).writerow(["seconds", "limit", "median_latency", "error_rate",
+                                    "throttled", "rss_mb", "reason"])
+        self._log(0.0, 0.0, 0, 0, "start")
+
+    async def acquire(self) -> None:
+        """Wait until a tab may become active, then count it as active."""
+        while self._active >= self.limit:
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+        self._active += 1
+
+    def release(self) -> None:
+        """Count an active tab as no longer active."""
+        self._active -= 1
+        self._slot_freed.set()
+
+    def record_status(self, status: int, url: Optional[str] = None) -> None:
+        """Record the HTTP response status of the given url seen while crawling.
+        Responses from other hosts than self.base_url's are ignored.
+        """
+        if (self.base_url is not None and url is not None
+                and urlparse(url).hostname != urlparse(self.base_url).hostname):
+            return
+        if status == 429 or status >= 500:
+            self._throttled += 1
+
+    def record_page(self, latency: float, failed: bool) -> None:
+        """Record a finished page and adjust the limit if the window is complete."""
+        self._latencies.append(latency)
+        self._failures += failed
+        if len(self._latencies) >= self.window:
+            self._adjust()
+
+    def _adjust(self) -> None:
+        """Increase or decrease the limit based on the signals of the completed window."""
+        median_latency = statistics.median(self._latencies)
+        error_rate = self._failures / len(self._latencies)
+        throttled = self._throttled
+        rss = process_tree_rss()
+        self._best_latency = min(self._best_latency, median_latency)
+
+        if throttled:
+            reason = f"{throttled} throttled/5xx responses"
+        elif error_rate > self.max_error_rate:
+            reason = f"error rate {error_rate:.0%}"
+        elif self.max_rss is not None and rss > self.max_rss:
+            reason = f"rss {rss / 1e6:.0f} MB"
+        elif median_latency > self.latency_factor * self._best_latency:
+            reason = f"latency {median_latency:.1f}s"
+        else:
+            reason = None
+
+        if reason is not None:
+            self.limit = max(self.min_tabs, int(self.limit * self.decrease_factor))
+            reason = "decrease: " + reason
+        elif self.limit < self.max_tabs:
+            self.limit += 1
+            self._slot_freed.set()
+            reason = "increase"
+        else:
+            reason = "hold"
+
+        self._log(median_latency, error_rate, throttled, rss, reason)
+        self._latencies = []
+        self._failures = 0
+        self._throttled = 0
+
+    def _log(self, median_latency: float, error_rate: float, throttled: int, rss: int,
+             reason: str) -> None:
+        """Append the current limit to the timeline, the csv log and the terminal."""
+        seconds = time.monotonic() - self._start
+        self.timeline.append((seconds, self.limit, reason))
+        with open(self._log_path, "a", newline="") as f:
+            csv.writer(f).writerow([f"{seconds:.1f}", self.limit, f"{median_latency:.2f}",
+                                    f"{error_rate:.2f}", throttled, f"{rss / 1e6:.0f}", reason])
+        print(f"Concurrency limit: {self.limit} tabs ({reason}).")
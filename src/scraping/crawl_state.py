@@ -0,0 +1,195 @@
+"""
+A transactional, SQLite-backed store of crawl progress.
+
+Every url known to the crawler has one row with its status:
+pending (found, not visited yet), in_progress (being visited), done, or failed,
+and its depth (number of links away from the starting url).
+Writes are committed in batches (every `checkpoint_every` finished pages), and the database
+runs in WAL mode, so a hard kill loses at most one batch of progress. On resume,
+urls that were in progress are simply marked pending again.
+
+It also keeps a fingerprint of every saved page (its Notion last-edited time, if known,
+and a hash of its extracted text) for incremental re-crawls.
+"""
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from src.file_config import CRAWL_STATE_PATH
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+
+class CrawlState:
+    """Crawl progress stored in a SQLite database.
+
+    Instance Attributes:
+      - db_path: path of the database file, or ":memory:" for a throwaway in-memory state.
+      - checkpoint_every: number of finished (done or failed) pages per committed batch.
+    """
+    # Private Instance Attributes:
+    #   - _conn: the database connection.
+    #   - _uncommitted: number of pages finished since the last commit.
+
+    db_path: str
+    checkpoint_every: int
+
+    _conn: sqlite3.Connection
+    _uncommitted: int
+
+    def __init__(self, db_path: str | Path = CRAWL_STATE_PATH, checkpoint_every: int = 20) -> None:
+        self.db_path = str(db_path)
+        self.checkpoint_every = checkpoint_every
+        self._uncommitted = 0
+
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                base_url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                depth INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS urls_status ON urls (status)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                url TEXT PRIMARY KEY,
+                last_edited INTEGER,
+                text_hash TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def is_empty(self) -> bool:
+        """Return whether no url has been recorded."""
+        return self._conn.execute("SELECT 1 FROM urls LIMIT 1").fetchone() is None
+
+    def reset(self) -> None:
+        """Erase all progress and fingerprints."""
+        self._conn.execute("DELETE FROM urls")
+        self._conn.execute("DELETE FROM fingerprints")
+        self._conn.commit()
+
+    def restart(self) -> None:
+        """Mark every known url as pending again (keeping fingerprints), to start a new run
+        over a previously crawled site.
+        """
+        self._conn.execute("UPDATE urls SET status = ?, error = NULL", (PENDING,))
+        self._conn.commit()
+
+    def add_pending(self, url_tuples: list[tuple[str, str]] | set[tuple[str, str]],
+                    depth: int = 0) -> None:
+        """Record the given (url, base_url) tuples as pending at the given depth,
+        unless they are already known.
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO urls (url, base_url, status, updated_at, depth) VALUES (?, ?, ?, ?, ?)",
+            [(url, base_url, PENDING, now, depth) for url, base_url in url_tuples],
+        )
+
+    def mark_in_progress(self, url_tuple: tuple[str, str]) -> None:
+        """Record that the given url tuple is being visited."""
+        self._set_status(url_tuple, IN_PROGRESS, None)
+
+    def mark_done(self, url_tuple: tuple[str, str]) -> None:
+        """Record that the given url tuple has been visited."""
+        self._set_status(url_tuple, DONE, None)
+        self._count_finished()
+
+    def mark_failed(self, url_tuple: tuple[str, str], error: str) -> None:
+        """Record that visiting the given url tuple failed with the given error message."""
+        self._set_status(url_tuple, FAILED, error)
+        self._count_finished()
+
+    def requeue(self, url_tuple: tuple[str, str]) -> None:
+        """Record that the given url tuple should be visited again (e.g. its visit was interrupted)."""
+        self._set_status(url_tuple, PENDING, None)
+
+    def requeue_in_progress(self) -> int:
+        """Mark every url that was in progress (e.g. when the crawler was killed) as pending again.
+        Return the number of urls requeued.
+        """
+        cursor = self._conn.execute("UPDATE urls SET status = ? WHERE status = ?", (PENDING, IN_PROGRESS))
+        self._conn.commit()
+        return cursor.rowcount
+
+    def pending(self) -> Iterator[tuple[str, str]]:
+        """Yield the (url, base_url) tuples that are pending.
+        Base urls are interned, so that all tuples share one string per base url.
+        """
+        for url, base_url in self._conn.execute("SELECT url, base_url FROM urls WHERE status = ?",
+                                                (PENDING,)):
+            yield url, sys.intern(base_url)
+
+    def pending_depths(self) -> dict[str, int]:
+        """Return the depth of every pending url."""
+        return dict(self._conn.execute("SELECT url, depth FROM urls WHERE status = ?", (PENDING,)))
+
+    def visited(self) -> Iterator[str]:
+        """Yield the urls that are visited (done or failed) or being visited."""
+        for (url,) in self._conn.execute("SELECT url FROM urls WHERE status != ?", (PENDING,)):
+            yield url
+
+    def failed(self) -> Iterator[tuple[str, str]]:
+        """Yield (url, error message) pairs of the urls that failed."""
+        yield from self._conn.execute("SELECT url, error FROM urls WHERE status = ?", (FAILED,))
+
+    def get_fingerprint(self, url: str) -> Optional[tuple[Optional[int], str]]:
+        """Return the (last-edited time, text hash) fingerprint recorded for the given url,
+        or None if the url has no fingerprint.
+        """
+        return self._conn.execute("SELECT last_edited, text_hash FROM fingerprints WHERE url = ?",
+                                  (url,)).fetchone()
+
+    def set_fingerprint(self, url: str, last_edited: Optional[int], text_hash: str) -> None:
+        """Record the fingerprint of the given url."""
+        self._conn.execute(
+            """INSERT INTO fingerprints (url, last_edited, text_hash, updated_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT (url) DO UPDATE SET
+                   last_edited = excluded.last_edited, text_hash = excluded.text_hash,
+                   updated_at = excluded.updated_at""",
+            (url, last_edited, text_hash, time.time()),
+        )
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of urls with each status."""
+        return dict(self._conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status"))
+
+    def checkpoint(self) -> None:
+        """Commit all progress recorded so far."""
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def close(self) -> None:
+        """Commit all progress and close the database."""
+        self.checkpoint()
+        self._conn.close()
+
+    def _set_status(self, url_tuple: tuple[str, str], status: str, error: Optional[str]) -> None:
+        """Insert or update the row of the given url tuple with the given status."""
+        url, base_url = url_tuple
+        self._conn.execute(
+            """INSERT INTO urls (url, base_url, status, error, updated_at) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (url) DO UPDATE SET
+                   status = excluded.status, error = excluded.error, updated_at = excluded.updated_at""",
+            (url, base_url, status, error, time.time()),
+        )
+
+    def _count_finished(self) -> None:
+        """Count one finished page and commit if a batch is complete."""
+        self._uncommitted += 1
+        if self._uncommitted >= self.checkpoint_every:
+            self.checkpoint()
@@ -0,0 +1,105 @@
+"""
+A content-addressed store for scraped documents.
+
+Every page is saved under a stable key derived from its url (its Notion page ID, or a hash of
+the normalised url for non-Notion pages), e.g. `json_docs/page_<key>.json`
+(or `block_docs/page_<key>.jsonl` for its typed blocks, one json object per line).
+Naming is O(1) (no directory listing), the same page always maps to the same files across sessions,
+and every write is atomic (temporary file + rename), so concurrent tasks or processes never
+overwrite each other with partial files.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from urllib.parse import urlparse
+
+from src.file_config import HTML_DIR, TEXT_DIR, JSON_DIR, BLOCKS_DIR
+from src.scraping.parsing import ParsedPage
+from src.scraping.urls import notion_page_id
+from src.utils.files import atomic_write_text
+
+
+def doc_key(url: str) -> str:
+    """Return the stable document key of the given url.
+
+    >>> doc_key("https://utat-ss.notion.site/UTAT-Space-Systems-660068a07b694305b56c483962e927c5")
+    '660068a07b694305b56c483962e927c5'
+    >>> doc_key("https://books.toscrape.com/?page=2") == doc_key("https://books.toscrape.com/")
+    True
+    """
+    page_id = notion_page_id(url)
+    if page_id is not None:
+        return page_id
+    normalised = urlparse(url)._replace(query=None, fragment=None).geturl()
+    return hashlib.blake2b(normalised.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def json_doc(parsed: ParsedPage) -> dict:
+    """Return the json document of the given parsed page: its text on one line,
+    its source url, its document key, and whether it is partial.
+    """
+    return {"text": parsed.text.replace('\n', ' '), "source": parsed.url,
+            "page_id": doc_key(parsed.url), "partial": parsed.partial}
+
+
+def blocks_jsonl(parsed: ParsedPage) -> str:
+    """Return the JSONL document of the blocks of the given parsed page: one json object per block
+    (in document order) with the page's source url and document key, and the block's ID, type,
+    heading level, nesting depth and text.
+    """
+    page_id = doc_key(parsed.url)
+    return "".join(
+        json.dumps({"source": parsed.url, "page_id": page_id, "block_id": block.block_id, "type": block.type,
+                    "level": block.level, "depth": block.depth, "text": block.text}) + "\n"
+        for block in parsed.blocks
+    )
+
+
+class DocStore:
+    """Saves the html, text and json documents of scraped pages under stable, url-derived names.
+
+    Instance Attributes:
+      - html_dir: directory of html docs.
+      - text_dir: directory of extracted text docs.
+      - json_dir: directory of json docs (page content and source).
+      - blocks_dir: directory of JSONL docs of typed blocks (see `blocks_jsonl`).
+    """
+    html_dir: Path
+    text_dir: Path
+    json_dir: Path
+    blocks_dir: Path
+
+    def __init__(self, html_dir: Path = HTML_DIR, text_dir: Path = TEXT_DIR,
+                 json_dir: Path = JSON_DIR, blocks_dir: Path = BLOCKS_DIR) -> None:
+        self.html_dir = Path(html_dir)
+        self.text_dir = Path(text_dir)
+        self.json_dir = Path(json_dir)
+        self.blocks_dir = Path(blocks_dir)
+
+    def html_path(self, url: str) -> Path:
+        """Return the path of the html doc of the given url."""
+        return self.html_dir / f"page_{doc_key(url)}.html"
+
+    def text_path(self, url: str) -> Path:
+        """Return the path of the text doc of the given url."""
+        return self.text_dir / f"page_{doc_key(url)}.txt"
+
+    def json_path(self, url: str) -> Path:
+        """Return the path of the json doc of the given url."""
+        return self.json_dir / f"page_{doc_key(url)}.json"
+
+    def blocks_path(self, url: str) -> Path:
+        """Return the path of the JSONL blocks doc of the given url."""
+        return self.blocks_dir / f"page_{doc_key(url)}.jsonl"
+
+    def write(self, path: Path, content: str) -> None:
+        """Atomically write content to the given path."""
+        atomic_write_text(path, content)
+
+    def clear(self) -> None:
+        """Remove every saved document."""
+        for d in [self.html_dir, self.text_dir, self.json_dir, self.blocks_dir]:
+            for filename in os.listdir(d):
+                os.remove(os.path.join(d, filename))
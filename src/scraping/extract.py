@@ -0,0 +1,93 @@
+"""
+In-browser extraction of links and text.
+
+Instead of serialising the whole `outerHTML` across the browser bridge and re-parsing it in Python,
+one injected script collects the same-base links and the text, Notion type and nesting depth
+of every Notion block and returns them as a compact JSON payload.
+"""
+
+from typing import Any, Optional
+
+from src.scraping.blocks import make_block
+from src.scraping.parsing import ParsedPage, clean_text
+
+# Evaluated in page with the base url as argument.
+# Returns {"links": [normalised same-base urls],
+#          "blocks": [{"id", "type" (Notion type, see `notion_type_of`), "text", "depth"} of each block]}.
+EXTRACT_SCRIPT = """
+(baseUrl) => {
+    const links = new Set();
+    for (const anchor of document.querySelectorAll("a[href]")) {
+        let link;
+        try {
+            link = new URL(anchor.getAttribute("href"), document.baseURI);
+        } catch (e) {
+            continue;
+        }
+        link.search = "";
+        link.hash = "";
+        if (link.href.startsWith(baseUrl)) links.add(link.href);
+    }
+
+    const SKIPPED_TAGS = new Set(["SCRIPT", "STYLE", "TEMPLATE", "NOSCRIPT"]);
+    // Text of an element, excluding the text of nested Notion blocks
+    const ownText = (element) => {
+        const parts = [];
+        const walker = document.createTreeWalker(element, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+            acceptNode(node) {
+                if (node.nodeType === Node.TEXT_NODE) return NodeFilter.FILTER_ACCEPT;
+                if (SKIPPED_TAGS.has(node.tagName)) return NodeFilter.FILTER_REJECT;
+                if (node !== element && node.hasAttribute("data-block-id")) return NodeFilter.FILTER_REJECT;
+                return NodeFilter.FILTER_SKIP;
+            },
+        });
+        while (walker.nextNode()) {
+            const text = walker.currentNode.nodeValue.trim();
+            if (text) parts.push(text);
+        }
+        return parts.join("\\n");
+    };
+
+    // Notion type of a block, from its notion-<type>-block class
+    const notionType = (element) => {
+        if (element.tagName === "TR") return "table_row";
+        for (const name of element.classList) {
+            const match = /^notion-([a-z_]+)-block$/.exec(name);
+            if (match) return match[1];
+        }
+        return "";
+    };
+
+    // Text outside of any block first (page title, breadcrumbs, non-Notion pages), then each block
+    const blocks = [];
+    const outside = document.body ? ownText(document.body) : "";
+    if (outside) blocks.push({id: null, type: "title", text: outside, depth: 0});
+    for (const element of document.querySelectorAll("[data-block-id]")) {
+        const text = element.tagName === "TR"
+            ? [...element.cells].map((cell) => cell.innerText.trim()).join(" | ")
+            : ownText(element);
+        if (!text.replace(/[ |]/g, "")) continue;
+        let depth = 0;
+        for (let parent = element.parentElement; parent; parent = parent.parentElement) {
+            if (parent.hasAttribute("data-block-id")) depth++;
+        }
+        blocks.push({id: element.getAttribute("data-block-id"), type: notionType(element), text, depth});
+    }
+
+    return {links: [...links], blocks: blocks};
+}
+"""
+
+
+def parsed_from_payload(payload: dict[str, Any], url: str, base_url: str,
+                        html: Optional[str] = None) -> ParsedPage:
+    """Return a ParsedPage built from the payload returned by EXTRACT_SCRIPT."""
+    blocks = [make_block(block["id"], block["type"], block["text"], block["depth"])
+              for block in payload.get("blocks", [])]
+    return ParsedPage(
+        url=url,
+        text=clean_text("\n".join(block.text for block in blocks)),
+        links={(link, base_url) for link in payload.get("links", [])},
+        html=html,
+        blocks=blocks,
+    )
@@ -0,0 +1,96 @@
+"""
+The crawl frontier: the queue of url tuples that crawl workers pull from.
+
+It has two lanes: the main lane for newly found links, and a low-priority retry lane for failed
+links whose backoff delay has expired. Workers only take from the retry lane when the main lane
+is empty. The main lane is a heap keyed by (priority, insertion order), so items with a lower
+priority value come out first, and items of equal priority come out in the order they were put
+(see `CrawlPriority`). Like `asyncio.Queue`, `join` waits until every item put (including items waiting for a
+retry) has been marked done with `task_done`.
+"""
+
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from typing import Hashable
+
+
+class Frontier:
+    """A two-lane queue of url tuples with delayed retries.
+
+    Representation Invariants:
+      - self._unfinished >= len(self._main) + len(self._retry) + len(self._scheduled)
+    """
+    # Private Instance Attributes:
+    #   - _main: a heap of (priority, insertion order, item) entries in the main lane.
+    #   - _counter: the insertion order of the next item put into the main lane.
+    #   - _retry: items in the retry lane whose delay has expired.
+    #   - _scheduled: items waiting for their retry delay to expire, with their timer.
+    #   - _unfinished: number of items put and not yet marked done.
+    #   - _ready: set when an item may be available.
+    #   - _done: set when no item is unfinished.
+
+    _main: list[tuple[float, int, Hashable]]
+    _counter: itertools.count
+    _retry: deque
+    _scheduled: dict[Hashable, asyncio.TimerHandle]
+    _unfinished: int
+    _ready: asyncio.Event
+    _done: asyncio.Event
+
+    def __init__(self) -> None:
+        self._main = []
+        self._counter = itertools.count()
+        self._retry = deque()
+        self._scheduled = {}
+        self._unfinished = 0
+        self._ready = asyncio.Event()
+        self._done = asyncio.Event()
+        self._done.set()
+
+    def put_nowait(self, item: Hashable, priority: float = 0.0) -> None:
+        """Put an item into the main lane with the given priority (lower comes out first)."""
+        heapq.heappush(self._main, (priority, next(self._counter), item))
+        self._add_unfinished()
+
+    def put_retry(self, item: Hashable, delay: float) -> None:
+        """Put an item into the retry lane after the given delay (in seconds)."""
+        loop = asyncio.get_running_loop()
+        self._scheduled[item] = loop.call_later(delay, self._release_retry, item)
+        self._add_unfinished()
+
+    async def get(self) -> Hashable:
+        """Remove and return an item, preferring the item with the lowest priority in the main lane.
+        Wait if none is available.
+        """
+        while not self._main and not self._retry:
+            self._ready.clear()
+            await self._ready.wait()
+        return heapq.heappop(self._main)[2] if self._main else self._retry.popleft()
+
+    def task_done(self) -> None:
+        """Mark an item taken with `get` as done."""
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._done.set()
+
+    async def join(self) -> None:
+        """Wait until every item put has been marked done."""
+        await self._done.wait()
+
+    def qsize(self) -> int:
+        """Return the number of items waiting in either lane, including scheduled retries."""
+        return len(self._main) + len(self._retry) + len(self._scheduled)
+
+    def _add_unfinished(self) -> None:
+        """Count a newly put item as unfinished and wake up waiting workers."""
+        self._unfinished += 1
+        self._done.clear()
+        self._ready.set()
+
+    def _release_retry(self, item: Hashable) -> None:
+        """Move an item whose retry delay has expired into the retry lane."""
+        del self._scheduled[item]
+        self._retry.append(item)
+        self._ready.set()
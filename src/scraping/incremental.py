@@ -0,0 +1,68 @@
+"""
+Helpers for incremental re-crawls: cheap change probes and page fingerprints.
+
+Instead of rendering a known page to find out whether it changed, its last-edited time
+is read from Notion's public `syncRecordValues` API (the same call the Notion app makes),
+in batches of many pages per request.
+"""
+
+import hashlib
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import urljoin
+
+from src.scraping.urls import dashed_uuid, notion_page_id
+
+# Number of pages probed per API request
+PROBE_BATCH_SIZE = 100
+
+
+def text_fingerprint(text: str) -> str:
+    """Return a hash of the given extracted page text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+async def probe_last_edited(request: Any, base_url: str, page_ids: list[str]) -> dict[str, int]:
+    """Return a mapping from page ID to last-edited time (in milliseconds) for the given Notion
+    page IDs, using the public API of the site at base_url through the given Playwright
+    APIRequestContext.
+    Pages that cannot be probed (e.g. deleted or private pages, or failed requests) are left out.
+    """
+    endpoint = urljoin(base_url, "/api/v3/syncRecordValues")
+    last_edited = {}
+
+    for i in range(0, len(page_ids), PROBE_BATCH_SIZE):
+        batch = page_ids[i:i + PROBE_BATCH_SIZE]
+        body = {"requests": [{"pointer": {"table": "block", "id": dashed_uuid(page_id)}, "version": -1}
+                             for page_id in batch]}
+        try:
+            response = await request.post(endpoint, data=body)
+            if not response.ok:
+                print(f"Probe request failed with status {response.status}.")
+                continue
+            blocks = (await response.json()).get("recordMap", {}).get("block", {})
+        except Exception as e:
+            print("An error occurs when probing pages. Error:", e)
+            continue
+
+        for block_id, record in blocks.items():
+            value = record.get("value") or {}
+            value = value.get("value", value)   # newer API versions nest the record once more
+            if "last_edited_time" in value:
+                last_edited[block_id.replace("-", "")] = int(value["last_edited_time"])
+
+    return last_edited
+
+
+def unchanged_urls(urls: Iterable[str], last_edited: dict[str, int],
+                   get_fingerprint: Callable[[str], Optional[tuple[Optional[int], str]]]) -> list[str]:
+    """Return the given urls whose probed last-edited time (last_edited, by page ID) is the one
+    recorded in their fingerprint (see `CrawlState.get_fingerprint`).
+    Urls that were not probed or have no recorded last-edited time are never unchanged.
+    """
+    unchanged = []
+    for url in urls:
+        fingerprint = get_fingerprint(url)
+        probed = last_edited.get(notion_page_id(url) or "")
+        if fingerprint is not None and probed is not None and fingerprint[0] == probed:
+            unchanged.append(url)
+    return unchanged
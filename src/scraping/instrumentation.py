@@ -0,0 +1,157 @@
+"""
+Per-phase crawl instrumentation.
+
+Every page gets a trace record with the time spent in each phase of crawling it
+(goto, settle, evaluate, parse, save) and the number of bytes transferred from the browser.
+Records are appended to a JSONL trace file, phase durations feed rolling p50/p95/p99 histograms,
+and a live summary line (pages per minute, bytes per page and phase percentiles) is printed
+every few pages.
+
+The record of the page being crawled is kept in a context variable, so concurrent crawl workers
+(each an asyncio task with its own context) never mix up their spans.
+"""
+
+import json
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO
+
+from src.file_config import TRACE_PATH
+
+PHASES = ("goto", "settle", "evaluate", "parse", "save")
+
+
+class Histogram:
+    """A rolling window of the most recent samples of a measurement.
+
+    Instance Attributes:
+      - samples: the most recent samples, oldest first.
+    """
+    samples: deque
+
+    def __init__(self, size: int = 1000) -> None:
+        self.samples = deque(maxlen=size)
+
+    def add(self, value: float) -> None:
+        """Add a sample, dropping the oldest one if the window is full."""
+        self.samples.append(value)
+
+    def percentile(self, p: float) -> float:
+        """Return the p-th percentile (0 <= p <= 100) of the samples (nearest rank),
+        or 0.0 if there are none.
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+
+class CrawlTracer:
+    """Records per-page, per-phase timings of a crawl.
+
+    Instance Attributes:
+      - trace_path: the JSONL file trace records are appended to.
+      - summary_every: number of pages between two summary lines.
+      - histograms: phase -> rolling histogram of its durations (in seconds).
+      - pages: number of pages traced.
+      - total_bytes: total number of bytes transferred from the browser.
+    """
+    # Private Instance Attributes:
+    #   - _current: the trace record of the page being crawled in the current context.
+    #   - _file: the open trace file, while tracing.
+    #   - _start: the time tracing started.
+
+    trace_path: Path
+    summary_every: int
+    histograms: dict[str, Histogram]
+    pages: int
+    total_bytes: int
+
+    _current: ContextVar[Optional[dict[str, Any]]]
+    _file: Optional[TextIO]
+    _start: float
+
+    def __init__(self, trace_path: Path = TRACE_PATH, summary_every: int = 10) -> None:
+        self.trace_path = trace_path
+        self.summary_every = summary_every
+        self.histograms = {phase: Histogram() for phase in PHASES}
+        self.pages = 0
+        self.total_bytes = 0
+
+        self._current = ContextVar("current_trace_record", default=None)
+        self._file = None
+        self._start = time.monotonic()
+
+    def open(self) -> None:
+        """Open the trace file (appending) and start the clock."""
+        self._file = open(self.trace_path, "a", encoding="utf-8")
+        self._start = time.monotonic()
+
+    def close(self) -> None:
+        """Print a final summary and close the trace file."""
+        print(self.summary())
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def start_page(self, url: str) -> None:
+        """Start the trace record of the given url in the current context."""
+        self._current.set({"url": url, "timestamp": time.time(), "start": time.monotonic(),
+                           "phases": {}, "bytes": 0})
+
+    def finish_page(self, status: str) -> None:
+        """Finish the trace record of the current context with the given status,
+        write it to the trace file, and print a summary line every summary_every pages.
+        """
+        record = self._current.get()
+        if record is None:
+            return
+        self._current.set(None)
+
+        record["total"] = round(time.monotonic() - record.pop("start"), 4)
+        record["status"] = status
+        self.pages += 1
+        self.total_bytes += record["bytes"]
+
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+        if self.pages % self.summary_every == 0:
+            print(self.summary())
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block as the given phase of the current page.
+        A phase entered several times for one page (e.g. after a redirect) adds up.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.histograms[phase].add(duration)
+            record = self._current.get()
+            if record is not None:
+                record["phases"][phase] = round(record["phases"].get(phase, 0.0) + duration, 4)
+
+    def add_bytes(self, num_bytes: int) -> None:
+        """Count bytes transferred from the browser for the current page."""
+        record = self._current.get()
+        if record is not None:
+            record["bytes"] += num_bytes
+
+    def summary(self) -> str:
+        """Return a one-line summary of throughput and phase percentiles."""
+        minutes = max(time.monotonic() - self._start, 1e-9) / 60
+        bytes_per_page = self.total_bytes / self.pages if self.pages else 0
+        phases = ", ".join(
+            f"{phase} {h.percentile(50):.2f}/{h.percentile(95):.2f}/{h.percentile(99):.2f}s"
+            for phase, h in self.histograms.items() if h.samples
+        )
+        return (f"[trace] {self.pages} pages, {self.pages / minutes:.1f} pages/min, "
+                f"{bytes_per_page / 1e3:.0f} KB/page | p50/p95/p99: {phases}")
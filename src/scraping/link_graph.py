@@ -0,0 +1,198 @@
+"""
+The link graph of a crawl, stored in SQLite.
+
+Every page the crawler knows is a node, numbered in discovery order, with its depth (number of
+links away from the starting url, when it was first found) and the page it was first found on.
+Every link from a crawled page to a same-base page is an edge. When a page is crawled again
+(e.g. in an incremental run), its outgoing edges are replaced, so the graph always reflects
+the latest version of every page.
+
+The graph can be exported as CSR arrays (see `export_csr`) to compute site structure and authority
+scores offline (`pagerank` is a small built-in example), and `subtree` lists every page reachable
+from a page, e.g. to scope a re-crawl to the part of the workspace below a changed page.
+"""
+
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.file_config import LINK_GRAPH_PATH
+
+
+class LinkGraph:
+    """The parent-to-child link graph of a crawl, stored in a SQLite database.
+
+    Instance Attributes:
+      - db_path: path of the database file, or ":memory:" for a throwaway in-memory graph.
+      - commit_every: number of recorded pages per committed batch.
+    """
+    # Private Instance Attributes:
+    #   - _conn: the database connection.
+    #   - _uncommitted: number of pages recorded since the last commit.
+
+    db_path: str
+    commit_every: int
+
+    _conn: sqlite3.Connection
+    _uncommitted: int
+
+    def __init__(self, db_path: str | Path = LINK_GRAPH_PATH, commit_every: int = 20) -> None:
+        self.db_path = str(db_path)
+        self.commit_every = commit_every
+        self._uncommitted = 0
+
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                depth INTEGER NOT NULL,
+                parent INTEGER
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS edges (
+                src INTEGER NOT NULL,
+                dst INTEGER NOT NULL,
+                PRIMARY KEY (src, dst)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    def num_edges(self) -> int:
+        """Return the number of edges."""
+        return self._conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+
+    def reset(self) -> None:
+        """Erase the whole graph."""
+        self._conn.execute("DELETE FROM edges")
+        self._conn.execute("DELETE FROM nodes")
+        self._conn.commit()
+
+    def record_page(self, url: str, links: Iterable[str], depth: int = 0) -> None:
+        """Record that the page at url (at the given depth, if it is not known yet) links to
+        the given urls, replacing the links recorded for it before.
+        Linked urls that are not known yet become nodes one level deeper, in the given order.
+        """
+        src = self._node(url, depth, None)
+        child_depth = self._conn.execute("SELECT depth FROM nodes WHERE node_id = ?", (src,)).fetchone()[0] + 1
+        self._conn.execute("DELETE FROM edges WHERE src = ?", (src,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO edges (src, dst) VALUES (?, ?)",
+            [(src, self._node(link, child_depth, src)) for link in links if link != url],
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Commit everything recorded so far."""
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def close(self) -> None:
+        """Commit and close the database."""
+        self.checkpoint()
+        self._conn.close()
+
+    def children(self, url: str) -> list[str]:
+        """Return the urls the page at url links to, in discovery order."""
+        return [child for (child,) in self._conn.execute(
+            "SELECT n.url FROM nodes s JOIN edges e ON e.src = s.node_id JOIN nodes n ON n.node_id = e.dst "
+            "WHERE s.url = ? ORDER BY n.node_id", (url,))]
+
+    def depth(self, url: str) -> Optional[int]:
+        """Return the depth of the given url, or None if it is not in the graph."""
+        row = self._conn.execute("SELECT depth FROM nodes WHERE url = ?", (url,)).fetchone()
+        return row[0] if row is not None else None
+
+    def subtree(self, url: str, max_depth: Optional[int] = None) -> list[str]:
+        """Return the urls reachable from the given url (including itself) by following at most
+        max_depth links (or any number of links, if None), in discovery order.
+        """
+        row = self._conn.execute("SELECT node_id FROM nodes WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return []
+        reached, frontier, hops = {row[0]}, [row[0]], 0
+        while frontier and (max_depth is None or hops < max_depth):
+            next_frontier = []
+            for src in frontier:
+                for (dst,) in self._conn.execute("SELECT dst FROM edges WHERE src = ?", (src,)):
+                    if dst not in reached:
+                        reached.add(dst)
+                        next_frontier.append(dst)
+            frontier, hops = next_frontier, hops + 1
+        return [url for node_id, url in sorted(
+            (node_id, url) for node_id, url in self._conn.execute("SELECT node_id, url FROM nodes")
+            if node_id in reached)]
+
+    def to_csr(self) -> tuple[list[str], array, array, array]:
+        """Return the graph in compressed sparse row form: the urls (row i is the i-th node
+        in discovery order), the row pointers, the column indices, and the depths.
+        The children of node i are indices[indptr[i]:indptr[i + 1]].
+        """
+        urls, depths, index_of = [], array("i"), {}
+        for node_id, url, depth in self._conn.execute("SELECT node_id, url, depth FROM nodes ORDER BY node_id"):
+            index_of[node_id] = len(urls)
+            urls.append(url)
+            depths.append(depth)
+
+        indptr, indices = array("I", [0] * (len(urls) + 1)), array("I")
+        for src, dst in self._conn.execute("SELECT src, dst FROM edges ORDER BY src, dst"):
+            indptr[index_of[src] + 1] += 1
+            indices.append(index_of[dst])
+        for i in range(len(urls)):
+            indptr[i + 1] += indptr[i]
+        return urls, indptr, indices, depths
+
+    def export_csr(self, directory: str | Path) -> None:
+        """Write the CSR form of the graph (see `to_csr`) to the given directory:
+        urls.txt (one url per line) and indptr.bin, indices.bin (uint32) and depth.bin (int32),
+        which can be loaded with e.g. numpy.fromfile(path, dtype="<u4").
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        urls, indptr, indices, depths = self.to_csr()
+        (directory / "urls.txt").write_text("\n".join(urls) + "\n", encoding="utf-8")
+        for name, values in [("indptr", indptr), ("indices", indices), ("depth", depths)]:
+            with open(directory / f"{name}.bin", "wb") as f:
+                values.tofile(f)
+        print(f"Exported {len(urls)} pages and {len(indices)} links to {directory}")
+
+    def pagerank(self, damping: float = 0.85, iterations: int = 30) -> dict[str, float]:
+        """Return the PageRank of every page, computed by power iteration over the CSR form.
+        The rank of pages without links is spread evenly over all pages.
+        """
+        urls, indptr, indices, _ = self.to_csr()
+        n = len(urls)
+        if n == 0:
+            return {}
+        rank = [1 / n] * n
+        for _ in range(iterations):
+            new = [(1 - damping) / n] * n
+            dangling = 0.0
+            for i in range(n):
+                start, end = indptr[i], indptr[i + 1]
+                if start == end:
+                    dangling += rank[i]
+                    continue
+                share = damping * rank[i] / (end - start)
+                for j in indices[start:end]:
+                    new[j] += share
+            spread = damping * dangling / n
+            rank = [r + spread for r in new]
+        return dict(zip(urls, rank))
+
+    def _node(self, url: str, depth: int, parent: Optional[int]) -> int:
+        """Return the node id of the given url, adding it with the given depth and parent if new."""
+        row = self._conn.execute("SELECT node_id FROM nodes WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self._conn.execute("INSERT INTO nodes (url, depth, parent) VALUES (?, ?, ?)",
+                                  (url, depth, parent)).lastrowid
@@ -0,0 +1,128 @@
+"""
+Parse scraped html into extracted text and same-base links.
+
+`parse_page` is a plain top-level function so that it can run in a process pool,
+keeping (potentially multi-megabyte) parsing off the crawler's event loop.
+"""
+
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlparse
+from typing import Optional, Iterable
+import time
+
+from src.scraping.blocks import Block, soup_blocks
+
+# Supported parser backends. "lxml" and "selectolax" are optional dependencies.
+PARSERS = ("html.parser", "lxml", "selectolax")
+
+
+@dataclass
+class ParsedPage:
+    """The result of parsing one scraped page.
+
+    Instance Attributes:
+      - url: the url of the page.
+      - text: the extracted text, one non-empty line per line.
+      - links: new url tuples (url, base_url) found on the page, within the same base url.
+      - html: the html to save, or None if it is not kept.
+      - parse_seconds: the time spent parsing the page.
+      - partial: whether the page was captured before it finished loading
+      (its time budget ran out or it kept growing as it was scrolled).
+      - blocks: the typed Notion blocks of the page (see `Block`), if they were extracted.
+    """
+    url: str
+    text: str
+    links: set[tuple[str, str]] = field(default_factory=set)
+    html: Optional[str] = None
+    parse_seconds: float = 0.0
+    partial: bool = False
+    blocks: list[Block] = field(default_factory=list)
+
+
+def parse_page(html: str, url: str, base_url: str, parser: str = "html.parser",
+               keep_html: bool = False, keep_blocks: bool = False) -> ParsedPage:
+    """Parse the given html of the page at url with the given parser backend.
+    If keep_html is True, the returned page also holds the html to save
+    (prettified, except for selectolax which cannot prettify).
+    If keep_blocks is True, the returned page also holds its typed Notion blocks
+    (extracted with BeautifulSoup, even with selectolax).
+
+    Preconditions:
+      - parser in PARSERS
+    """
+    start = time.perf_counter()
+
+    blocks = []
+    if parser == "selectolax":
+        raw_text, hrefs, kept_html = _parse_with_selectolax(html, keep_html)
+        if keep_blocks:
+            from bs4 import BeautifulSoup
+            blocks = soup_blocks(BeautifulSoup(html, "html.parser"))
+    else:
+        raw_text, hrefs, kept_html, blocks = _parse_with_soup(html, parser, keep_html, keep_blocks)
+
+    return ParsedPage(
+        url=url,
+        text=clean_text(raw_text),
+        links=normalise_links(hrefs, url, base_url),
+        html=kept_html,
+        parse_seconds=time.perf_counter() - start,
+        blocks=blocks,
+    )
+
+
+def clean_text(raw_text: str) -> str:
+    """Strip every line of the given text and drop empty lines."""
+    return "\n".join(
+        line.strip()
+        for line in raw_text.split("\n")
+        if line.strip()
+    )
+
+
+def normalise_links(hrefs: Iterable[Optional[str]], url: str, base_url: str) -> set[tuple[str, str]]:
+    """Return url tuples (link, base_url) for the given hrefs found on the page at url.
+    Relative links are made absolute, query and fragment parts are removed,
+    and links outside of base_url are dropped.
+    """
+    links = set()
+    for href in hrefs:
+        if href is None:
+            continue
+
+        # Convert relative URLs to absolute and remove query and fragment parts
+        new_link = urlparse(urljoin(url, href))._replace(query=None, fragment=None).geturl()
+
+        # Only keep links within the same base
+        if new_link.startswith(base_url):
+            links.add((new_link, base_url))
+    return links
+
+
+def _parse_with_soup(html: str, features: str, keep_html: bool,
+                     keep_blocks: bool) -> tuple[str, list[Optional[str]], Optional[str], list[Block]]:
+    """Parse with BeautifulSoup using the given features ("html.parser" or "lxml")."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, features)
+    hrefs = [link.get('href') for link in soup.find_all('a')]
+    blocks = soup_blocks(soup) if keep_blocks else []
+    return soup.get_text("\n"), hrefs, soup.prettify() if keep_html else None, blocks
+
+
+def _parse_with_selectolax(html: str,
+                           keep_html: bool) -> tuple[str, list[Optional[str]], Optional[str]]:
+    """Parse with selectolax's lexbor backend."""
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except ImportError:
+        raise ImportError("The selectolax parser requires the selectolax package: "
+                          "pip install selectolax") from None
+
+    tree = LexborHTMLParser(html)
+    hrefs = [node.attributes.get('href') for node in tree.css('a')]
+    # Match BeautifulSoup's get_text, which skips script and style contents
+    tree.strip_tags(["script", "style", "template"])
+    root = tree.body or tree.root
+    raw_text = root.text(separator="\n") if root is not None else ""
+    return raw_text, hrefs, html if keep_html else None
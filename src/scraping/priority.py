@@ -0,0 +1,113 @@
+"""
+The order in which the crawl frontier hands out urls.
+
+Pages are ranked in three tiers:
+1. Key urls (by default, the urls in key_urls.json), which are seeded into the frontier
+and crawled before any other page;
+2. Boosted pages: pages whose url starts with one of the boosted prefixes,
+and every page found beneath a boosted page. Prefixes are canonicalised like every url,
+so a Notion page url boosts that page and everything found beneath it;
+3. Every other page.
+Within a tier, pages are ordered by depth (number of links away from the starting url):
+shallow pages first (breadth-first) or deep pages first (depth-first).
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.file_config import KEY_URLS_PATH
+from src.scraping.urls import canonical_url
+
+BFS = "bfs"
+DFS = "dfs"
+ORDERS = (BFS, DFS)
+
+KEY_TIER = 0
+BOOSTED_TIER = 1
+NORMAL_TIER = 2
+
+# Priorities of different tiers are this far apart, so a tier always beats any depth
+TIER_SPAN = 1_000_000
+
+
+def load_key_urls(path: Path = KEY_URLS_PATH) -> set[str]:
+    """Return the canonical urls in the given key urls json file ({name: url}).
+    Return an empty set if the file is missing, empty, or not a json object.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return set()
+    if not isinstance(data, dict):
+        return set()
+    return {canonical_url(url) for url in data.values()}
+
+
+class CrawlPriority:
+    """Computes the priority of a url in the frontier. Lower priorities are crawled first.
+
+    Instance Attributes:
+      - order: BFS (shallow pages first) or DFS (deep pages first) within a tier.
+      - key_urls: canonical urls that are seeded into the frontier and crawled before any other page.
+      - boosted_prefixes: canonical url prefixes of pages that are crawled before other pages
+      (but after key urls), together with every page found beneath them. A Notion page url
+      is canonicalised to its page ID, so it is the prefix of that page only (and boosts
+      its descendants as they are found).
+
+    Representation Invariants:
+      - self.order in ORDERS
+    """
+    order: str
+    key_urls: set[str]
+    boosted_prefixes: tuple[str, ...]
+
+    def __init__(self, order: str = BFS, boosted_prefixes: Iterable[str] = (),
+                 key_urls: Optional[Iterable[str]] = None) -> None:
+        if order not in ORDERS:
+            raise ValueError(f"Unknown crawl order {order!r}, expected one of {ORDERS}")
+        self.order = order
+        self.key_urls = load_key_urls() if key_urls is None else {canonical_url(url) for url in key_urls}
+        self.boosted_prefixes = tuple(canonical_url(prefix) for prefix in boosted_prefixes)
+
+    def seeds(self, base_url: str) -> list[str]:
+        """Return the key urls on the site at base_url, to be queued when a crawl starts.
+
+        >>> priority = CrawlPriority(key_urls=["https://x.notion.site/Home-660068a07b694305b56c483962e927c5",
+        ...                                    "https://books.toscrape.com/"])
+        >>> priority.seeds("https://x.notion.site/")
+        ['https://x.notion.site/660068a07b694305b56c483962e927c5']
+        """
+        return sorted(url for url in self.key_urls if url.startswith(base_url))
+
+    def is_boosted(self, url: str) -> bool:
+        """Return whether the given canonical url starts with a boosted prefix.
+
+        >>> priority = CrawlPriority(boosted_prefixes=["https://books.toscrape.com/catalogue/"], key_urls=[])
+        >>> priority.is_boosted("https://books.toscrape.com/catalogue/page-2.html")
+        True
+        >>> priority.is_boosted("https://books.toscrape.com/index.html")
+        False
+        """
+        return url.startswith(self.boosted_prefixes) if self.boosted_prefixes else False
+
+    def priority(self, url: str, depth: int, boosted: bool = False) -> float:
+        """Return the priority of the given canonical url found at the given depth.
+        boosted marks a page found beneath a boosted page.
+
+        >>> priority = CrawlPriority(key_urls=["https://x.notion.site/Home-660068a07b694305b56c483962e927c5"])
+        >>> priority.priority("https://x.notion.site/660068a07b694305b56c483962e927c5", depth=3)
+        3.0
+        >>> priority.priority("https://x.notion.site/661606034b8b4598bc5a13a822d27b7c", depth=1, boosted=True)
+        1000001.0
+        >>> priority.priority("https://x.notion.site/661606034b8b4598bc5a13a822d27b7c", depth=1)
+        2000001.0
+        """
+        if url in self.key_urls:
+            tier = KEY_TIER
+        elif boosted or self.is_boosted(url):
+            tier = BOOSTED_TIER
+        else:
+            tier = NORMAL_TIER
+        return float(tier * TIER_SPAN + (depth if self.order == BFS else -depth))
@@ -0,0 +1,122 @@
+"""
+An opt-in request interception policy for crawling.
+
+Only the DOM (and the text extracted from it) is kept from each page, so images, fonts,
+media and third-party scripts (analytics, trackers, embeds) are aborted before they are downloaded.
+"""
+
+from playwright.async_api import BrowserContext, Page, Route
+from urllib.parse import urlparse
+from typing import Optional
+
+# Resource types that do not contribute to the DOM we keep
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# Hosts (and their subdomains) that serve Notion's own app, data and assets
+FIRST_PARTY_HOSTS = ("notion.site", "notion.so", "notion-static.com")
+
+# Typical transfer size in bytes of an aborted resource, used to estimate bytes saved.
+# An aborted request never returns a response, so the real size cannot be known.
+ESTIMATED_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "script": 80_000,
+    "stylesheet": 20_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+class ResourcePolicy:
+    """A request interception policy that aborts non-essential requests.
+
+    Instance Attributes:
+      - allowed_hosts: hosts (including their subdomains) considered first party.
+      - blocked_types: Playwright resource types that are always aborted.
+      - block_third_party: whether to abort every request to a host that is not first party.
+      - blocked_requests: total number of aborted requests.
+      - bytes_saved: total estimated number of bytes not downloaded.
+    """
+    # Private Instance Attributes:
+    #   - _page_stats: page -> [number of aborted requests, estimated bytes saved] since
+    #   the last call to `pop_page_stats` for that page. Dropped when the page is closed.
+
+    allowed_hosts: tuple[str, ...]
+    blocked_types: frozenset[str]
+    block_third_party: bool
+    blocked_requests: int
+    bytes_saved: int
+
+    _page_stats: dict[Page, list[int]]
+
+    def __init__(self, base_url: str, blocked_types: frozenset[str] = BLOCKED_RESOURCE_TYPES,
+                 block_third_party: bool = True) -> None:
+        base_host = urlparse(base_url).hostname or ""
+        self.allowed_hosts = (base_host,) + FIRST_PARTY_HOSTS
+        self.blocked_types = blocked_types
+        self.block_third_party = block_third_party
+        self.blocked_requests = 0
+        self.bytes_saved = 0
+
+        self._page_stats = {}
+
+    async def install(self, context: BrowserContext) -> None:
+        """Route every request of the given browser context through this policy."""
+        await context.route("**/*", self._handle)
+        # Forget the counters of closed pages (e.g. pages that failed before they were reported)
+        context.on("page", lambda page: page.on("close", self._forget_page))
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """Return whether a request of the given url and resource type should be aborted."""
+        if resource_type in self.blocked_types:
+            return True
+        if resource_type == "document" or not self.block_third_party:
+            return False
+
+        host = urlparse(url).hostname
+        if host is None:  # data: and blob: urls
+            return False
+        return not any(host == allowed or host.endswith("." + allowed)
+                       for allowed in self.allowed_hosts)
+
+    def pop_page_stats(self, page: Page) -> tuple[int, int]:
+        """Return (number of aborted requests, estimated bytes saved) for the given page
+        since the last call of this method for that page, and reset the page's counters.
+        """
+        blocked, saved = self._page_stats.pop(page, (0, 0))
+        return blocked, saved
+
+    def _forget_page(self, page: Page) -> None:
+        """Drop the counters of the given (closed) page."""
+        self._page_stats.pop(page, None)
+
+    async def _handle(self, route: Route) -> None:
+        """Abort or continue the given routed request."""
+        request = route.request
+        if not self.should_block(request.url, request.resource_type):
+            await route.continue_()
+            return
+
+        estimate = ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+        self.blocked_requests += 1
+        self.bytes_saved += estimate
+
+        page = self._page_of(route)
+        if page is not None:
+            stats = self._page_stats.setdefault(page, [0, 0])
+            stats[0] += 1
+            stats[1] += estimate
+
+        await route.abort("blockedbyclient")
+
+    @staticmethod
+    def _page_of(route: Route) -> Optional[Page]:
+        """Return the page that issued the routed request, or None if it has no page
+        (e.g. requests from service workers).
+        """
+        try:
+            return route.request.frame.page
+        except Exception:
+            return None
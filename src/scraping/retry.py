@@ -0,0 +1,121 @@
+"""
+Retry policy for links that fail to scrape.
+
+Errors are classified (timeout, navigation error, browser/tab crash, or other), and transient ones
+are retried with jittered exponential backoff, up to a maximum number of attempts per url.
+Every attempt is recorded so that the final failure report shows the whole history.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+TIMEOUT = "timeout"
+NAVIGATION = "navigation"
+CRASH = "crash"
+OTHER = "other"
+
+# Error message fragments of navigation and crash errors raised by Playwright/Chromium
+NAVIGATION_MARKERS = ("net::ERR_", "NS_ERROR_", "Navigation failed", "navigating to")
+CRASH_MARKERS = ("crashed", "Target closed", "has been closed", "Browser closed", "disconnected")
+
+
+@dataclass
+class Attempt:
+    """One failed attempt at scraping a url.
+
+    Instance Attributes:
+      - timestamp: when the attempt failed (seconds since the epoch).
+      - kind: the error class (TIMEOUT, NAVIGATION, CRASH or OTHER).
+      - message: the error message.
+    """
+    timestamp: float
+    kind: str
+    message: str
+
+
+def classify_error(e: BaseException) -> str:
+    """Return the class of the given error: TIMEOUT, NAVIGATION, CRASH or OTHER.
+
+    >>> classify_error(TimeoutError("Timeout 30000ms exceeded."))
+    'timeout'
+    >>> classify_error(Exception("page.goto: net::ERR_CONNECTION_RESET at https://x.notion.site/"))
+    'navigation'
+    >>> classify_error(Exception("Target page, context or browser has been closed"))
+    'crash'
+    >>> classify_error(ValueError("bad html"))
+    'other'
+    """
+    # Playwright's TimeoutError is not a subclass of the built-in one, but has the same name
+    if isinstance(e, TimeoutError) or type(e).__name__ == "TimeoutError":
+        return TIMEOUT
+    message = str(e)
+    if any(marker in message for marker in CRASH_MARKERS):
+        return CRASH
+    if any(marker in message for marker in NAVIGATION_MARKERS):
+        return NAVIGATION
+    return OTHER
+
+
+class RetryPolicy:
+    """Decides whether and when failed urls are retried, and records every attempt.
+
+    Instance Attributes:
+      - max_attempts: maximum number of attempts per url for each error class.
+      Errors of class OTHER (e.g. parse errors) are deterministic and are not retried by default.
+      - base_delay: delay (in seconds) before the first retry.
+      - max_delay: upper bound of the delay (in seconds) before a retry.
+      - total_failures: number of failed attempts over all urls.
+    """
+    # Private Instance Attributes:
+    #   - _history: url -> failed attempts of that url.
+
+    max_attempts: dict[str, int]
+    base_delay: float
+    max_delay: float
+    total_failures: int
+
+    _history: dict[str, list[Attempt]]
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 60.0) -> None:
+        self.max_attempts = {TIMEOUT: max_attempts, NAVIGATION: max_attempts,
+                             CRASH: max_attempts, OTHER: 1}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.total_failures = 0
+
+        self._history = {}
+
+    def record_failure(self, url: str, e: BaseException) -> Optional[float]:
+        """Record a failed attempt at the given url.
+        Return the delay (in seconds) before the url should be retried, or None if it has
+        run out of attempts and should be reported as failed.
+        """
+        kind = classify_error(e)
+        attempts = self._history.setdefault(url, [])
+        attempts.append(Attempt(time.time(), kind, str(e).replace('\n', ' ')))
+        self.total_failures += 1
+
+        if len(attempts) >= self.max_attempts[kind]:
+            return None
+        return self.backoff(len(attempts))
+
+    def backoff(self, attempt: int) -> float:
+        """Return the jittered delay (in seconds) before retrying after the given number of attempts:
+        a random delay between half and all of base_delay * 2 ** (attempt - 1), capped at max_delay.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def attempts(self, url: str) -> list[Attempt]:
+        """Return the failed attempts recorded for the given url."""
+        return self._history.get(url, [])
+
+    def describe(self, url: str) -> str:
+        """Return a one-line description of the failed attempts of the given url."""
+        return "; ".join(
+            f"attempt {i} at {time.strftime('%H:%M:%S', time.localtime(attempt.timestamp))} "
+            f"({attempt.kind}): {attempt.message}"
+            for i, attempt in enumerate(self.attempts(url), start=1)
+        )
@@ -2,27 +2,58 @@
 This file contains:
 1. A dynamic, recursive web scraper (`SoupsMaker`);
 2. A function to run the scraper (`run_soupsmaker`);
-3. A function for a simple single page text extracter (`scrape_single_page`).
+3. A function for a simple single page text extracter (`scrape_single_page`);
+4. An async function that extracts the text of several pages concurrently (`scrape_pages`);
+5. The page load sequence (navigate, settle, "proceed anyway") shared by both (`load_until_settled`).
 """
 
-from playwright.async_api import async_playwright, BrowserContext, Page
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import asyncio
 import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 
 import os
 import sys
-from typing import Optional
+from typing import Any, Awaitable, Callable, Container, ContextManager, Iterable, Optional
+import contextlib
+import hashlib
 import csv
+import itertools
 import json
 
 from src.file_config import *
+from src.scraping.settle import (
+    install_settle_tracker, install_settle_tracker_sync, wait_for_settle, wait_for_settle_sync,
+    DEFAULT_QUIET_MS, DEFAULT_MAX_WAIT, DEFAULT_MAX_SCROLLS
+)
+from src.scraping.resource_policy import ResourcePolicy
+from src.scraping.parsing import ParsedPage, parse_page
+from src.scraping.extract import EXTRACT_SCRIPT, parsed_from_payload
+from src.scraping.doc_store import DocStore, blocks_jsonl, doc_key, json_doc
+from src.scraping.archive import HtmlArchive
+from src.scraping.visited import KEY_BYTES, KeySet, VisitedUrls
+from src.scraping.link_graph import LinkGraph
+from src.scraping.crawl_state import CrawlState
+from src.scraping.incremental import probe_last_edited, text_fingerprint, unchanged_urls
+from src.scraping.urls import notion_page_id, canonical_url
+from src.scraping.concurrency import AimdController
+from src.scraping.frontier import Frontier
+from src.scraping.priority import BFS, CrawlPriority
+from src.scraping.tabs import EVALUATE_GRACE, TabPool
+from src.scraping.cache_stats import CacheStats
+from src.scraping.instrumentation import CrawlTracer
+from src.scraping.retry import RetryPolicy
 
 URL = "https://utat-ss.notion.site/UTAT-Space-Systems-660068a07b694305b56c483962e927c5"
 BASE_URL = "https://utat-ss.notion.site/"
 
+OUTER_HTML_SCRIPT = "() => document.documentElement.outerHTML"
+
 class SoupsMaker():
     """Represents the process of
     "making soups" given one ingredient (the url).
@@ -31,138 +62,594 @@ class SoupsMaker():
     SoupsMaker: what it does
         1. Deep crawls all subpages of the given url.
         2. Saves html docs (if enabled) and extracted text of visited pages.
-        3. Saves all visted links to csv after finished scraping all links
-        4. (Handled by `run_soupsmaker`) if interrupted, save links to visit and links visited as progress.
+        3. Records the status of every link in a SQLite crawl state, committed every few pages,
+        so that an interrupted (or killed) crawl can be resumed.
+        4. Saves all visted links to csv after finished scraping all links
     
     Instance Attributes:
       - url: the given url tuple in the form of (url, base_url), where base_url is the base site to be scraped.
-      - links: all the distict urls associated with the starting url.
+      - links: all the distict pages associated with the starting url, stored compactly
+      as 16-byte page keys (see `VisitedUrls`), so url variants of a page are the same member.
       - to_visit: set of url tuples that are yet to be visited.
+      - visited_bloom_capacity: if not None, lookups in self.links are pre-checked with a Bloom
+      filter sized for this many pages.
       - failed_links: link_err tuple that are failed to scrape (e.g. an error occurred)
-      - cap: maximum number of links to be processed at a time.
+      after all retries.
+      - retry_policy: decides which failed links are retried and when (see `RetryPolicy`),
+      and records the attempt history of each link.
+      - cap: maximum number of links to be processed at a time (i.e. the number of crawl workers).
+      - adaptive_cap: whether to adapt the number of active tabs between min_cap and cap
+      to page-load latency, errors, throttling and memory (see `AimdController`).
+      The adjustments are logged to concurrency_log_path (concurrency_timeline.csv by default).
+      - min_cap: minimum number of active tabs when adaptive_cap is enabled.
+      - max_rss: memory (in bytes) of the crawler and its browser above which the number of active
+      tabs is reduced, when adaptive_cap is enabled. None means no memory limit.
       - resume: whether resume from previous progress or not (start fresh). Default to False.
-      - save_html: whether saving scraped html files.
+      - checkpoint_every: number of finished pages between commits of the crawl state.
+      - crawl_state: the SQLite store of crawl progress (see `CrawlState`).
+      - graph: the link graph of the crawl (every link found on every crawled page, with the depth
+      and discovery order of every page, see `LinkGraph`) stored at graph_path,
+      or None if record_graph is False.
+      - incremental: whether to refresh a previously crawled site. Every known page is probed
+      for its Notion last-edited time, and only changed pages (and newly found links) are rendered
+      and saved again. Pages saved by a non-incremental run have no recorded last-edited time yet,
+      so the first incremental run renders them and only compares their extracted text.
+      - pages_unchanged: number of pages skipped or not saved again because they have not changed.
+      - pages_partial: number of pages saved before they finished loading (see page_timeout
+      and max_scrolls). Their json docs have "partial": true.
+      - duplicates_prevented: number of url variants (e.g. a different title slug) found for
+      pages that were already visited or queued, each of which would have been rendered again.
+      - save_html: whether saving scraped html files (prettified, one file per page).
+      - archive: if not None, the raw html of every saved page is appended to this compressed
+      archive in archive_dir (see `HtmlArchive`), which takes far less space than save_html.
       - save_text: whether saving extracted raw text files.
       - save_json: whether saving json files that has page content and source.
-      Warning: If mode is resume, only enable `save_html` if you are consistent with previous sessions.
-      Otherwise, it will result in mismatch of html docs and text docs.
+      - save_blocks: whether saving the typed Notion blocks of every page (headings, list items,
+      table rows, callouts, code...) with their block IDs as JSONL files (see `Block`),
+      for structure-aware chunking.
+      - settle_quiet_ms: how long (in milliseconds) the page must stay quiet (no DOM changes,
+      no pending Notion API calls, no height change) before it is considered fully rendered.
+      - settle_max_wait: maximum time (in seconds) to wait for a page to settle.
+      - max_scrolls: maximum number of times scrolling to the bottom may load more content
+      before a page that keeps growing is captured as it is (0 for no limit).
+      - page_timeout: wall-clock budget (in seconds) of loading one url, including navigation,
+      settling and the "proceed anyway" interstitial. When it runs out, whatever html is
+      available is kept and the page is saved as partial.
+      - block_resources: whether to abort images, fonts, media and third-party requests
+      (e.g. analytics) while crawling. See `ResourcePolicy`.
+      - parser: the html parser backend, one of "html.parser", "lxml" (faster) or "selectolax" (fastest).
+      - parse_workers: number of processes used to parse html off the event loop.
+      If 0, html is parsed on the event loop.
+      - parse_seconds_off_loop: total time spent parsing in the process pool instead of on the event loop.
+      - extract_in_browser: whether to extract links and text in the browser instead of
+      fetching the full html and parsing it in Python. Saved html (if enabled) is not prettified.
+      - doc_store: where html, text, and json docs are saved (named after each page, so
+      `save_html` etc. can be toggled between sessions in resume mode).
+      - trace: whether to append a per-phase timing record of every page to crawl_trace.jsonl
+      and print live throughput and phase percentiles (see `CrawlTracer`).
+      - tracer: records how long each page spends in each phase of crawling.
+      - headless: whether to run the browser without a window. On Linux without a display,
+      the browser always runs headless.
+      - user_data_dir: a persistent browser profile directory (e.g. BROWSER_PROFILE_DIR), so that
+      the browser's HTTP cache of static assets survives between runs, or None for a fresh profile
+      every run. With a profile, the cache hit ratio and bytes not downloaded are reported.
+      Note that request interception (block_resources) disables the HTTP cache.
+      - cache_stats: the HTTP cache statistics of the current run, if user_data_dir is given.
+      - priority: the order in which queued links are crawled: key urls (key_urls.json, seeded
+      into the frontier when the crawl starts) first, then pages under boosted url prefixes
+      and every page found beneath them, then the rest, breadth- or depth-first
+      (see `CrawlPriority`).
+      - max_pages: maximum number of pages to crawl in this run, or None for no limit.
+      - max_seconds: maximum crawl time (in seconds) of this run, or None for no limit.
+      Pages still being crawled when time runs out are visited again on resume.
+      - max_depth: maximum number of links away from the starting url to follow,
+      or None for no limit.
+      - tab_max_navigations: number of pages a tab crawls before it is closed and replaced.
+      - tab_max_js_heap: JS heap (in bytes) above which a tab is replaced, or None for no limit.
+      - recycle_rss: memory (in bytes) of the crawler and its browser above which the browser
+      context is replaced with a fresh one, or None for no limit. See `TabPool`.
+      - on_page: awaited with every page whose content is new or changed (after its docs are
+      saved, if enabled), e.g. to stream it into the vector store (see `stream_ingest.py`).
+      - context: the playwright browser context new tabs are opened in, while crawling.
     """
     # Private Instance Attributes:
-    #   - _context: the playwright browser context used to fetch pages.
-    #   - _pages: store browswer tabs that will stay oepn throgh the lifetime of SoupsMaker.
-    #   - _page_lock: an asyncio lock to prevent race condition when allocating pages.
+    #   - _playwright: the running playwright instance, while crawling.
+    #   - _browser: the browser, while crawling. Relaunched if it crashes.
+    #   - _tabs: the pool of tabs used to fetch pages, while crawling.
+    #   - _tab_log_path: the csv file retired tabs are logged to.
+    #   - _concurrency_log_path: the csv file the adaptive concurrency adjustments are logged to.
+    #   - _frontier: the queue of url tuples that the crawl workers pull from,
+    #   with a low-priority lane for retries.
+    #   - _in_flight: url tuples that are currently being processed by a worker.
+    #   - _resource_policy: the request interception policy in use, if block_resources is enabled.
+    #   - _parse_pool: the process pool used to parse html, if parse_workers > 0 and crawling.
+    #   - _parse_slots: a semaphore bounding the number of pages in flight in the parse pool.
+    #   - _unchanged: urls that the incremental probe found unchanged since the last run.
+    #   - _last_edited: Notion page ID -> last-edited time, as probed in incremental mode.
+    #   - _controller: the adaptive concurrency controller, if adaptive_cap is enabled and crawling.
+    #   - _variants: 16-byte hashes of every url (as found on pages) seen so far,
+    #   to count each duplicate variant once.
+    #   - _depth: url -> number of links away from the starting url, for queued urls.
+    #   - _boosted: queued urls found beneath a boosted page.
+    #   - _pages_started: number of pages taken from the frontier in this run.
+    #   - _budget_reached: set when max_pages pages have been taken from the frontier.
 
     starting_url: tuple[str, str] = URL, BASE_URL
-    links: set[str]
+    links: VisitedUrls
     to_visit: set[tuple[str, str]]
     failed_links: set[tuple[str, Exception]]
+    visited_bloom_capacity: Optional[int]
+    graph: Optional[LinkGraph]
+    retry_policy: RetryPolicy
     cap: int = 10
+    adaptive_cap: bool
+    min_cap: int
+    max_rss: Optional[int]
     resume: bool
+    checkpoint_every: int
+    crawl_state: CrawlState
+    incremental: bool
+    pages_unchanged: int
+    pages_partial: int
+    duplicates_prevented: int
     
     save_html: bool
+    archive: Optional[HtmlArchive]
     save_text: bool
     save_json: bool
-
-    _context: Optional[BrowserContext] = None
-    _pages: list[Page]
-    _page_lock: asyncio.Lock
+    save_blocks: bool
+    settle_quiet_ms: int
+    settle_max_wait: float
+    max_scrolls: int
+    page_timeout: float
+    block_resources: bool
+    parser: str
+    parse_workers: int
+    parse_seconds_off_loop: float
+    extract_in_browser: bool
+    doc_store: DocStore
+    trace: bool
+    tracer: CrawlTracer
+    headless: bool
+    user_data_dir: Optional[Path]
+    cache_stats: Optional[CacheStats]
+    priority: CrawlPriority
+    max_pages: Optional[int]
+    max_seconds: Optional[float]
+    max_depth: Optional[int]
+    tab_max_navigations: int
+    tab_max_js_heap: Optional[int]
+    recycle_rss: Optional[int]
+    on_page: Optional[Callable[[ParsedPage], Awaitable[None]]]
+    context: Optional[BrowserContext]
+
+    _playwright: Optional[Playwright]
+    _browser: Optional[Browser]
+    _tabs: Optional[TabPool]
+    _tab_log_path: Path
+    _concurrency_log_path: Path
+    _frontier: Frontier
+    _in_flight: set[tuple[str, str]]
+    _resource_policy: Optional[ResourcePolicy]
+    _parse_pool: Optional[ProcessPoolExecutor]
+    _parse_slots: asyncio.Semaphore
+    _unchanged: set[str]
+    _last_edited: dict[str, int]
+    _variants: KeySet
+    _controller: Optional[AimdController]
+    _depth: dict[str, int]
+    _boosted: set[str]
+    _pages_started: int
+    _budget_reached: asyncio.Event
     
 
     def __init__(self, starting_url: tuple[str, str] = (URL, BASE_URL), 
                  cap: int = 10, resume: bool = False, save_html: bool = False,
-                 save_text: bool = False, save_json: bool = True) -> None:
+                 save_text: bool = False, save_json: bool = True,
+                 settle_quiet_ms: int = DEFAULT_QUIET_MS,
+                 settle_max_wait: float = DEFAULT_MAX_WAIT,
+                 block_resources: bool = False, parser: str = "html.parser",
+                 parse_workers: int = 2, extract_in_browser: bool = False,
+                 checkpoint_every: int = 20, incremental: bool = False,
+                 adaptive_cap: bool = False, min_cap: int = 2,
+                 max_rss: Optional[int] = None, max_attempts: int = 3,
+                 trace: bool = True, headless: bool = False, order: str = BFS,
+                 boosted_prefixes: tuple[str, ...] = (), max_pages: Optional[int] = None,
+                 max_seconds: Optional[float] = None, max_depth: Optional[int] = None,
+                 tab_max_navigations: int = 100, tab_max_js_heap: Optional[int] = None,
+                 recycle_rss: Optional[int] = None, max_scrolls: int = DEFAULT_MAX_SCROLLS,
+                 page_timeout: float = 60.0,
+                 on_page: Optional[Callable[[ParsedPage], Awaitable[None]]] = None,
+                 user_data_dir: Optional[Path] = None, archive_html: bool = False,
+                 visited_bloom_capacity: Optional[int] = None, record_graph: bool = True,
+                 save_blocks: bool = False, graph_path: Path = LINK_GRAPH_PATH,
+                 archive_dir: Path = ARCHIVE_DIR,
+                 concurrency_log_path: Path = CONCURRENCY_LOG_PATH) -> None:
         
-        self.starting_url = starting_url
+        self.starting_url = canonical_url(starting_url[0]), starting_url[1]
         self.failed_links = set()
+        self.visited_bloom_capacity = visited_bloom_capacity
+        self.graph = LinkGraph(graph_path, commit_every=checkpoint_every) if record_graph else None
+        self.retry_policy = RetryPolicy(max_attempts=max_attempts)
         self.cap = cap
+        self.adaptive_cap = adaptive_cap
+        self.min_cap = min_cap
+        self.max_rss = max_rss
         self.resume = resume
+        self.checkpoint_every = checkpoint_every
+        self.incremental = incremental
+        self.pages_unchanged = 0
+        self.pages_partial = 0
+        self.duplicates_prevented = 0
         self.save_html = save_html
+        self.archive = HtmlArchive(archive_dir) if archive_html else None
         self.save_text = save_text
         self.save_json = save_json
-
-        self._context = None
-        self._pages = []
-        self._page_lock = asyncio.Lock()
+        self.save_blocks = save_blocks
+        self.settle_quiet_ms = settle_quiet_ms
+        self.settle_max_wait = settle_max_wait
+        self.max_scrolls = max_scrolls
+        self.page_timeout = page_timeout
+        self.block_resources = block_resources
+        self.parser = parser
+        self.parse_workers = parse_workers
+        self.parse_seconds_off_loop = 0.0
+        self.extract_in_browser = extract_in_browser
+        self.doc_store = DocStore()
+        self.trace = trace
+        self.tracer = CrawlTracer()
+        self.headless = headless
+        self.user_data_dir = user_data_dir
+        self.cache_stats = None
+        self.priority = CrawlPriority(order, boosted_prefixes)
+        self.max_pages = max_pages
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self.tab_max_navigations = tab_max_navigations
+        self.tab_max_js_heap = tab_max_js_heap
+        self.recycle_rss = recycle_rss
+        self.on_page = on_page
+        self.context = None
+
+        self._playwright = None
+        self._browser = None
+        self._tabs = None
+        self._tab_log_path = TAB_LOG_PATH
+        self._concurrency_log_path = concurrency_log_path
+        self._frontier = Frontier()
+        self._in_flight = set()
+        self._resource_policy = None
+        self._parse_pool = None
+        self._parse_slots = asyncio.Semaphore(max(1, 2 * parse_workers))
+        self._unchanged = set()
+        self._last_edited = {}
+        self._variants = KeySet()
+        self._controller = None
+        self._depth = {}
+        self._boosted = set()
+        self._pages_started = 0
+        self._budget_reached = asyncio.Event()
 
         self._start_by_mode()  # intialize self.links and self.to_visit based on the mode 
 
     async def main(self) -> None:
         """Control the soups baking process. 
-        Lannch a playwright broswer, find all subpages of self.starting_url, 
+        Crawl all subpages of self.starting_url (see `crawl`),
+        then save all links visited and failed links.
+        """
+        await self.crawl()
+        self.crawl_state.checkpoint()
+        if self.graph is not None:
+            self.graph.checkpoint()
+
+        # Save all failed links
+        self.save_failed_links()
+
+        # Save all visited links
+        self.save_all_links()
+
+    async def crawl(self) -> None:
+        """Lannch a playwright broswer, find all subpages of self.starting_url, 
         extract htmls and text from those pages and save locally.
-        After finished, save all links visited and failed links and close the browser.
+        After finished, close the browser.
         """
-        async with async_playwright() as p:
-            # Launch real Chromium
-            browser = await p.chromium.launch(
-                headless=False  # set True later once confirmed working
-            )
+        if not self.headless and sys.platform.startswith("linux") \
+                and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+            print("No display found, running the browser headless.")
+            self.headless = True
 
-            context = await browser.new_context(
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/131.0.0.0 Safari/537.36"
-                )
-            )
+        async with async_playwright() as p:
+            self._playwright = p
+            if self.block_resources:
+                self._resource_policy = ResourcePolicy(self.starting_url[1])
+                if self.user_data_dir is not None:
+                    print("Warning: blocking resources disables the browser's HTTP cache.")
+            if self.user_data_dir is not None:
+                self.cache_stats = CacheStats()
+            if self.adaptive_cap:
+                self._controller = AimdController(self.min_cap, self.cap, max_rss=self.max_rss,
+                                                  base_url=self.starting_url[1],
+                                                  log_path=self._concurrency_log_path)
+            # Only one browser at a time may use a persistent profile
+            self._tabs = TabPool(self._new_context, self.cap, max_navigations=self.tab_max_navigations,
+                                 max_js_heap=self.tab_max_js_heap, max_rss=self.recycle_rss,
+                                 exclusive=self.user_data_dir is not None, log_path=self._tab_log_path)
+            await self._tabs.start()
             print("Browser launched!")
 
-            # Set context to current context
-            self.context = context
+            if self.parse_workers > 0:
+                # Never fork a process running Playwright's threads (see sharding.py)
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                                       mp_context=multiprocessing.get_context("spawn"))
+            if self.trace:
+                self.tracer.open()
 
             try: 
+                if self.incremental:
+                    await self._probe_known_pages()
                 await self.add_all_links()
             except Exception as e:
                 print("An error occurs when adding all links. Error:", e)
 
             # Clean up
-            await browser.close()
+            await self._tabs.close()
+            if self._browser is not None:
+                await self._browser.close()
+            self._tabs = None
+            self._browser = None
+            self._playwright = None
             self.context = None
-            
-        # Save all failed links
-        self.save_failed_links()
-        
-        # Save all visited links
+            if self.trace:
+                self.tracer.close()
+            if self.archive is not None:
+                stats = self.archive.stats()
+                self.archive.close()
+                print(f"HTML archive: {stats['pages']} pages in {stats['stored_bytes'] / 1e6:.1f} MB "
+                      f"({stats['raw_bytes'] / 1e6:.1f} MB of raw html).")
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown(cancel_futures=True)
+                self._parse_pool = None
+                print(f"Spent {self.parse_seconds_off_loop:.1f} seconds parsing off the event loop in total.")
+
+        if self.cache_stats is not None:
+            print(self.cache_stats.summary())
+        if self._resource_policy is not None:
+            print(f"Blocked {self._resource_policy.blocked_requests} requests, an estimated "
+                  f"{self._resource_policy.bytes_saved / 1e6:.1f} MB not downloaded in total "
+                  f"(estimated per resource type).")
+
+    async def _new_context(self) -> BrowserContext:
+        """Open a new browser context (launching the browser if it is not running)
+        with the settle tracker, the resource policy and the concurrency controller installed,
+        and set it as self.context.
+        With a persistent profile (self.user_data_dir), the context is the browser itself,
+        and the tab pool closes the previous one first (see `TabPool.exclusive`).
+        """
+        user_agent = (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/131.0.0.0 Safari/537.36"
+        )
+        if self.user_data_dir is not None:
+            # Launch real Chromium with the persistent profile
+            context = await self._playwright.chromium.launch_persistent_context(
+                self.user_data_dir, headless=self.headless, user_agent=user_agent
+            )
+        else:
+            if self._browser is None or not self._browser.is_connected():
+                # Launch real Chromium
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            context = await self._browser.new_context(user_agent=user_agent)
+
+        await install_settle_tracker(context)
+        if self.cache_stats is not None:
+            context.on("page", self.cache_stats.attach)
+        if self._resource_policy is not None:
+            await self._resource_policy.install(context)
+        if self._controller is not None:
+            context.on("response",
+                       lambda response: self._controller.record_status(response.status, response.url))
+
+        # Set context to current context
+        self.context = context
+        return context
+
+    def _new_visited(self, urls: Iterable[str] = ()) -> VisitedUrls:
+        """Return a set of visited pages holding the given urls (see self.visited_bloom_capacity)."""
+        return VisitedUrls(urls, bloom_capacity=self.visited_bloom_capacity)
+
+    def save_all_links(self) -> None:
+        """Save all visited links (self.links) to all_links_visited.csv,
+        writing at most 10 items each row.
+        """
         with open(ALL_LINKS_PATH, 'w', newline='') as f:
-            data = list(self.links)
+            # self.links only holds page keys: stream the urls from the crawl state
+            urls = self.crawl_state.visited()
             num_columns = 10    # write at most 10 items per row
             writer = csv.writer(f, delimiter=',')
-            for i in range(0, len(data), num_columns):
-                writer.writerow(data[i:i + num_columns])
+            while row := list(itertools.islice(urls, num_columns)):
+                writer.writerow(row)
             
             print("####### All links added!! #######")
             print("Total number of links added: ", len(self.links))
+            print("Duplicate renders prevented by canonical urls: ", self.duplicates_prevented)
+            if self.incremental:
+                print("Pages unchanged since the last run: ", self.pages_unchanged)
+            print("Pages saved before they finished loading: ", self.pages_partial)
+
+    async def _probe_known_pages(self) -> None:
+        """Find the pages in self.to_visit that have not changed since they were last saved
+        (see `_probe_pages`).
+        """
+        unchanged = await self._probe_pages(self.to_visit)
+        print(f"Probed {len(self.to_visit)} known pages, {unchanged} unchanged since the last run.")
+
+    async def _probe_pages(self, url_tuples: Iterable[tuple[str, str]]) -> int:
+        """Add the given pages that have not changed since they were last saved to self._unchanged,
+        by comparing their Notion last-edited time (probed in batches, without rendering)
+        with their recorded fingerprint. Return the number of unchanged pages found.
+        """
+        urls = [url for url, _ in url_tuples]
+        page_ids = {notion_page_id(url) for url in urls} - {None}
+        self._last_edited.update(await probe_last_edited(self.context.request, self.starting_url[1],
+                                                         list(page_ids)))
+
+        unchanged = unchanged_urls(urls, self._last_edited, self.crawl_state.get_fingerprint)
+        self._unchanged.update(unchanged)
+        return len(unchanged)
 
     async def add_all_links(self) -> None:
         """Add all links associated with (i.e. accessible by) the given url to links.
+
+        Links are crawled from a long-lived frontier queue by self.cap persistent workers.
+        Each worker pulls the next link as soon as it finishes its current one, so a single
+        slow page never holds up the other tabs.
+
+        The crawl stops early when the page or time budget is reached. Links that have not been
+        crawled yet stay in self.to_visit (and pending in the crawl state) for the next run.
         """
+        self._seed_key_urls()
+        self._frontier = Frontier()
+        for url_tuple in self.to_visit:
+            self._frontier.put_nowait(url_tuple, self._priority_of(url_tuple[0]))
+
+        workers = [asyncio.create_task(self._crawl_worker()) for _ in range(self.cap)]
+        finished = asyncio.create_task(self._frontier.join())
+        budget_reached = asyncio.create_task(self._budget_reached.wait())
+        try:
+            # Wait until every queued link (including newly found ones) has been processed,
+            # or a budget is reached
+            await asyncio.wait({finished, budget_reached}, timeout=self.max_seconds,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if not finished.done():
+                if budget_reached.done():
+                    print(f"Page budget of {self.max_pages} pages reached, finishing pages in flight.")
+                    while self._in_flight:
+                        await asyncio.sleep(0.1)
+                else:
+                    print(f"Time budget of {self.max_seconds} seconds reached.")
+                print(f"{len(self.to_visit)} links left to visit, run in resume mode to continue.")
+        finally:
+            finished.cancel()
+            budget_reached.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._requeue_in_flight()
+
+    def _seed_key_urls(self) -> None:
+        """Queue the key urls of the site (see `CrawlPriority.seeds`) that have not been visited
+        or queued yet, so that they are crawled first even before any crawled page links to them.
+        """
+        base_url = self.starting_url[1]
+        seeds = [(url, base_url) for url in self.priority.seeds(base_url)
+                 if url not in self.links and (url, base_url) not in self.to_visit]
+        if seeds:
+            self.to_visit.update(seeds)
+            self.crawl_state.add_pending(seeds)
+            print(f"Seeded {len(seeds)} key urls into the frontier.")
+
+    async def _crawl_worker(self) -> None:
+        """Repeatedly take a link from the frontier, process it,
+        and put newly found links back into the frontier.
+        """
+        while True:
+            # With an adaptive cap, only self._controller.limit workers may be active at a time
+            if self._controller is not None:
+                await self._controller.acquire()
+            try:
+                url_this_time = await self._frontier.get()
+                if self.max_pages is not None and self._pages_started >= self.max_pages:
+                    # Leave the link in self.to_visit for the next run
+                    self._frontier.task_done()
+                    self._budget_reached.set()
+                    return
+                self._pages_started += 1
+                if self._pages_started == self.max_pages:
+                    self._budget_reached.set()
+                await self._process_from_frontier(url_this_time)
+            finally:
+                if self._controller is not None:
+                    self._controller.release()
+
+    async def _process_from_frontier(self, url_this_time: tuple[str, str]) -> None:
+        """Process a url tuple taken from the frontier and queue the links found on it."""
+        self.to_visit.discard(url_this_time)
+        self._in_flight.add(url_this_time)
+        failures_before = self.retry_policy.total_failures
+        start = time.monotonic()
+        self.tracer.start_page(url_this_time[0])
+        try:
+            new_links = await self.process_link(url_this_time)
+        except Exception as e:
+            print("An error occurs when processing a link. Error:", e)
+            self._handle_failure(url_this_time, e)
+            new_links = None
+
+        failed = self.retry_policy.total_failures > failures_before
+        if not failed:
+            self.tracer.finish_page("ok" if new_links is not None else "skipped")
+        else:
+            self.tracer.finish_page("retry" if url_this_time in self.to_visit else "failed")
+        if self._controller is not None:
+            self._controller.record_page(time.monotonic() - start, failed=failed)
+
+        self._in_flight.discard(url_this_time)
+        self._on_link_processed(url_this_time, new_links)
+        self._frontier.task_done()
+
+    def _priority_of(self, url: str) -> float:
+        """Return the frontier priority of the given queued url."""
+        return self.priority.priority(url, self._depth.get(url, 0), url in self._boosted)
+
+    def _handle_failure(self, url_this_time: tuple[str, str], e: Exception) -> None:
+        """Schedule the given failed url tuple for a retry in the frontier's retry lane
+        (see `RetryPolicy`), or add it to self.failed_links if it has run out of attempts.
+        """
+        url = url_this_time[0]
+        delay = self.retry_policy.record_failure(url, e)
+        if delay is not None:
+            # Forget the visit so that the link is processed again
+            self.links.discard(url)
+            self.to_visit.add(url_this_time)
+            self.crawl_state.requeue(url_this_time)
+            self._frontier.put_retry(url_this_time, delay)
+            print(f"Link will be retried in {delay:.1f} seconds "
+                  f"(attempt {len(self.retry_policy.attempts(url))} failed).")
+        else:
+            self.failed_links.add((url, e))
+            self.crawl_state.mark_failed(url_this_time, self.retry_policy.describe(url))
+            print("Failed link added to self.failed_links")
 
-        # Process links in to_visit iteratively
-        while self.to_visit:
-            # Create batch of links
-            batch = set()
-            while self.to_visit and len(batch) < self.cap: # stop if batch is full or to_visit is empty
-                # Do not create tasks if the link has been processed before
-                hold = self.to_visit.pop()
-                if hold[0] in self.links:
-                    continue
-                batch.add(hold)
-
-            # Create asyncio tasks
-            tasks = [asyncio.create_task(self.process_link(url_this_time))
-                        for url_this_time in batch]
-            
-            # Process links asynchronously
-            lists_of_links = await asyncio.gather(*tasks)
-
-            for links in lists_of_links:
-                if links is not None:
-                    for link in links:
-                        if link[0] not in self.links:  # clean unnecessary links
-                            self.to_visit.add(link)
-                
-            print(f"Number of links in to_visit: {len(self.to_visit)}")
-            # print("And the links are: ", {url for url, _ in self.to_visit})
+    def _on_link_processed(self, url_this_time: tuple[str, str],
+                           new_links: Optional[set[tuple[str, str]]]) -> None:
+        """Add links found on a processed page to self.to_visit and the frontier,
+        skipping links that have been visited or are already queued.
+        """
+        if new_links is None:
+            return
+
+        if self.graph is not None:
+            self.graph.record_page(url_this_time[0], sorted(link for link, _ in new_links),
+                                   self._depth.get(url_this_time[0], 0))
+        depth = self._depth.pop(url_this_time[0], 0) + 1
+        # Pages found beneath a boosted page are boosted too
+        boosted = url_this_time[0] in self._boosted or self.priority.is_boosted(url_this_time[0])
+        self._boosted.discard(url_this_time[0])
+        if self.max_depth is not None and depth > self.max_depth:
+            return
+
+        found = [link for link in new_links
+                 if link[0] not in self.links and link not in self.to_visit]  # clean unnecessary links
+        for link in found:
+            self.to_visit.add(link)
+            self._depth[link[0]] = depth
+            if boosted:
+                self._boosted.add(link[0])
+            self._frontier.put_nowait(link, self.priority.priority(link[0], depth, boosted))
+        self.crawl_state.add_pending(found, depth)
+
+        print(f"Number of links in to_visit: {len(self.to_visit)}")
 
     async def process_link(self, url_this_time: tuple[str, str]) -> Optional[set[tuple[str, str]]]:
         """Process the given url tuple and return a new set of url tuples as new found links.
@@ -172,165 +659,218 @@ class SoupsMaker():
         """
 
         url, base_url = url_this_time
+        url = canonical_url(url)
+        url_this_time = url, base_url
 
         # Return None is this link has already been visited
         if url in self.links:
             return
         # Immediately add to self.links
         self.links.add(url)
+        self.crawl_state.mark_in_progress(url_this_time)
+
+        # Skip pages that the probe found unchanged since the last run
+        if url in self._unchanged:
+            self.crawl_state.mark_done(url_this_time)
+            self.pages_unchanged += 1
+            print("Page unchanged since the last run, skipped.")
+            return
 
         # Find links for this page
-        more_this_time = set()
         try:
-            soup = self.bake_soup(await self.get_html(url))
+            if self.extract_in_browser:
+                parsed = await self.extract_page(url, base_url)
+                html = parsed.html
+            else:
+                html, partial = await self.get_html(url)
+                parsed = await self.parse_html(html, url, base_url)
+                parsed.partial = partial
         except Exception as e:
             print("An error occurs when getting html or baking soup. Error:", e)
-            self.failed_links.add((url, e))
-            print("Failed link added to self.failed_links")
+            self._handle_failure(url_this_time, e)
             return
 
-        # Save prettified html, extracted text, and json files
-        self.save_docs(soup, url)
-                
-        for link in soup.find_all('a'):
-            new_link = link.get('href')
-            if new_link is None:
-                continue
+        # Save prettified html, extracted text, and json files (unless the text has not changed)
+        text_hash = text_fingerprint(parsed.text)
+        fingerprint = self.crawl_state.get_fingerprint(url)
+        if self.incremental and fingerprint is not None and fingerprint[1] == text_hash:
+            self.pages_unchanged += 1
+            print("Page content unchanged since the last run, not saved again.")
+        else:
+            with self.tracer.span("save"):
+                self.save_docs(parsed, html)
+            if self.on_page is not None:
+                await self.on_page(parsed)
+        self.pages_partial += parsed.partial
+        # Without a last-edited time, the next incremental run renders a partial page again
+        last_edited = None if parsed.partial else self._last_edited.get(notion_page_id(url) or "")
+        self.crawl_state.set_fingerprint(url, last_edited, text_hash)
+        self.crawl_state.mark_done(url_this_time)
+
+        return self._canonicalise_links(parsed.links)
+
+    def _canonicalise_links(self, found: set[tuple[str, str]]) -> set[tuple[str, str]]:
+        """Return the given url tuples with every url replaced by its canonical form (see `canonical_url`),
+        so that variants of the same Notion page are only queued and rendered once.
+        Count the new variants of already known pages in self.duplicates_prevented.
+        The urls are interned, so a page found on many pages (or parsed in the process pool)
+        is one string in self.to_visit, self._depth and the frontier, and all tuples share one base url.
+        """
+        canonical = set()
+        for link, base_url in found:
+            key = sys.intern(canonical_url(link))
+            base_url = sys.intern(base_url)
+            variant = hashlib.blake2b(link.encode("utf-8"), digest_size=KEY_BYTES).digest()
+            if self._variants.add(variant):
+                if key in self.links or (key, base_url) in self.to_visit or (key, base_url) in canonical:
+                    self.duplicates_prevented += 1
+            canonical.add((key, base_url))
+        return canonical
+
+    async def parse_html(self, html: str, url: str, base_url: str) -> ParsedPage:
+        """Parse the given html of the page at url, extracting its text and same-base links.
+        If parse_workers > 0, parsing runs in a process pool (with at most 2 * parse_workers
+        pages in flight) so that it does not block the event loop.
+        """
+        if self._parse_pool is None:
+            with self.tracer.span("parse"):
+                parsed = parse_page(html, url, base_url, self.parser, self.save_html, self.save_blocks)
+            print(f"## soup baked in {parsed.parse_seconds * 1000:.0f} ms ##")
+            return parsed
+
+        loop = asyncio.get_running_loop()
+        with self.tracer.span("parse"):
+            async with self._parse_slots:
+                parsed = await loop.run_in_executor(self._parse_pool, parse_page, html, url, base_url,
+                                                    self.parser, self.save_html, self.save_blocks)
+
+        self.parse_seconds_off_loop += parsed.parse_seconds
+        print(f"## soup baked off the event loop in {parsed.parse_seconds * 1000:.0f} ms ##")
+        return parsed
+
+    async def get_html(self, url: str) -> tuple[str, bool]:
+        """Return html document for a given url, and whether it is partial
+        (captured before the page finished loading, see self.page_timeout).
 
-            # Convert relative URLs to absolute and remove query and fragment parts
-            new_link = urlparse(urljoin(url, new_link))._replace(query=None, fragment=None).geturl()
+        Preconditions:
+        - the url does not prevent playwright automation. 
+        """
+        deadline = time.monotonic() + self.page_timeout
+        tab = await self._tabs.checkout()
+        try:
+            page, partial = await self.load_page(url, tab.page, deadline)
 
-            # Only keep links within the same base
-            if not new_link.startswith(base_url):
-                continue
-            
-            more_this_time.add((new_link, base_url))
+            # Get page html and return
+            # html = await page.content()
 
-            # See what links are found each time (these are not added to self.links yet)
-            # print("Links found this time: ", {url for url, _ in more_this_time})
+            # Trying a different way to get html
+            with self.tracer.span("evaluate"):
+                html = await asyncio.wait_for(page.evaluate(OUTER_HTML_SCRIPT),
+                                              timeout=_remaining(deadline, EVALUATE_GRACE))
+            self.tracer.add_bytes(len(html))
+            print("## html fetched ##")
 
-        return more_this_time
+            self._report_blocked(page)
+        finally:
+            await self._tabs.checkin(tab)
+        return html, partial
 
-    async def get_html(self, url: str, page: Optional[Page] = None) -> str:
-        """Return html document for a given url.
+    async def extract_page(self, url: str, base_url: str) -> ParsedPage:
+        """Return the same-base links and the text of the page at the given url,
+        extracted in the browser by one injected script (see `EXTRACT_SCRIPT`).
+        The full (raw) html is only fetched if self.save_html or self.archive is enabled.
 
         Preconditions:
         - the url does not prevent playwright automation. 
         """
+        deadline = time.monotonic() + self.page_timeout
+        tab = await self._tabs.checkout()
+        try:
+            page, partial = await self.load_page(url, tab.page, deadline)
+
+            with self.tracer.span("evaluate"):
+                payload = await asyncio.wait_for(page.evaluate(EXTRACT_SCRIPT, base_url),
+                                                 timeout=_remaining(deadline, EVALUATE_GRACE))
+                html = None
+                if self.save_html or self.archive is not None:
+                    html = await asyncio.wait_for(page.evaluate(OUTER_HTML_SCRIPT),
+                                                  timeout=_remaining(deadline, EVALUATE_GRACE))
+            self.tracer.add_bytes(sum(map(len, payload["links"]))
+                                  + sum(len(block["text"]) for block in payload["blocks"])
+                                  + (len(html) if html is not None else 0))
+            print("## page extracted in browser ##")
+
+            self._report_blocked(page)
+        finally:
+            await self._tabs.checkin(tab)
+        parsed = parsed_from_payload(payload, url, base_url, html)
+        parsed.partial = partial
+        return parsed
+
+    async def load_page(self, url: str, page: Page, deadline: float) -> tuple[Page, bool]:
+        """Open the given url in the given tab, wait until it is fully rendered or the deadline
+        (a time.monotonic() value) has passed, and return the tab and whether it is partial
+        (see `load_until_settled`). A "proceed anyway" redirect to a visited page is not followed.
 
-        # Prevent "< cap" comparison before the new page is appended (prevent race condition)
-        async with self._page_lock:
-            if page is not None: # Mainly to handle the recursive call below after clickiing "proceed anyway" 
-            # making sure after redirection, it does not grab a new page and breaks round robin
-                pass
-            # Create a new page if no more than self.cap pages are open
-            elif len(self._pages) < self.cap:
-                page = await self.context.new_page()
-                self._pages.append(page)
-            # Otherwise, reuse an existing page (round robin)
-            else:
-                page = self._pages[0]
-                self._pages = self._pages[1:] + [page]
-
-        await page.goto(url, wait_until="domcontentloaded")
-        print("Page loaded.")
-
-        # # Wait for Notion main container
-        # page.wait_for_selector("div#notion-app", timeout=30000)
-
-        # Scroll to bottom and update until no more content loaded
-        previous_height = 0
-        while True:
-            await asyncio.sleep(2)
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            current_height = await page.evaluate("document.body.scrollHeight")
-            if previous_height == current_height:
-                break
-            previous_height = current_height
-
-        # Click "proceed anyway" if it exists
-        link_to_click = await page.query_selector("text=proceed anyway")
-        if link_to_click:
-            print("'proceed anyway' button link found, clicking it.")
-            await link_to_click.click()
-            await asyncio.sleep(1)  # Wait for page to load after clicking
-
-            # If page has been redirected after clicking, get html from the new url
-            # Remove query params and fragments before comparision
-            url_no_query = urlparse(url)._replace(query=None, fragment=None).geturl() 
-            if page.url != url_no_query and page.url not in self.links:
-                # Call the funciton itself to get the html properly
-                print("Page redirected after clicking 'proceed anyway'.")
-                html = await self.get_html(page.url, page=page)
-                print("## html fetched ##")
-                
-                return html
-
-        # Get page html and return (if the url was not redirected)
-        # html = await page.content()
-
-        # Trying a different way to get html
-        html = await page.evaluate("""
-        () => document.documentElement.outerHTML
-            """)
-        print("## html fetched ##")
-
-        return html
-
-    # Parse HTML
-    @staticmethod
-    def bake_soup(html: str) -> BeautifulSoup:
-        """Parse html doc into a soup object and return that object.
+        Preconditions:
+        - the url does not prevent playwright automation. 
+        - the tab is checked out of self._tabs by the caller.
         """
-        print("## soup baked ##")
-        return BeautifulSoup(html, "html.parser")
-    
-    def save_docs(self, soup: BeautifulSoup, url: str) -> None:
-        """Save prettified html files, extracted text file, and json files,
-        only if each is enabled.
+        return await load_until_settled(url, page, deadline, self.settle_quiet_ms, self.settle_max_wait,
+                                        self.max_scrolls, self.tracer, self.links)
+
+    def _report_blocked(self, page: Page) -> None:
+        """Print the requests blocked on the given page, if block_resources is enabled."""
+        if self._resource_policy is not None:
+            blocked, saved = self._resource_policy.pop_page_stats(page)
+            print(f"Blocked {blocked} requests on this page, "
+                  f"an estimated {saved / 1e3:.0f} KB not downloaded.")
+
+    def save_docs(self, parsed: ParsedPage, raw_html: Optional[str] = None) -> None:
+        """Save prettified html files, extracted text file, json files and block files
+        of the given parsed page, only if each is enabled, and append its raw html
+        to the archive (if enabled).
+        Files are named after the page (see `DocStore`), so the html, text, json and block docs
+        of a page always match, even across sessions.
         """
+        url, text = parsed.url, parsed.text
 
-        html_count = len(os.listdir(HTML_DIR))
-        text_count = len(os.listdir(TEXT_DIR))
-        json_count = len(os.listdir(JSON_DIR))
-        filename_html = os.path.join(HTML_DIR, f"page_{html_count + 1}.html")
-        filename_text = os.path.join(TEXT_DIR, f"page_{text_count + 1}.txt")
-        filename_json = os.path.join(JSON_DIR, f"page_{json_count + 1}.json")
-
-        # Extract clean text
-        text = "\n".join(
-            line.strip()
-            for line in soup.get_text("\n").split("\n")
-            if line.strip()
-        )
+        if self.archive is not None and raw_html is not None:
+            self.archive.append(url, raw_html, doc_key(url), parsed.partial)
 
         # Write to html, text, and json files
-        if self.save_html:
-            with open(filename_html, "w", encoding="utf-8") as f:
-                f.write(soup.prettify())
+        if self.save_html and parsed.html is not None:
+            filename_html = self.doc_store.html_path(url)
+            self.doc_store.write(filename_html, parsed.html)
             print(f"HTML file saved as {filename_html}")
         if self.save_text:
-            with open(filename_text, 'w', encoding="utf-8") as f:
-                f.write(text)
+            filename_text = self.doc_store.text_path(url)
+            self.doc_store.write(filename_text, text)
             print(f"Text file saved as {filename_text}")
         if self.save_json:
-            with open(filename_json, 'w', encoding="utf-8") as f:
-                one_line_text = text.replace('\n', ' ')
-                data = {"text": one_line_text, "source": url}
-                json.dump(data, f, indent=4)
+            filename_json = self.doc_store.json_path(url)
+            self.doc_store.write(filename_json, json.dumps(json_doc(parsed), indent=4))
             print(f"JSON file saved as {filename_json}")
+        if self.save_blocks:
+            filename_blocks = self.doc_store.blocks_path(url)
+            self.doc_store.write(filename_blocks, blocks_jsonl(parsed))
+            print(f"Blocks file saved as {filename_blocks}")
 
     
     def _start_by_mode(self) -> None:
-        """__init__ helper method to initialize links and to_visit based on mode.
-        Also, if in fresh mode, clear existing html and text docs.
-
-        Preconditions:
-          - if self.resume is True, progress files must in csv format
-           and only contain urls (not the base url).
+        """__init__ helper method to open the crawl state and initialize links and to_visit based on mode.
+        Also, if in fresh mode, clear existing progress and html and text docs.
         """
+        self.crawl_state = CrawlState(checkpoint_every=self.checkpoint_every)
+
+        # incremental mode: revisit every known page, keeping saved docs and fingerprints
+        if self.incremental and not self.resume:
+            self.crawl_state.restart()
+            self.crawl_state.add_pending({self.starting_url})
+            self.crawl_state.checkpoint()
+
         # fresh mode
-        if not self.resume:
+        elif not self.resume:
             
             # Safety check
             confirm = input("Are you sure you want to start fresh?\n" \
@@ -344,19 +884,36 @@ class SoupsMaker():
 
             # Confirmed fresh mode
             else:
-                self.links = set()
+                self.links = self._new_visited()
                 self.to_visit = {self.starting_url}
 
-                # Clear existing html, text, and json files
-                for d in [HTML_DIR, TEXT_DIR, JSON_DIR]:
-                    for filename in os.listdir(d):
-                        file_path = os.path.join(d, filename)
-                        os.remove(file_path)
+                # Clear existing progress and html, text, and json files
+                self.crawl_state.reset()
+                self.crawl_state.add_pending(self.to_visit)
+                self.crawl_state.checkpoint()
+                if self.graph is not None:
+                    self.graph.reset()
+                self.doc_store.clear()
                 return
         
         # resume mode
-        self.links = set()
-        self.to_visit = set()
+        if self.crawl_state.is_empty():
+            self._import_csv_progress()
+
+        requeued = self.crawl_state.requeue_in_progress()
+        self.links = self._new_visited(self.crawl_state.visited())
+        self.to_visit = set(self.crawl_state.pending())
+        self._depth = self.crawl_state.pending_depths()
+        print(f"Resumed {len(self.links)} visited links and {len(self.to_visit)} to-visit links "
+              f"({requeued} interrupted links requeued) from {CRAWL_STATE_PATH.name}")
+
+    def _import_csv_progress(self) -> None:
+        """Import progress saved as csv files (by older versions) into self.crawl_state.
+
+        Preconditions:
+          - progress files must in csv format and only contain urls (not the base url).
+        """
+        base_url = self.starting_url[1]
 
         # Load links from file
         try:
@@ -364,10 +921,9 @@ class SoupsMaker():
                 reader = csv.reader(f)
                 for row in reader:
                     for url in row:
-                        self.links.add(url)
-            print(f"Resumed {len(self.links)} visited links from progress_links.csv")
+                        self.crawl_state.mark_done((canonical_url(url), base_url))
         except FileNotFoundError:
-            print("No progress_links.csv file found." \
+            print("No crawl state or progress_links.csv file found." \
             " Set resume to False and try again.")
             sys.exit(1)
         
@@ -376,70 +932,132 @@ class SoupsMaker():
             with open(TO_VISIT_LINKS_PATH, 'r') as f:
                 reader = csv.reader(f)
                 for row in reader:
-                    for url in row:
-                        self.to_visit.add((url, self.starting_url[1]))
-            print(f"Resumed {len(self.to_visit)} to-visit links from progress_to_visit.csv")
+                    self.crawl_state.add_pending([(canonical_url(url), base_url) for url in row])
         except FileNotFoundError:
-            print("No progress_to_visit.csv file found. " \
+            print("No crawl state or progress_to_visit.csv file found. " \
             "Set resume to False and try again.")
             sys.exit(1)
 
+        self.crawl_state.checkpoint()
+        print("Imported progress from progress_links.csv and progress_to_visit.csv")
+
     def save_progress(self) -> None:
-        """Save the current progress (self.links, self.to_visit, self.failed_links) to csv files.
-        For self.links, self.to_visit, write at most 10 items each row.
-        For self.failed_links, call self.save_failed_links to handle.
+        """Commit the current progress to the crawl state database,
+        and save self.failed_links by calling self.save_failed_links.
 
-        Before writing to csv, add urls that the agent is currently visiting
-        (but has not done visiting) back to self.to_visit
+        Before committing, add urls that the agent is currently visiting
+        (but has not done visiting) back to self.to_visit, so that they are visited again on resume.
         """
 
-        # Add current pages back to self.to_visit
-        for page in self._pages:
-            self.to_visit.add((page.url, self.starting_url[1]))
-
-        mode = 'a' if self.resume else 'w'
-        with open(VISITED_LINKS_PATH, mode, newline='') as f:
+        self._requeue_in_flight()
+        self.crawl_state.checkpoint()
+        if self.graph is not None:
+            self.graph.checkpoint()
+        if self.archive is not None:
+            self.archive.flush()
+        print(f"Saved {len(self.links)} visited links and {len(self.to_visit)} to-visit links "
+              f"to {CRAWL_STATE_PATH.name}")
 
-            data = list(self.links)
-            max_col = 10    # write at most 10 items per row
+        self.save_failed_links()
+    
+    def _requeue_in_flight(self) -> None:
+        """Add links currently being processed (e.g. interrupted by a budget or KeyboardInterrupt)
+        back to self.to_visit, so that they are visited again on resume.
+        """
+        for url_tuple in self._in_flight:
+            self.links.discard(url_tuple[0])
+            self.to_visit.add(url_tuple)
+            self.crawl_state.requeue(url_tuple)
+        self._in_flight.clear()
 
+    def save_failed_links(self) -> None:
+        """Save all failed links in the crawl state to progress_failed_links.csv.
+        Write the failed link and the error (the history of its attempts) each row."""
+        with open(FAILED_LINKS_PATH, 'w', newline='') as f:
             writer = csv.writer(f, delimiter=',')
-            for i in range(0, len(data), max_col):
-                writer.writerow(data[i:i + max_col])
-            print(f"Saved {len(self.links)} links to progress_links.csv")
+            count = 0
+            for link, err in self.crawl_state.failed():
+                err_msg = str(err).replace('\n', ' ')   # ensure each entry stays in one row
+                writer.writerow([link, err_msg])
+                count += 1
+            print(f"Saved {count} failed links to progress_failed_links.csv")
+
+
+async def load_until_settled(url: str, page: Page, deadline: float,
+                             settle_quiet_ms: int = DEFAULT_QUIET_MS,
+                             settle_max_wait: float = DEFAULT_MAX_WAIT,
+                             max_scrolls: int = DEFAULT_MAX_SCROLLS, tracer: Optional[CrawlTracer] = None,
+                             visited: Container[str] = ()) -> tuple[Page, bool]:
+    """Open the given url in the given page, wait until it is fully rendered (see `wait_for_settle`)
+    or the deadline (a time.monotonic() value) has passed, and return the page and whether it
+    is partial (not fully rendered). If a "proceed anyway" link redirects to another url
+    (that is not in visited), the returned page shows that url.
+    Time spent navigating and settling is recorded in the tracer's spans, if given.
+
+    Raise a timeout error if the deadline passes before the url has been navigated to at all.
+
+    Preconditions:
+    - the url does not prevent playwright automation. 
+    - the settle tracker is installed in the page's context (see `install_settle_tracker`).
+    """
 
-        with open(TO_VISIT_LINKS_PATH, mode, newline='') as f:
+    def span(phase: str) -> ContextManager:
+        return tracer.span(phase) if tracer is not None else contextlib.nullcontext()
 
-            data = [url_tuple[0] for url_tuple in self.to_visit]
-            max_col = 10    # write at most 10 items per row
+    async def settle() -> bool:
+        max_wait = min(settle_max_wait, _remaining(deadline))
+        if max_wait <= 0:
+            return False
+        return await wait_for_settle(page, quiet_ms=settle_quiet_ms, max_wait=max_wait,
+                                     max_scrolls=max_scrolls)
 
-            writer = csv.writer(f, delimiter=',')
-            for i in range(0, len(data), max_col):
-                writer.writerow(data[i:i + max_col])
-            print(f"Saved {len(self.to_visit)} links to progress_to_visit.csv")
-            
-        self.save_failed_links()
-    
-    def save_failed_links(self) -> None:
-        """Save self.failed_links to progress_failed_links.csv.
-        Write the failed link and the error each row."""
-        mode = 'a' if self.resume else 'w'
-        with open(FAILED_LINKS_PATH, mode, newline='') as f:
-            writer = csv.writer(f, delimiter=',')
-            for link_err in self.failed_links:
-                link, e = link_err
-                err_msg = str(e).replace('\n', ' ')   # ensure each entry stays in one row
-                writer.writerow(list((link, err_msg)))
-            print(f"Saved {len(self.failed_links)} failed links to progress_failed_links.csv")
+    with span("goto"):
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=_remaining(deadline, 0.001) * 1000)
+        except PlaywrightTimeoutError:
+            # Keep what has arrived so far, unless the page is still showing the previous url
+            if canonical_url(page.url) != canonical_url(url):
+                raise
+            print("Page did not load before its deadline, keeping what is available.")
+            return page, True
+    print("Page loaded.")
+
+    # Scroll to bottom until the Notion app is rendered and no more content is loaded
+    with span("settle"):
+        settled = await settle()
 
+        # Click "proceed anyway" if it exists
+        link_to_click = await page.query_selector("text=proceed anyway")
+        if link_to_click and _remaining(deadline) > 0:
+            print("'proceed anyway' button link found, clicking it.")
+            await link_to_click.click(timeout=_remaining(deadline, EVALUATE_GRACE) * 1000)
+            # Wait for page to load after clicking
+            settled = await settle()
 
-async def run_soupsmaker(starting_url: tuple[str, str] = (URL, BASE_URL),
-                 cap: int = 10, resume: bool = False, save_html: bool = False,
-                 save_text: bool = False, save_json: bool = True) -> None:
+    if link_to_click:
+        # If page has been redirected after clicking, load the new url
+        # Remove query params and fragments before comparision
+        url_no_query = urlparse(url)._replace(query=None, fragment=None).geturl() 
+        if (page.url != url_no_query and canonical_url(page.url) not in visited
+                and _remaining(deadline) > 0):
+            # Call the funciton itself to load the page properly
+            print("Page redirected after clicking 'proceed anyway'.")
+            return await load_until_settled(page.url, page, deadline, settle_quiet_ms, settle_max_wait,
+                                            max_scrolls, tracer, visited)
+
+    return page, not settled
+
+
+def _remaining(deadline: float, minimum: float = 0.0) -> float:
+    """Return the time (in seconds) left until the given time.monotonic() deadline, but at least minimum."""
+    return max(minimum, deadline - time.monotonic())
+
+
+async def run_soupsmaker(**soupsmaker_kwargs: Any) -> None:
     """Run SoupsMaker and save progress on KeyboardInterrupt.
+    Keyword arguments are passed to SoupsMaker.
     """
-    soupsmaker = SoupsMaker(starting_url=starting_url, cap=cap, resume=resume,
-                            save_html=save_html, save_text=save_text, save_json=save_json)
+    soupsmaker = SoupsMaker(**soupsmaker_kwargs)
     try:
         await soupsmaker.main()
     except asyncio.CancelledError:
@@ -447,13 +1065,12 @@ async def run_soupsmaker(starting_url: tuple[str, str] = (URL, BASE_URL),
         soupsmaker.save_progress()  # save progress if interrupted
 
 
-def scrape_single_page(url: str) -> str:
+def scrape_single_page(url: str, settle_quiet_ms: int = DEFAULT_QUIET_MS,
+                       settle_max_wait: float = DEFAULT_MAX_WAIT, headless: bool = False) -> str:
     """Scrape a single given url and return the text contained."""
     with sync_playwright() as p:
         # Launch real Chromium
-        browser = p.chromium.launch(
-            headless=False  # set True later once confirmed working
-        )
+        browser = p.chromium.launch(headless=headless)
 
         context = browser.new_context(
             user_agent=(
@@ -462,6 +1079,7 @@ def scrape_single_page(url: str) -> str:
                 "Chrome/131.0.0.0 Safari/537.36"
             )
         )
+        install_settle_tracker_sync(context)
         print("Browser launched!")
 
         page = context.new_page()
@@ -469,26 +1087,55 @@ def scrape_single_page(url: str) -> str:
         page.goto(url, wait_until="domcontentloaded")
         print("Page loaded.")
 
-        # Scroll to bottom and update until no more content loaded
-        previous_height = 0
-        while True:
-            time.sleep(2)
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            current_height = page.evaluate("document.body.scrollHeight")
-            if previous_height == current_height:
-                break
-            previous_height = current_height
+        # Scroll to bottom until the Notion app is rendered and no more content is loaded
+        wait_for_settle_sync(page, quiet_ms=settle_quiet_ms, max_wait=settle_max_wait)
         
-        html = page.evaluate("""() => document.documentElement.outerHTML""")
+        html = page.evaluate(OUTER_HTML_SCRIPT)
 
         browser.close()
     
-    soup = BeautifulSoup(html, "html.parser")
-    text = "\n".join(line.strip() 
-                     for line in soup.get_text("\n").split("\n") 
-                     if line.strip())
+    return parse_page(html, url, BASE_URL).text
+
+
+async def scrape_pages(urls: list[str], settle_quiet_ms: int = DEFAULT_QUIET_MS,
+                       settle_max_wait: float = DEFAULT_MAX_WAIT, max_concurrency: int = 8,
+                       headless: bool = True, page_timeout: float = 60.0) -> list[str | BaseException]:
+    """Scrape the given urls concurrently in one shared browser, and return the text contained
+    in each page (in the order of urls), or the error raised while scraping it.
+    At most max_concurrency pages are open at a time. Pages are loaded like the crawler loads them
+    (see `load_until_settled`), each within page_timeout seconds.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        context = await browser.new_context(
+            user_agent=(
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/131.0.0.0 Safari/537.36"
+            )
+        )
+        await install_settle_tracker(context)
+        print("Browser launched!")
 
-    return text
+        async def scrape(url: str) -> str:
+            async with semaphore:
+                deadline = time.monotonic() + page_timeout
+                page = await context.new_page()
+                try:
+                    page, _ = await load_until_settled(url, page, deadline, settle_quiet_ms, settle_max_wait)
+                    html = await asyncio.wait_for(page.evaluate(OUTER_HTML_SCRIPT),
+                                                  timeout=_remaining(deadline, EVALUATE_GRACE))
+                finally:
+                    await page.close()
+            print(f"Scraped {url}")
+            return parse_page(html, url, BASE_URL).text
+
+        texts = await asyncio.gather(*(scrape(url) for url in urls), return_exceptions=True)
+        await browser.close()
+
+    return texts
 
 
 if __name__ == '__main__':
@@ -0,0 +1,171 @@
+"""
+Event-driven detection of when a (Notion) page has finished rendering.
+
+Instead of sleeping for a fixed amount of time between scrolls, an init script is
+injected into every page that records:
+1. The last time the DOM was mutated (MutationObserver);
+2. The number of pending Notion API calls (`loadPageChunk`, `syncRecordValues`, etc.);
+3. The last time the page height changed after scrolling to the bottom.
+
+A page is considered settled when the Notion app container is present (or the page is
+a plain, fully loaded document), no tracked API call is pending,
+and the DOM has been quiet for a given window.
+
+Pages that keep growing as they are scrolled (e.g. infinite database views) never settle,
+so waiting also stops once scrolling has loaded more content a maximum number of times.
+"""
+
+from playwright.async_api import BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import BrowserContext as SyncBrowserContext, Page as SyncPage
+from playwright.sync_api import TimeoutError as SyncPlaywrightTimeoutError
+
+# Notion API endpoints that deliver page content
+NOTION_API_PATTERN = r"/api/v3/(loadPageChunk|loadCachedPageChunk|syncRecordValues|queryCollection)"
+
+# Injected into every page before any of the page's own scripts run
+SETTLE_INIT_SCRIPT = """
+(apiPattern) => {
+    if (window.__soupsSettle) return;
+    const state = window.__soupsSettle = {
+        lastMutation: performance.now(),
+        lastHeightChange: performance.now(),
+        lastHeight: 0,
+        growths: 0,
+        pending: 0,
+        apiCalls: 0,
+        scrolls: 0,
+    };
+    const apiRegex = new RegExp(apiPattern);
+    const touch = () => { state.lastMutation = performance.now(); };
+
+    new MutationObserver(touch).observe(document, {
+        childList: true, subtree: true, attributes: true, characterData: true,
+    });
+
+    const track = (url) => {
+        if (!apiRegex.test(url || "")) return null;
+        state.pending++;
+        state.apiCalls++;
+        touch();
+        let done = false;
+        return () => {
+            if (done) return;
+            done = true;
+            state.pending--;
+            touch();
+        };
+    };
+
+    const originalFetch = window.fetch;
+    window.fetch = function (input, init) {
+        const url = typeof input === "string" ? input : (input && input.url);
+        const finish = track(url);
+        const promise = originalFetch.apply(this, arguments);
+        if (finish) promise.then(finish, finish);
+        return promise;
+    };
+
+    const originalOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this.__soupsUrl = String(url);
+        return originalOpen.apply(this, arguments);
+    };
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        const finish = track(this.__soupsUrl);
+        if (finish) this.addEventListener("loadend", finish);
+        return originalSend.apply(this, arguments);
+    };
+}
+"""
+
+# Polled in page by `wait_for_function`. Scrolls to the bottom to trigger lazy loading,
+# and returns true once the page is settled, or SCROLL_CAPPED once the page has grown maxGrowths times.
+SETTLE_PREDICATE = """
+([quietMs, containerSelector, maxGrowths]) => {
+    const state = window.__soupsSettle;
+    if (!state || !document.body) return false;
+
+    window.scrollTo(0, document.body.scrollHeight);
+    state.scrolls++;
+    const now = performance.now();
+    const height = document.body.scrollHeight;
+    if (height !== state.lastHeight) {
+        state.lastHeight = height;
+        state.lastHeightChange = now;
+        state.growths++;
+    }
+    if (maxGrowths > 0 && state.growths >= maxGrowths) return "scroll cap";
+
+    const hasContainer = document.querySelector(containerSelector) !== null;
+    const plainDocument = state.apiCalls === 0 && document.readyState === "complete";
+    if (!hasContainer && !plainDocument) return false;
+
+    return state.pending === 0
+        && now - state.lastMutation >= quietMs
+        && now - state.lastHeightChange >= quietMs;
+}
+"""
+
+DEFAULT_QUIET_MS = 500
+DEFAULT_MAX_WAIT = 15.0
+DEFAULT_MAX_SCROLLS = 200
+SCROLL_CAPPED = "scroll cap"
+NOTION_CONTAINER = "#notion-app"
+POLLING_MS = 100
+
+
+async def install_settle_tracker(context: BrowserContext) -> None:
+    """Inject the settle tracking script into every page opened in the given context."""
+    await context.add_init_script(script=_init_script_source())
+
+
+async def wait_for_settle(page: Page, quiet_ms: int = DEFAULT_QUIET_MS,
+                          max_wait: float = DEFAULT_MAX_WAIT,
+                          container: str = NOTION_CONTAINER,
+                          max_scrolls: int = DEFAULT_MAX_SCROLLS) -> bool:
+    """Wait until the given page is settled, scrolling to the bottom while waiting.
+    Return True if the page settled, and False if max_wait (in seconds) was reached first
+    or scrolling loaded more content max_scrolls times (0 for no limit).
+
+    Preconditions:
+      - the settle tracker has been installed on the page's context (`install_settle_tracker`).
+    """
+    try:
+        handle = await page.wait_for_function(SETTLE_PREDICATE, arg=[quiet_ms, container, max_scrolls],
+                                              polling=POLLING_MS, timeout=max_wait * 1000)
+    except PlaywrightTimeoutError:
+        print(f"Page did not settle within {max_wait} seconds, continuing anyway.")
+        return False
+    if await handle.json_value() == SCROLL_CAPPED:
+        print(f"Page still growing after {max_scrolls} scrolls, continuing anyway.")
+        return False
+    return True
+
+
+def install_settle_tracker_sync(context: SyncBrowserContext) -> None:
+    """Sync API version of `install_settle_tracker`."""
+    context.add_init_script(script=_init_script_source())
+
+
+def wait_for_settle_sync(page: SyncPage, quiet_ms: int = DEFAULT_QUIET_MS,
+                         max_wait: float = DEFAULT_MAX_WAIT,
+                         container: str = NOTION_CONTAINER,
+                         max_scrolls: int = DEFAULT_MAX_SCROLLS) -> bool:
+    """Sync API version of `wait_for_settle`."""
+    try:
+        handle = page.wait_for_function(SETTLE_PREDICATE, arg=[quiet_ms, container, max_scrolls],
+                                        polling=POLLING_MS, timeout=max_wait * 1000)
+    except SyncPlaywrightTimeoutError:
+        print(f"Page did not settle within {max_wait} seconds, continuing anyway.")
+        return False
+    if handle.json_value() == SCROLL_CAPPED:
+        print(f"Page still growing after {max_scrolls} scrolls, continuing anyway.")
+        return False
+    return True
+
+
+def _init_script_source() -> str:
+    """Return the init script as a self-invoking expression with the API pattern bound."""
+    return f"({SETTLE_INIT_SCRIPT})({NOTION_API_PATTERN!r});"
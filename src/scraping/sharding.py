@@ -0,0 +1,298 @@
+"""
+A sharded crawl mode for SoupsMaker that uses all CPU cores.
+
+The frontier is partitioned by a hash of each url's Notion page ID (`shard_of`).
+Each shard is a worker process with its own event loop and Playwright browser (`ShardWorker`),
+which crawls the urls it is given and reports back the links it finds.
+A coordinator in the main process (`ShardCoordinator`) merges the reported links,
+dedups them globally, and dispatches every new link to the shard that owns it.
+In incremental mode, every url is sent with its recorded fingerprint, and the new fingerprint
+of every page comes back with its report, so the coordinator's crawl state keeps them all.
+The page, time and depth budgets (max_pages, max_seconds, max_depth) are enforced by the coordinator:
+links it does not dispatch stay pending for the next run.
+
+Unlike `experimental_legacy/scraping/try7_process_pool.py`, every shard keeps one browser open
+for its whole lifetime and crawls with the same async worker pool as `SoupsMaker`.
+"""
+
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from src.scraping.scrape import SoupsMaker, URL, BASE_URL
+from src.scraping.crawl_state import CrawlState
+from src.scraping.incremental import PROBE_BATCH_SIZE
+from src.scraping.urls import shard_of
+from src.scraping.instrumentation import CrawlTracer
+from src.file_config import ARCHIVE_DIR, TAB_LOG_PATH, TRACE_PATH
+
+# How long (in seconds) a blocking queue read waits before checking for shutdown
+POLL_INTERVAL = 1.0
+
+
+class ShardWorker(SoupsMaker):
+    """A SoupsMaker running inside a shard worker process.
+    It crawls the urls sent by the coordinator and reports every processed url
+    together with the links found on it, its fingerprint (and any failures) back to the coordinator.
+
+    Instance Attributes:
+      - shard_id: the index of this shard.
+    """
+    # Private Instance Attributes:
+    #   - _task_queue: (url, recorded fingerprint or None) pairs to crawl, sent by the coordinator.
+    #   None means no more urls.
+    #   - _result_queue: (shard_id, url, found urls, failed (url, error message) pairs,
+    #   fingerprint or None) reports sent to the coordinator.
+
+    shard_id: int
+
+    _task_queue: Any
+    _result_queue: Any
+
+    def __init__(self, shard_id: int, task_queue: Any, result_queue: Any,
+                 **soupsmaker_kwargs: Any) -> None:
+        self.shard_id = shard_id
+        self._task_queue = task_queue
+        self._result_queue = result_queue
+        # The coordinator records the link graph from the shards' reports,
+        # and every process appends to its own archive (see `archive_json_docs`)
+        archive_dir = Path(soupsmaker_kwargs.get("archive_dir", ARCHIVE_DIR)) / f"shard{shard_id}"
+        super().__init__(**{**soupsmaker_kwargs, "record_graph": False, "archive_dir": archive_dir})
+        self.tracer = CrawlTracer(TRACE_PATH.with_name(f"crawl_trace_shard{shard_id}.jsonl"))
+        self._tab_log_path = TAB_LOG_PATH.with_name(f"tab_lifecycle_shard{shard_id}.csv")
+        log_path = Path(self._concurrency_log_path)
+        self._concurrency_log_path = log_path.with_name(f"{log_path.stem}_shard{shard_id}{log_path.suffix}")
+        if self.user_data_dir is not None:
+            # A browser profile can only be used by one browser at a time
+            self.user_data_dir = Path(f"{self.user_data_dir}_shard{shard_id}")
+
+    def _start_by_mode(self) -> None:
+        """The coordinator owns the crawl progress, so a shard starts with nothing
+        visited and nothing to visit, and only keeps a throwaway in-memory crawl state
+        (holding the fingerprints of the urls it is sent).
+        """
+        self.crawl_state = CrawlState(":memory:", checkpoint_every=self.checkpoint_every)
+        self.links = self._new_visited()
+        self.to_visit = set()
+
+    async def add_all_links(self) -> None:
+        """Crawl the urls sent by the coordinator until it signals that there are no more.
+        In incremental mode, the urls received together are probed in one batch first.
+        """
+        loop = asyncio.get_running_loop()
+        base_url = self.starting_url[1]
+
+        workers = [asyncio.create_task(self._crawl_worker()) for _ in range(self.cap)]
+        try:
+            done = False
+            while not done:
+                try:
+                    tasks = [await loop.run_in_executor(None, self._task_queue.get, True, POLL_INTERVAL)]
+                except queue.Empty:
+                    continue
+                # Take the other urls already sent, to probe them together
+                while tasks[-1] is not None and len(tasks) < PROBE_BATCH_SIZE:
+                    try:
+                        tasks.append(self._task_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                done = tasks[-1] is None
+                tasks = [task for task in tasks if task is not None]
+
+                for url, fingerprint in tasks:
+                    if fingerprint is not None:
+                        self.crawl_state.set_fingerprint(url, *fingerprint)
+                if self.incremental and tasks:
+                    await self._probe_pages((url, base_url) for url, _ in tasks)
+                for url, _ in tasks:
+                    self._frontier.put_nowait((url, base_url))
+
+            await self._frontier.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def _on_link_processed(self, url_this_time: tuple[str, str],
+                           new_links: Optional[set[tuple[str, str]]]) -> None:
+        """Report the processed url, the links found on it, its fingerprint and failed links
+        to the coordinator.
+        A url scheduled for a retry is only reported once its last attempt is processed.
+        """
+        if url_this_time in self.to_visit:
+            return
+        found = [link for link, _ in new_links] if new_links else []
+        failed = [(link, self.retry_policy.describe(link) or str(e)) for link, e in self.failed_links]
+        self.failed_links.clear()
+        fingerprint = self.crawl_state.get_fingerprint(url_this_time[0])
+        self._result_queue.put((self.shard_id, url_this_time[0], found, failed, fingerprint))
+
+
+def _run_shard(shard_id: int, task_queue: Any, result_queue: Any,
+               soupsmaker_kwargs: dict[str, Any]) -> None:
+    """Entry point of a shard worker process."""
+    worker = ShardWorker(shard_id, task_queue, result_queue, **soupsmaker_kwargs)
+    asyncio.run(worker.crawl())
+
+
+class ShardCoordinator:
+    """Coordinates a crawl over several shard worker processes.
+
+    Instance Attributes:
+      - num_shards: the number of shard worker processes.
+      - state: a SoupsMaker holding the global crawl progress (links, to_visit, failed_links).
+      It is never launched; it is used for its fresh/resume handling and its save methods.
+    """
+    # Private Instance Attributes:
+    #   - _shard_kwargs: keyword arguments used to construct each ShardWorker's SoupsMaker.
+    #   - _dispatched: number of urls dispatched to the shards in this run.
+
+    num_shards: int
+    state: SoupsMaker
+
+    _shard_kwargs: dict[str, Any]
+    _dispatched: int
+
+    def __init__(self, num_shards: int, **soupsmaker_kwargs: Any) -> None:
+        self.num_shards = num_shards
+        self.state = SoupsMaker(**soupsmaker_kwargs)
+        # The budgets are enforced here, as a shard only sees part of the crawl
+        self._shard_kwargs = {key: value for key, value in soupsmaker_kwargs.items()
+                              if key not in ("resume", "max_pages", "max_seconds", "max_depth")}
+        self._shard_kwargs["resume"] = True  # never prompt (or clear saved docs) in a shard
+        self._dispatched = 0
+
+    async def main(self) -> None:
+        """Crawl all subpages of the starting url over the shards,
+        then save all links visited and failed links.
+        """
+        await self.crawl()
+        self.state.crawl_state.checkpoint()
+        if self.state.graph is not None:
+            self.state.graph.checkpoint()
+        self.state.save_failed_links()
+        self.state.save_all_links()
+
+    async def crawl(self) -> None:
+        """Start the shard worker processes, dispatch urls to them until no url is in flight
+        or the time budget (max_seconds) is reached, then shut them down.
+        Urls still in flight when time runs out are visited again on resume.
+        """
+        loop = asyncio.get_running_loop()
+        mp_context = mp.get_context("spawn")    # each shard needs a fresh interpreter for Playwright
+        task_queues = [mp_context.Queue() for _ in range(self.num_shards)]
+        result_queue = mp_context.Queue()
+        processes = [
+            mp_context.Process(target=_run_shard, daemon=True,
+                               args=(i, task_queues[i], result_queue, self._shard_kwargs))
+            for i in range(self.num_shards)
+        ]
+        for process in processes:
+            process.start()
+        print(f"Started {self.num_shards} shard processes.")
+
+        deadline = None if self.state.max_seconds is None else time.monotonic() + self.state.max_seconds
+        try:
+            self.state._seed_key_urls()
+            for url_tuple in list(self.state.to_visit):
+                self._dispatch(url_tuple, task_queues)
+
+            while self.state._in_flight:
+                if deadline is not None and time.monotonic() >= deadline:
+                    print(f"Time budget of {self.state.max_seconds} seconds reached.")
+                    self.state._requeue_in_flight()
+                    break
+                try:
+                    report = await loop.run_in_executor(None, result_queue.get, True, POLL_INTERVAL)
+                except queue.Empty:
+                    if not all(process.is_alive() for process in processes):
+                        raise RuntimeError("A shard process exited unexpectedly.")
+                    continue
+                self._merge(report, task_queues)
+            if self.state.to_visit:
+                print(f"{len(self.state.to_visit)} links left to visit, run in resume mode to continue.")
+        finally:
+            for task_queue in task_queues:
+                task_queue.put(None)
+            for process in processes:
+                await loop.run_in_executor(None, process.join, 30)
+                if process.is_alive():
+                    process.terminate()
+
+    def _dispatch(self, url_tuple: tuple[str, str], task_queues: list[Any]) -> None:
+        """Send the given url tuple to the shard that owns it, unless it has been visited.
+        Once max_pages urls have been dispatched in this run, the url is left in to_visit.
+        """
+        url = url_tuple[0]
+        if url in self.state.links:
+            self.state.to_visit.discard(url_tuple)
+            return
+        max_pages = self.state.max_pages
+        if max_pages is not None and self._dispatched >= max_pages:
+            return
+        self._dispatched += 1
+        if self._dispatched == max_pages:
+            print(f"Page budget of {max_pages} pages reached, finishing pages in flight.")
+        self.state.to_visit.discard(url_tuple)
+        self.state.links.add(url)
+        self.state._in_flight.add(url_tuple)
+        self.state.crawl_state.mark_in_progress(url_tuple)
+        task_queues[shard_of(url, self.num_shards)].put((url, self.state.crawl_state.get_fingerprint(url)))
+
+    def _merge(self, report: tuple[int, str, list[str], list[tuple[str, str]],
+                                   Optional[tuple[Optional[int], str]]],
+               task_queues: list[Any]) -> None:
+        """Merge a shard's report (including the page's new fingerprint) into the global progress
+        and dispatch newly found links, unless they are more than max_depth links away
+        from the starting url.
+        """
+        _, url, found, failed, fingerprint = report
+        base_url = self.state.starting_url[1]
+        self.state._in_flight.discard((url, base_url))
+        self.state.crawl_state.mark_done((url, base_url))
+        if fingerprint is not None:
+            self.state.crawl_state.set_fingerprint(url, *fingerprint)
+        if self.state.graph is not None:
+            self.state.graph.record_page(url, sorted(found), self.state._depth.get(url, 0))
+        depth = self.state._depth.pop(url, 0) + 1
+
+        for link, err_msg in failed:
+            self.state.failed_links.add((link, RuntimeError(err_msg)))
+            self.state.crawl_state.mark_failed((link, base_url), err_msg)
+
+        if self.state.max_depth is not None and depth > self.state.max_depth:
+            found = []
+        new_links = [(link, base_url) for link in found
+                     if link not in self.state.links and (link, base_url) not in self.state.to_visit]
+        for link in new_links:
+            self.state.to_visit.add(link)
+            self.state._depth[link[0]] = depth
+        self.state.crawl_state.add_pending(new_links, depth)
+        for link in new_links:
+            self._dispatch(link, task_queues)
+
+        print(f"Links visited: {len(self.state.links)}, in flight: {len(self.state._in_flight)}")
+
+
+async def run_sharded_soupsmaker(num_shards: Optional[int] = None,
+                                 **soupsmaker_kwargs: Any) -> None:
+    """Run a sharded crawl and save progress on KeyboardInterrupt or if a shard crashes.
+    num_shards defaults to the number of CPU cores. Keyword arguments are passed to SoupsMaker,
+    where cap is the number of tabs per shard.
+    """
+    coordinator = ShardCoordinator(num_shards or os.cpu_count() or 1, **soupsmaker_kwargs)
+    try:
+        await coordinator.main()
+    except (asyncio.CancelledError, RuntimeError) as e:
+        print("Sharded process of adding links interrupted.", e)
+        coordinator.state.save_progress()  # save progress if interrupted
+
+
+if __name__ == '__main__':
+    asyncio.run(run_sharded_soupsmaker(num_shards=4, cap=4, resume=False, save_html=False,
+                                       save_text=False, save_json=True,
+                                       starting_url=(URL, BASE_URL)))
@@ -0,0 +1,320 @@
+"""
+A lifecycle manager for the browser tabs used while crawling.
+
+Notion's single-page app leaks memory across navigations, so a tab that is reused for a whole
+crawl keeps growing. The tab pool:
+1. Hands out tabs from a free list (an asyncio queue), so each tab is used by one worker at a time;
+2. Recycles a tab (closes it and opens a fresh one) after a number of navigations,
+or when its JS heap grows past a threshold;
+3. Recycles the whole browser context when the crawler and its browser use too much memory.
+The old context is closed once its last tab is checked in, so tabs in use are never killed.
+If only one context may be open at a time (a persistent browser profile), new tabs are held back
+until the tabs in use are checked in, then the old context is closed before the new one is opened;
+4. Opens a new context (relaunching the browser if needed) after the browser crashes.
+Every retired tab (and every tab still open when the pool is closed) is logged with its number
+of navigations, peak JS heap and the reason it was retired.
+"""
+
+import asyncio
+import csv
+import itertools
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from playwright.async_api import BrowserContext, Page
+
+from src.file_config import TAB_LOG_PATH
+from src.utils.memory import process_tree_rss
+
+# Chromium-only: the JS heap used by the page, or 0 in other browsers
+JS_HEAP_SCRIPT = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+
+# Number of check-ins between two measurements of the resident memory (a /proc scan)
+RSS_CHECK_EVERY = 10
+
+# Time (in seconds) given to a page script once a page's time budget has run out,
+# e.g. to measure the JS heap of a tab at check-in
+EVALUATE_GRACE = 5.0
+
+
+@dataclass
+class Tab:
+    """A browser tab handed out by a TabPool.
+
+    Instance Attributes:
+      - tab_id: a unique number of the tab.
+      - page: the Playwright page of the tab.
+      - context: the browser context the tab belongs to.
+      - generation: the generation of the context (see `TabPool`) the tab was opened in.
+      - created_at: when the tab was opened (seconds since the epoch).
+      - navigations: number of times the tab has been checked out and back in.
+      - js_heap: the JS heap (in bytes) used by the tab at its last check-in.
+      - peak_js_heap: the largest JS heap (in bytes) seen for the tab.
+    """
+    tab_id: int
+    page: Page
+    context: BrowserContext
+    generation: int
+    created_at: float
+    navigations: int = 0
+    js_heap: int = 0
+    peak_js_heap: int = 0
+
+
+class TabPool:
+    """A pool of at most `size` browser tabs that are recycled before they use too much memory.
+
+    Instance Attributes:
+      - size: maximum number of open tabs.
+      - max_navigations: number of navigations after which a tab is recycled.
+      - max_js_heap: JS heap (in bytes) above which a tab is recycled, or None for no limit.
+      - max_rss: resident memory (in bytes) of the crawler and its browser above which the browser
+      context (with all of its tabs) is recycled, or None for no limit.
+      - exclusive: whether only one browser context may be open at a time (e.g. a persistent
+      browser profile, which one browser at a time may use).
+      - context: the current browser context, in which new tabs are opened.
+      - tabs_recycled: number of tabs closed because of their navigations or JS heap.
+      - contexts_recycled: number of browser contexts replaced because of memory.
+      - relaunches: number of new contexts opened after a browser crash.
+
+    Representation Invariants:
+      - self.size >= 1
+    """
+    # Private Instance Attributes:
+    #   - _launch: opens a new browser context (launching the browser if it is not running).
+    #   - _free: the free list. None entries are free slots in which a new tab may be opened.
+    #   - _live: open tabs, by tab id.
+    #   - _generation: incremented every time a new context is opened.
+    #   Tabs of an older generation are closed instead of being reused.
+    #   - _open_tabs: context -> number of open tabs in that context.
+    #   - _closed: contexts that have been closed (e.g. a persistent context whose browser crashed).
+    #   - _in_use: ids of the tabs that are checked out.
+    #   - _ready: cleared while an exclusive context waits for its tabs in use to be checked in
+    #   before it is replaced. No tab is checked out meanwhile.
+    #   - _context_lock: makes sure only one new context is opened at a time.
+    #   - _ids: generates tab ids.
+    #   - _checkins: number of check-ins so far.
+    #   - _log_path: the csv file retired tabs are logged to.
+
+    size: int
+    max_navigations: int
+    max_js_heap: Optional[int]
+    max_rss: Optional[int]
+    exclusive: bool
+    context: Optional[BrowserContext]
+    tabs_recycled: int
+    contexts_recycled: int
+    relaunches: int
+
+    _launch: Callable[[], Awaitable[BrowserContext]]
+    _free: asyncio.Queue
+    _live: dict[int, Tab]
+    _generation: int
+    _open_tabs: dict[BrowserContext, int]
+    _closed: set[BrowserContext]
+    _in_use: set[int]
+    _ready: asyncio.Event
+    _context_lock: asyncio.Lock
+    _ids: itertools.count
+    _checkins: int
+    _log_path: Path
+
+    def __init__(self, launch: Callable[[], Awaitable[BrowserContext]], size: int,
+                 max_navigations: int = 100, max_js_heap: Optional[int] = None,
+                 max_rss: Optional[int] = None, exclusive: bool = False,
+                 log_path: Path = TAB_LOG_PATH) -> None:
+        self.size = size
+        self.max_navigations = max_navigations
+        self.max_js_heap = max_js_heap
+        self.max_rss = max_rss
+        self.exclusive = exclusive
+        self.context = None
+        self.tabs_recycled = 0
+        self.contexts_recycled = 0
+        self.relaunches = 0
+
+        self._launch = launch
+        self._free = asyncio.Queue()
+        for _ in range(size):
+            self._free.put_nowait(None)
+        self._live = {}
+        self._generation = 0
+        self._open_tabs = {}
+        self._closed = set()
+        self._in_use = set()
+        self._ready = asyncio.Event()
+        self._ready.set()
+        self._context_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        self._checkins = 0
+        self._log_path = log_path
+
+        with open(self._log_path, "w", newline="") as f:
+            csv.writer(f).writerow(["tab_id", "generation", "seconds_open", "navigations",
+                                    "peak_js_heap_mb", "reason"])
+
+    async def start(self) -> BrowserContext:
+        """Open the first browser context and return it."""
+        await self._new_context(self._generation)
+        return self.context
+
+    async def checkout(self) -> Tab:
+        """Return a tab for the exclusive use of the caller until it is checked back in.
+        Wait if all tabs are in use.
+        """
+        tab = await self._free.get()
+        try:
+            await self._ready.wait()
+            if self.context is None or self.context in self._closed or not _is_connected(self.context):
+                print("Browser disconnected, opening a new browser context.")
+                self.relaunches += 1
+                await self._new_context(self._generation)
+            if tab is not None and (tab.generation != self._generation or tab.page.is_closed()):
+                await self._retire(tab, "stale context" if tab.generation != self._generation else "closed",
+                                   free_slot=False)
+                tab = None
+            if tab is None:
+                tab = await self._new_tab()
+        except BaseException:
+            self._free.put_nowait(None)   # give the slot back
+            raise
+        self._in_use.add(tab.tab_id)
+        return tab
+
+    async def checkin(self, tab: Tab) -> None:
+        """Return a tab taken with `checkout`, recycling it (or its whole context) if needed."""
+        tab.navigations += 1
+        self._checkins += 1
+        try:
+            tab.js_heap = int(await asyncio.wait_for(tab.page.evaluate(JS_HEAP_SCRIPT), EVALUATE_GRACE))
+            tab.peak_js_heap = max(tab.peak_js_heap, tab.js_heap)
+        except asyncio.TimeoutError:
+            # The page's main thread is hung (e.g. the page ran out of its time budget)
+            await self._retire(tab, "unresponsive")
+            return
+        except Exception:
+            # The tab (or the whole browser) crashed
+            await self._retire(tab, "crashed")
+            return
+        finally:
+            self._in_use.discard(tab.tab_id)
+
+        if (self.max_rss is not None and self._checkins % RSS_CHECK_EVERY == 0
+                and tab.generation == self._generation):
+            rss = process_tree_rss()
+            if rss > self.max_rss:
+                print(f"Crawler using {rss / 1e6:.0f} MB, recycling the browser context.")
+                self.contexts_recycled += 1
+                await self._new_context(self._generation)
+
+        if tab.generation != self._generation:
+            await self._retire(tab, "stale context")
+        elif tab.navigations >= self.max_navigations:
+            self.tabs_recycled += 1
+            await self._retire(tab, f"{tab.navigations} navigations")
+        elif self.max_js_heap is not None and tab.js_heap > self.max_js_heap:
+            self.tabs_recycled += 1
+            await self._retire(tab, f"JS heap {tab.js_heap / 1e6:.0f} MB")
+        else:
+            self._free.put_nowait(tab)
+
+    def telemetry(self) -> list[dict]:
+        """Return the tab id, age, navigations and JS heap (current and peak) of every open tab."""
+        now = time.time()
+        return [{"tab_id": tab.tab_id, "generation": tab.generation,
+                 "seconds_open": round(now - tab.created_at, 1), "navigations": tab.navigations,
+                 "js_heap_mb": round(tab.js_heap / 1e6, 1), "peak_js_heap_mb": round(tab.peak_js_heap / 1e6, 1)}
+                for tab in self._live.values()]
+
+    async def close(self) -> None:
+        """Close every open tab and browser context.
+        The tabs still open are logged (see `telemetry`) with "crawl finished" as the reason.
+        """
+        open_tabs = self.telemetry()
+        with open(self._log_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            for row in open_tabs:
+                writer.writerow([row["tab_id"], row["generation"], row["seconds_open"], row["navigations"],
+                                 row["peak_js_heap_mb"], "crawl finished"])
+        for context in list(self._open_tabs):
+            await _close_quietly(context)
+        self._open_tabs.clear()
+        self._closed.clear()
+        self._live.clear()
+        self.context = None
+        print(f"Tabs recycled: {self.tabs_recycled}, contexts recycled: {self.contexts_recycled}, "
+              f"browser relaunches: {self.relaunches}.")
+        if open_tabs:
+            print(f"{len(open_tabs)} tabs open at the end, peak JS heap "
+                  f"{max(row['peak_js_heap_mb'] for row in open_tabs):.1f} MB.")
+
+    async def _new_context(self, generation: int) -> None:
+        """Open a new browser context, unless another one has been opened since the given generation.
+        The old context is closed once its tabs are checked in (see self.exclusive).
+        """
+        async with self._context_lock:
+            if generation != self._generation:
+                return
+            old = self.context
+            if self.exclusive and old is not None and old not in self._closed and _is_connected(old):
+                # Wait for the tabs in use to be checked in, checking no tab out meanwhile
+                self._ready.clear()
+                while self._in_use:
+                    await asyncio.sleep(0.05)
+                self._open_tabs.pop(old, None)
+                await _close_quietly(old)
+            try:
+                self.context = await self._launch()
+            finally:
+                self._ready.set()
+            self.context.on("close", self._closed.add)
+            self._generation += 1
+            self._open_tabs[self.context] = 0
+            if old is not None and self._open_tabs.get(old) == 0:
+                del self._open_tabs[old]
+                await _close_quietly(old)
+
+    async def _new_tab(self) -> Tab:
+        """Open a new tab in the current context."""
+        context = self.context
+        page = await context.new_page()
+        tab = Tab(next(self._ids), page, context, self._generation, time.time())
+        self._open_tabs[context] += 1
+        self._live[tab.tab_id] = tab
+        return tab
+
+    async def _retire(self, tab: Tab, reason: str, free_slot: bool = True) -> None:
+        """Close the given tab, log it, and (if free_slot) free its slot in the pool.
+        Close its context if it was the last tab of a context that has been replaced.
+        """
+        self._live.pop(tab.tab_id, None)
+        await _close_quietly(tab.page)
+        if tab.context in self._open_tabs:
+            self._open_tabs[tab.context] -= 1
+            if self._open_tabs[tab.context] == 0 and tab.context is not self.context:
+                del self._open_tabs[tab.context]
+                await _close_quietly(tab.context)
+        if free_slot:
+            self._free.put_nowait(None)
+
+        with open(self._log_path, "a", newline="") as f:
+            csv.writer(f).writerow([tab.tab_id, tab.generation, f"{time.time() - tab.created_at:.1f}",
+                                    tab.navigations, f"{tab.peak_js_heap / 1e6:.1f}", reason])
+        print(f"Tab {tab.tab_id} retired after {tab.navigations} navigations ({reason}).")
+
+
+def _is_connected(context: BrowserContext) -> bool:
+    """Return whether the browser of the given context is still running.
+    (A persistent context has no separate browser: its crash is detected by its close event.)
+    """
+    return context.browser is None or context.browser.is_connected()
+
+
+async def _close_quietly(closable: Page | BrowserContext) -> None:
+    """Close the given page or context, ignoring errors (e.g. if the browser has crashed)."""
+    try:
+        await closable.close()
+    except Exception:
+        pass
@@ -0,0 +1,72 @@
+"""
+Helpers for working with Notion urls.
+"""
+
+import hashlib
+import re
+from urllib.parse import urlparse
+from typing import Optional
+
+# A Notion page/block ID: 32 hex digits, optionally in dashed UUID form (8-4-4-4-12)
+NOTION_ID_PATTERN = re.compile(
+    r"(?<![0-9a-f])([0-9a-f]{8})-?([0-9a-f]{4})-?([0-9a-f]{4})-?([0-9a-f]{4})-?([0-9a-f]{12})(?![0-9a-f])",
+    re.IGNORECASE,
+)
+
+
+def notion_page_id(url: str) -> Optional[str]:
+    """Return the Notion page ID (32 lowercase hex digits, no dashes) in the path of the given url,
+    or None if the url does not contain one.
+
+    >>> notion_page_id("https://utat-ss.notion.site/UTAT-Space-Systems-660068a07b694305b56c483962e927c5")
+    '660068a07b694305b56c483962e927c5'
+    >>> notion_page_id("https://books.toscrape.com/") is None
+    True
+    """
+    path = urlparse(url).path
+    matches = NOTION_ID_PATTERN.findall(path)
+    if not matches:
+        return None
+    # The page ID is the last ID in the path (e.g. after a workspace or parent segment)
+    return "".join(matches[-1]).lower()
+
+
+def canonical_url(url: str) -> str:
+    """Return the canonical form of the given url, used as its identity key while crawling.
+    Every variant of a Notion page url (title slug, renamed title, bare ID, dashed UUID,
+    query and fragment) maps to `<scheme>://<host>/<page ID>`, which Notion also serves.
+    Other urls only lose their query and fragment.
+
+    >>> canonical_url("https://utat-ss.notion.site/UTAT-Space-Systems-660068a07b694305b56c483962e927c5?pvs=4")
+    'https://utat-ss.notion.site/660068a07b694305b56c483962e927c5'
+    >>> canonical_url("https://utat-ss.notion.site/660068a0-7b69-4305-b56c-483962e927c5#intro")
+    'https://utat-ss.notion.site/660068a07b694305b56c483962e927c5'
+    >>> canonical_url("https://books.toscrape.com/catalogue/?page=2")
+    'https://books.toscrape.com/catalogue/'
+    """
+    parsed = urlparse(url)._replace(query="", fragment="")
+    page_id = notion_page_id(url)
+    if page_id is not None:
+        parsed = parsed._replace(path="/" + page_id, params="")
+    return parsed.geturl()
+
+
+def dashed_uuid(page_id: str) -> str:
+    """Return the given 32-hex-digit Notion page ID in dashed UUID form (8-4-4-4-12).
+
+    >>> dashed_uuid("660068a07b694305b56c483962e927c5")
+    '660068a0-7b69-4305-b56c-483962e927c5'
+    """
+    return f"{page_id[:8]}-{page_id[8:12]}-{page_id[12:16]}-{page_id[16:20]}-{page_id[20:]}"
+
+
+def shard_of(url: str, num_shards: int) -> int:
+    """Return the shard (in range(num_shards)) responsible for the given url.
+    Urls of the same Notion page always map to the same shard.
+
+    Preconditions:
+      - num_shards >= 1
+    """
+    key = notion_page_id(url) or urlparse(url)._replace(query=None, fragment=None).geturl()
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
@@ -0,0 +1,252 @@
+"""
+A compact set of visited pages for very large workspaces.
+
+Keeping every visited url as a Python string costs the url's length (plus the string and set
+overhead, about 100 bytes more) per page. Instead, every page is reduced to a 16-byte key
+(its Notion page ID, or a hash of the url for other pages, see `doc_key`), and the keys are stored
+back to back in one bytearray, used as an open-addressing hash table with linear probing:
+about 16 / load factor bytes per page, whatever the length of its url.
+Keys are uniformly distributed (random UUIDs or hashes), so their first bytes are used as the hash.
+
+An optional Bloom filter in front of the table answers most lookups of unseen pages
+without probing the table.
+"""
+
+import math
+from typing import Iterable, Iterator, Optional
+
+from src.scraping.doc_store import doc_key
+
+KEY_BYTES = 16
+EMPTY = bytes(KEY_BYTES)
+# The table is grown (doubled) when more than this fraction of its slots is used
+MAX_LOAD = 0.6
+
+
+def url_key(url: str) -> bytes:
+    """Return the 16-byte key of the page at the given url.
+
+    >>> url_key("https://utat-ss.notion.site/UTAT-Space-Systems-660068a07b694305b56c483962e927c5").hex()
+    '660068a07b694305b56c483962e927c5'
+    """
+    return bytes.fromhex(doc_key(url))
+
+
+class KeySet:
+    """A set of 16-byte keys stored in an array-backed, open-addressing hash table.
+
+    Representation Invariants:
+      - the number of slots is a power of 2
+      - len(self) <= MAX_LOAD * number of slots
+    """
+    # Private Instance Attributes:
+    #   - _table: the slots, KEY_BYTES bytes each. An all-zero slot is empty.
+    #   - _slots: the number of slots.
+    #   - _size: the number of keys stored in the table.
+    #   - _has_empty_key: whether the all-zero key (which cannot be stored in a slot) is in the set.
+
+    _table: bytearray
+    _slots: int
+    _size: int
+    _has_empty_key: bool
+
+    def __init__(self, expected: int = 1024) -> None:
+        self._slots = 1 << max(4, math.ceil(math.log2(expected / MAX_LOAD + 1)))
+        self._table = bytearray(self._slots * KEY_BYTES)
+        self._size = 0
+        self._has_empty_key = False
+
+    def __len__(self) -> int:
+        return self._size + self._has_empty_key
+
+    def __contains__(self, key: bytes) -> bool:
+        if key == EMPTY:
+            return self._has_empty_key
+        return self._find(key)[1]
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._has_empty_key:
+            yield EMPTY
+        table = self._table
+        for start in range(0, len(table), KEY_BYTES):
+            key = bytes(table[start:start + KEY_BYTES])
+            if key != EMPTY:
+                yield key
+
+    def add(self, key: bytes) -> bool:
+        """Add the given key, and return whether it was not in the set yet.
+
+        Preconditions:
+          - len(key) == KEY_BYTES
+        """
+        if key == EMPTY:
+            added = not self._has_empty_key
+            self._has_empty_key = True
+            return added
+        slot, found = self._find(key)
+        if found:
+            return False
+        start = slot * KEY_BYTES
+        self._table[start:start + KEY_BYTES] = key
+        self._size += 1
+        if self._size > MAX_LOAD * self._slots:
+            self._resize(self._slots * 2)
+        return True
+
+    def discard(self, key: bytes) -> None:
+        """Remove the given key if it is in the set.
+        The keys after it in its probe run are shifted back, so no tombstones are needed.
+        """
+        if key == EMPTY:
+            self._has_empty_key = False
+            return
+        slot, found = self._find(key)
+        if not found:
+            return
+        table, mask = self._table, self._slots - 1
+        hole = slot
+        slot = (slot + 1) & mask
+        while True:
+            start = slot * KEY_BYTES
+            moved = bytes(table[start:start + KEY_BYTES])
+            if moved == EMPTY:
+                break
+            home = self._home(moved)
+            # Move the key into the hole unless its home slot lies (cyclically) in (hole, slot]
+            if (slot - home) & mask >= (slot - hole) & mask:
+                table[hole * KEY_BYTES:(hole + 1) * KEY_BYTES] = moved
+                hole = slot
+            slot = (slot + 1) & mask
+        table[hole * KEY_BYTES:(hole + 1) * KEY_BYTES] = EMPTY
+        self._size -= 1
+
+    def nbytes(self) -> int:
+        """Return the size (in bytes) of the table."""
+        return len(self._table)
+
+    def _home(self, key: bytes) -> int:
+        """Return the slot the given key hashes to."""
+        return int.from_bytes(key[:8], "little") & (self._slots - 1)
+
+    def _find(self, key: bytes) -> tuple[int, bool]:
+        """Return the slot holding the given key and True, or the empty slot
+        where it would be inserted and False.
+        """
+        table, mask = self._table, self._slots - 1
+        slot = self._home(key)
+        while True:
+            start = slot * KEY_BYTES
+            stored = table[start:start + KEY_BYTES]
+            if stored == key:
+                return slot, True
+            if stored == EMPTY:
+                return slot, False
+            slot = (slot + 1) & mask
+
+    def _resize(self, slots: int) -> None:
+        """Rehash every key into a table with the given number of slots."""
+        keys = [key for key in self if key != EMPTY]
+        self._slots = slots
+        self._table = bytearray(slots * KEY_BYTES)
+        self._size = 0
+        for key in keys:
+            slot, _ = self._find(key)
+            self._table[slot * KEY_BYTES:(slot + 1) * KEY_BYTES] = key
+            self._size += 1
+
+
+class BloomFilter:
+    """A Bloom filter of 16-byte keys: `key in filter` is never False for an added key,
+    and is True for a key that was never added with probability about error_rate
+    (while at most `capacity` keys have been added).
+
+    Instance Attributes:
+      - capacity: the number of keys the filter is sized for.
+      - error_rate: the false positive rate at capacity.
+      - num_hashes: number of bits set per key.
+    """
+    # Private Instance Attributes:
+    #   - _bits: the bit array.
+    #   - _num_bits: the number of bits.
+
+    capacity: int
+    error_rate: float
+    num_hashes: int
+
+    _bits: bytearray
+    _num_bits: int
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._num_bits = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self._bits
+        return all(bits[i >> 3] & (1 << (i & 7)) for i in self._positions(key))
+
+    def add(self, key: bytes) -> None:
+        """Add the given key."""
+        for i in self._positions(key):
+            self._bits[i >> 3] |= 1 << (i & 7)
+
+    def nbytes(self) -> int:
+        """Return the size (in bytes) of the bit array."""
+        return len(self._bits)
+
+    def _positions(self, key: bytes) -> Iterator[int]:
+        """Yield the bit positions of the given key (double hashing on the halves of the key)."""
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self._num_bits
+
+
+class VisitedUrls:
+    """The set of visited pages of a crawl, stored as 16-byte page keys (see `url_key`).
+    Url variants of the same page (e.g. a different title slug) are the same member.
+
+    Instance Attributes:
+      - bloom: a Bloom filter checked before the table, or None.
+    """
+    # Private Instance Attributes:
+    #   - _keys: the keys of the visited pages.
+
+    bloom: Optional[BloomFilter]
+
+    _keys: KeySet
+
+    def __init__(self, urls: Iterable[str] = (), bloom_capacity: Optional[int] = None,
+                 error_rate: float = 0.01) -> None:
+        self.bloom = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else None
+        self._keys = KeySet()
+        for url in urls:
+            self.add(url)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, url: str) -> bool:
+        key = url_key(url)
+        if self.bloom is not None and key not in self.bloom:
+            return False
+        return key in self._keys
+
+    def add(self, url: str) -> None:
+        """Add the page at the given url."""
+        key = url_key(url)
+        if self.bloom is not None:
+            self.bloom.add(key)
+        self._keys.add(key)
+
+    def discard(self, url: str) -> None:
+        """Remove the page at the given url if it is in the set.
+        (It stays in the Bloom filter, which only makes later lookups of it probe the table.)
+        """
+        self._keys.discard(url_key(url))
+
+    def nbytes(self) -> int:
+        """Return the size (in bytes) of the table and the Bloom filter."""
+        return self._keys.nbytes() + (self.bloom.nbytes() if self.bloom is not None else 0)
@@ -0,0 +1,95 @@
+"""Contain unit tests for the compressed html archive used by the scraper."""
+
+import random
+
+import pytest
+
+from src.scraping.archive import HtmlArchive, archive_json_docs
+
+PAGE_ID = "660068a07b694305b56c483962e927c5"
+URL = f"https://utat-ss.notion.site/UTAT-Space-Systems-{PAGE_ID}"
+
+
+def _notion_like_html(seed: int, blocks: int = 200) -> str:
+    """Return html with the repetitive markup of a rendered Notion page."""
+    rng = random.Random(seed)
+    rows = [f'<div class="notion-selectable notion-text-block" data-block-id="{rng.getrandbits(64):016x}" '
+            f'style="width: 100%; max-width: 1248px; margin-top: 1px; margin-bottom: 1px;">'
+            f'<div style="padding: 3px 2px;">Block {i} of page {seed}</div></div>' for i in range(blocks)]
+    return "<html><body>" + "".join(rows) + "</body></html>"
+
+
+def test_append_and_get_latest_across_segments(tmp_path) -> None:
+    """
+    Test that the latest record of a page is returned after the archive rolled over
+    to new segments, and that records survive reopening the archive.
+    """
+    archive = HtmlArchive(tmp_path, segment_bytes=2000)
+    for i in range(5):
+        archive.append(f"https://utat-ss.notion.site/{i:032x}", _notion_like_html(i), f"{i:032x}")
+    archive.append(URL, "<p>old</p>", PAGE_ID)
+    archive.append(URL, "<p>new</p>", PAGE_ID, partial=True)
+    archive.close()
+
+    assert len(list(tmp_path.glob("segment-*.warc.gz"))) > 1
+    reopened = HtmlArchive(tmp_path)
+    record = reopened.get(PAGE_ID)
+    assert (record.url, record.html, record.partial) == (URL, "<p>new</p>", True)
+    assert reopened.get(f"{3:032x}").html == _notion_like_html(3)
+    assert len(list(reopened.latest())) == 6
+    assert reopened.get("0" * 31 + "f") is None
+
+
+def test_compresses_notion_like_html(tmp_path) -> None:
+    """
+    Test that repetitive Notion-like html takes an order of magnitude less space in the archive.
+    """
+    archive = HtmlArchive(tmp_path)
+    for i in range(20):
+        archive.append(f"https://utat-ss.notion.site/{i:032x}", _notion_like_html(i), f"{i:032x}")
+    stats = archive.stats()
+    archive.close()
+
+    assert stats["pages"] == 20
+    assert stats["raw_bytes"] >= 10 * stats["stored_bytes"]
+
+
+def test_rebuild_index_recovers_unindexed_records(tmp_path) -> None:
+    """
+    Test that records written to a segment but never committed to the index (a crash)
+    are recovered by rebuild_index, and that a truncated last record is ignored.
+    """
+    archive = HtmlArchive(tmp_path, commit_every=100)
+    archive.append(URL, "<p>committed</p>", PAGE_ID)
+    archive.flush()
+    archive.append("https://utat-ss.notion.site/" + "1" * 32, "<p>lost</p>", "1" * 32)
+    archive._conn.rollback()   # the index batch is lost, the segment is not
+    archive.close()
+    segment = next(tmp_path.glob("segment-*.warc.gz"))
+    with open(segment, "ab") as f:
+        f.write(b"\x1f\x8b\x08\x00garbage")
+
+    reopened = HtmlArchive(tmp_path)
+    assert reopened.get("1" * 32) is None
+    assert reopened.rebuild_index() == 1
+    assert reopened.get("1" * 32).html == "<p>lost</p>"
+    assert reopened.rebuild_index() == 0
+
+
+def test_archive_json_docs(tmp_path) -> None:
+    """
+    Test that json docs are re-extracted from the latest snapshots of every (shard) archive.
+    """
+    pytest.importorskip("bs4")
+    archive = HtmlArchive(tmp_path / "shard0")
+    archive.append(URL, "<p>old text</p>", PAGE_ID)
+    archive.append(URL, "<p>new text</p>", PAGE_ID)
+    archive.close()
+
+    assert archive_json_docs(tmp_path) == [
+        {"text": "new text", "source": URL, "page_id": PAGE_ID, "partial": False}
+    ]
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,86 @@
+"""Contain unit tests for the structured block extraction and block-aware chunking."""
+
+import pytest
+
+from src.scraping.blocks import Block, group_blocks
+
+NOTION_HTML = """
+<html><body>
+<div class="breadcrumbs">Space Systems</div>
+<div class="notion-selectable notion-header-block" data-block-id="h1"><h2>Payload</h2></div>
+<div class="notion-selectable notion-text-block" data-block-id="p1">The camera <b>images</b> Earth.</div>
+<div class="notion-selectable notion-toggle-block" data-block-id="t1">Details
+  <div class="notion-selectable notion-bulleted_list-block" data-block-id="l1">Lens: 50 mm</div>
+</div>
+<div class="notion-selectable notion-table-block" data-block-id="tb">
+  <table><tbody>
+    <tr data-block-id="r1"><td>Mass</td><td>1.2 kg</td></tr>
+    <tr data-block-id="r2"><td></td><td></td></tr>
+  </tbody></table>
+</div>
+<div class="notion-selectable notion-divider-block" data-block-id="d1"></div>
+<script>var hidden = "not text";</script>
+</body></html>
+"""
+
+
+def _block(block_type: str, text: str, level: int = 0) -> dict:
+    """Return a block mapping as saved in a JSONL block doc."""
+    return {"block_id": text, "type": block_type, "level": level, "text": text}
+
+
+def test_soup_blocks_types_depth_and_own_text() -> None:
+    """
+    Test that every block gets its type, level, depth and own text (without the text of nested
+    blocks), that table rows join their cells, and that empty blocks and scripts are skipped.
+    """
+    bs4 = pytest.importorskip("bs4")
+    from src.scraping.blocks import soup_blocks
+
+    assert soup_blocks(bs4.BeautifulSoup(NOTION_HTML, "html.parser")) == [
+        Block(None, "title", "Space Systems"),
+        Block("h1", "heading", "Payload", level=1),
+        Block("p1", "paragraph", "The camera\nimages\nEarth."),
+        Block("t1", "toggle", "Details"),
+        Block("l1", "list_item", "Lens: 50 mm", depth=1),
+        Block("r1", "table_row", "Mass | 1.2 kg", depth=1),
+    ]
+
+
+def test_group_blocks_cuts_at_headings_and_keeps_sections() -> None:
+    """
+    Test that chunks never span two sections, that nested headings build the section path
+    that starts every chunk, and that a heading of the same level closes the previous section.
+    """
+    blocks = [
+        _block("title", "Handbook"),
+        _block("heading", "Payload", 1),
+        _block("paragraph", "Camera"),
+        _block("heading", "Thermal", 2),
+        _block("list_item", "Heater"),
+        _block("heading", "Power", 1),
+        _block("paragraph", "Battery"),
+    ]
+    chunks = group_blocks(blocks, chunk_size=1000)
+
+    assert [text for text, _ in chunks] == ["Handbook", "Payload\nCamera", "Payload > Thermal\nHeater",
+                                           "Power\nBattery"]
+    assert [metadata["section"] for _, metadata in chunks] == ["", "Payload", "Payload > Thermal", "Power"]
+    assert chunks[2][1]["block_id"] == "Thermal"
+
+
+def test_group_blocks_splits_long_sections() -> None:
+    """
+    Test that a long section is split into chunks of at most chunk_size characters of blocks,
+    each continuation prefixed with its section, and that an overlong block is kept whole.
+    """
+    blocks = [_block("heading", "Ops", 1)] + [_block("paragraph", f"row {i:02d}") for i in range(6)] \
+        + [_block("code", "x" * 50)]
+    chunks = group_blocks(blocks, chunk_size=20)
+
+    assert [text for text, _ in chunks] == ["Ops\nrow 00\nrow 01", "Ops\nrow 02\nrow 03",
+                                           "Ops\nrow 04\nrow 05", "Ops\n" + "x" * 50]
+
+
+if __name__ == '__main__':
+    pytest.main()
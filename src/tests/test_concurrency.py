@@ -0,0 +1,64 @@
+"""Contain unit tests for the AIMD controller of the number of active crawl tabs."""
+
+from src.scraping.concurrency import AimdController
+
+BASE_URL = "https://utat-ss.notion.site/"
+
+
+def _controller(tmp_path) -> AimdController:
+    """Return a controller between 2 and 8 tabs that adjusts after every 2 pages."""
+    return AimdController(2, 8, window=2, base_url=BASE_URL, log_path=tmp_path / "concurrency.csv")
+
+
+def _window(controller: AimdController, latency: float = 1.0, failed: bool = False) -> int:
+    """Finish one window of pages with the given latency and return the new limit."""
+    for _ in range(controller.window):
+        controller.record_page(latency, failed)
+    return controller.limit
+
+
+def test_additive_increase_up_to_max(tmp_path) -> None:
+    """
+    Test that the limit grows by one tab per quiet window, and never above max_tabs.
+    """
+    controller = _controller(tmp_path)
+    assert controller.limit == 4
+    assert [_window(controller) for _ in range(6)] == [5, 6, 7, 8, 8, 8]
+    assert controller.timeline[-1][2] == "hold"
+    assert (tmp_path / "concurrency.csv").read_text().count("\n") == 8    # header, start, 6 windows
+
+
+def test_multiplicative_decrease_down_to_min(tmp_path) -> None:
+    """
+    Test that throttled responses, errors and a latency spike each halve the limit,
+    and that it never goes below min_tabs.
+    """
+    controller = _controller(tmp_path)
+    for _ in range(4):
+        _window(controller)
+    assert controller.limit == 8
+
+    controller.record_status(429, BASE_URL + "api/v3/loadPageChunk")
+    assert _window(controller) == 4
+    assert _window(controller, failed=True) == 2
+    assert _window(controller, latency=10.0) == 2
+    assert [reason.split(":")[0] for _, _, reason in controller.timeline[-3:]] == ["decrease"] * 3
+
+
+def test_third_party_errors_are_ignored(tmp_path) -> None:
+    """
+    Test that 429 and 5xx responses from other hosts (e.g. analytics) do not throttle the crawl,
+    and that other statuses from the crawled site do not either.
+    """
+    controller = _controller(tmp_path)
+    controller.record_status(503, "https://analytics.example.com/collect")
+    controller.record_status(404, BASE_URL + "missing")
+    assert _window(controller) == 5
+
+    controller.record_status(503, BASE_URL + "api/v3/syncRecordValues")
+    assert _window(controller) == 2
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
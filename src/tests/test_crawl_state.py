@@ -0,0 +1,65 @@
+"""Contain unit tests for the SQLite-backed crawl state of the scraper."""
+
+from src.scraping.crawl_state import CrawlState, DONE, FAILED, PENDING
+
+BASE_URL = "https://utat-ss.notion.site/"
+
+
+def test_resume_requeues_in_progress(tmp_path) -> None:
+    """
+    Test that after an unclean shutdown, committed in-progress urls are pending again
+    and finished urls stay visited.
+    """
+    db_path = tmp_path / "state.sqlite3"
+    state = CrawlState(db_path, checkpoint_every=1)
+    state.add_pending([(BASE_URL + "a", BASE_URL), (BASE_URL + "b", BASE_URL)])
+    state.mark_in_progress((BASE_URL + "a", BASE_URL))
+    state.mark_done((BASE_URL + "b", BASE_URL))   # commits the batch
+
+    resumed = CrawlState(db_path)
+    assert resumed.requeue_in_progress() == 1
+    assert set(resumed.pending()) == {(BASE_URL + "a", BASE_URL)}
+    assert set(resumed.visited()) == {BASE_URL + "b"}
+
+
+def test_add_pending_keeps_existing_status(tmp_path) -> None:
+    """
+    Test that finding an already visited url again does not make it pending.
+    """
+    state = CrawlState(tmp_path / "state.sqlite3")
+    state.mark_done((BASE_URL + "a", BASE_URL))
+    state.mark_failed((BASE_URL + "b", BASE_URL), "Timeout")
+    state.add_pending([(BASE_URL + "a", BASE_URL), (BASE_URL + "b", BASE_URL), (BASE_URL + "c", BASE_URL)])
+
+    assert state.counts() == {DONE: 1, FAILED: 1, PENDING: 1}
+    assert list(state.failed()) == [(BASE_URL + "b", "Timeout")]
+
+
+def test_uncommitted_batch_is_lost_on_kill(tmp_path) -> None:
+    """
+    Test that progress is only durable once a batch of checkpoint_every pages is committed.
+    """
+    db_path = tmp_path / "state.sqlite3"
+    state = CrawlState(db_path, checkpoint_every=2)
+    state.mark_done((BASE_URL + "a", BASE_URL))
+    assert CrawlState(db_path).is_empty()
+
+    state.mark_done((BASE_URL + "b", BASE_URL))
+    assert set(CrawlState(db_path).visited()) == {BASE_URL + "a", BASE_URL + "b"}
+
+
+def test_pending_depths_survive_resume(tmp_path) -> None:
+    """
+    Test that depths of pending urls are kept on resume.
+    """
+    db_path = tmp_path / "state.sqlite3"
+    state = CrawlState(db_path)
+    state.add_pending([(BASE_URL + "a", BASE_URL)])
+    state.add_pending([(BASE_URL + "b", BASE_URL)], depth=3)
+    state.checkpoint()
+    assert CrawlState(db_path).pending_depths() == {BASE_URL + "a": 0, BASE_URL + "b": 3}
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
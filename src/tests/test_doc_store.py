@@ -0,0 +1,60 @@
+"""Contain unit tests for the content-addressed document store used by the scraper."""
+
+import os
+
+from src.scraping.doc_store import DocStore, doc_key
+
+PAGE_ID = "660068a07b694305b56c483962e927c5"
+
+
+def test_doc_key_same_for_url_variants() -> None:
+    """
+    Test that the slug, bare ID, dashed UUID and query/fragment variants of a Notion page
+    all map to the same document key.
+    """
+    variants = [
+        f"https://utat-ss.notion.site/UTAT-Space-Systems-{PAGE_ID}",
+        f"https://utat-ss.notion.site/Renamed-Title-{PAGE_ID}?pvs=4#heading",
+        f"https://utat-ss.notion.site/{PAGE_ID}",
+        "https://utat-ss.notion.site/660068a0-7b69-4305-b56c-483962e927c5",
+    ]
+    assert {doc_key(url) for url in variants} == {PAGE_ID}
+
+
+def test_doc_key_non_notion_url() -> None:
+    """
+    Test that urls without a Notion page ID get distinct, stable hash keys.
+    """
+    assert doc_key("https://books.toscrape.com/a") == doc_key("https://books.toscrape.com/a#top")
+    assert doc_key("https://books.toscrape.com/a") != doc_key("https://books.toscrape.com/b")
+
+
+def test_write_is_atomic_and_overwrites(tmp_path) -> None:
+    """
+    Test that writing a document twice leaves only the latest content and no temporary files.
+    """
+    store = DocStore(tmp_path, tmp_path, tmp_path)
+    path = store.json_path(f"https://utat-ss.notion.site/{PAGE_ID}")
+    store.write(path, "old")
+    store.write(path, "new")
+
+    assert path.read_text(encoding="utf-8") == "new"
+    assert os.listdir(tmp_path) == [path.name]
+
+
+def test_write_respects_umask(tmp_path) -> None:
+    """
+    Test that written documents get the same permissions as a file created with open().
+    """
+    store = DocStore(tmp_path, tmp_path, tmp_path)
+    path = store.json_path(f"https://utat-ss.notion.site/{PAGE_ID}")
+    store.write(path, "content")
+    with open(tmp_path / "plain.txt", "w") as f:
+        f.write("content")
+
+    assert os.stat(path).st_mode == os.stat(tmp_path / "plain.txt").st_mode
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
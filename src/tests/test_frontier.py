@@ -0,0 +1,67 @@
+"""Contain unit tests for the crawl frontier and its priorities."""
+
+import asyncio
+
+from src.scraping.frontier import Frontier
+from src.scraping.priority import BFS, DFS, CrawlPriority, load_key_urls
+
+BASE_URL = "https://books.toscrape.com/"
+
+
+def _drain(frontier: Frontier) -> list:
+    """Return every item currently available in the given frontier, in the order they come out."""
+    async def drain() -> list:
+        items = []
+        while frontier.qsize():
+            items.append(await frontier.get())
+            frontier.task_done()
+        return items
+    return asyncio.run(drain())
+
+
+def test_frontier_orders_by_priority_then_insertion() -> None:
+    """
+    Test that lower priorities come out first, and equal priorities come out in insertion order.
+    """
+    frontier = Frontier()
+    for item, priority in [("c", 2.0), ("a1", 1.0), ("b", 1.5), ("a2", 1.0)]:
+        frontier.put_nowait(item, priority)
+    assert _drain(frontier) == ["a1", "a2", "b", "c"]
+
+
+def test_key_urls_then_boosted_then_depth() -> None:
+    """
+    Test that key urls beat boosted pages, boosted pages beat the rest,
+    and depth orders pages within a tier (shallow first in BFS, deep first in DFS).
+    """
+    key = BASE_URL + "index.html"
+    boosted = BASE_URL + "catalogue/page-2.html"
+    for order, expected in [(BFS, ["key", "boosted", "shallow", "deep"]),
+                            (DFS, ["key", "boosted", "deep", "shallow"])]:
+        priority = CrawlPriority(order, boosted_prefixes=[BASE_URL + "catalogue/"], key_urls=[key])
+        frontier = Frontier()
+        frontier.put_nowait("deep", priority.priority(BASE_URL + "a/b/c.html", depth=3))
+        frontier.put_nowait("shallow", priority.priority(BASE_URL + "a.html", depth=1))
+        frontier.put_nowait("boosted", priority.priority(boosted, depth=5))
+        frontier.put_nowait("key", priority.priority(key, depth=7))
+        assert _drain(frontier) == expected
+
+
+def test_load_key_urls_tolerates_missing_and_empty_files(tmp_path) -> None:
+    """
+    Test that a missing, empty or non-object key urls file means no key urls,
+    and that the urls of a valid file are canonicalised.
+    """
+    path = tmp_path / "key_urls.json"
+    assert load_key_urls(path) == set()
+    for content in ["", "[]", "null"]:
+        path.write_text(content, encoding="utf-8")
+        assert load_key_urls(path) == set()
+    path.write_text('{"Home": "https://x.notion.site/Home-660068a07b694305b56c483962e927c5?pvs=4"}',
+                    encoding="utf-8")
+    assert load_key_urls(path) == {"https://x.notion.site/660068a07b694305b56c483962e927c5"}
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
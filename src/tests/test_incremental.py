@@ -0,0 +1,95 @@
+"""Contain unit tests for the change probe and page fingerprints of incremental re-crawls."""
+
+import asyncio
+from typing import Any
+
+from src.scraping.crawl_state import CrawlState
+from src.scraping.incremental import PROBE_BATCH_SIZE, probe_last_edited, text_fingerprint, unchanged_urls
+from src.scraping.urls import dashed_uuid
+
+BASE_URL = "https://utat-ss.notion.site/"
+
+
+class _Response:
+    """A stand-in for a Playwright APIResponse."""
+
+    def __init__(self, status: int, body: dict) -> None:
+        self.status = status
+        self.ok = status == 200
+        self._body = body
+
+    async def json(self) -> dict:
+        return self._body
+
+
+class _RequestContext:
+    """A stand-in for a Playwright APIRequestContext serving syncRecordValues
+    from the given last-edited times (by dashed block ID).
+    Blocks missing from last_edited are left out of the response, as for deleted pages.
+    """
+
+    def __init__(self, last_edited: dict[str, int], status: int = 200) -> None:
+        self.last_edited = last_edited
+        self.status = status
+        self.batches = []
+
+    async def post(self, endpoint: str, data: dict[str, Any]) -> _Response:
+        assert endpoint == BASE_URL + "api/v3/syncRecordValues"
+        ids = [request["pointer"]["id"] for request in data["requests"]]
+        self.batches.append(ids)
+        blocks = {block_id: {"value": {"value": {"last_edited_time": self.last_edited[block_id]}}}
+                  for block_id in ids if block_id in self.last_edited}
+        return _Response(self.status, {"recordMap": {"block": blocks}})
+
+
+def _page_id(i: int) -> str:
+    """Return the i-th test page ID."""
+    return f"{i:032x}"
+
+
+def test_probe_batches_and_missing_pages() -> None:
+    """
+    Test that pages are probed PROBE_BATCH_SIZE at a time, and that pages missing from
+    the response (e.g. deleted pages) are left out.
+    """
+    page_ids = [_page_id(i) for i in range(PROBE_BATCH_SIZE + 1)]
+    request = _RequestContext({dashed_uuid(page_id): 1000 + i for i, page_id in enumerate(page_ids)
+                               if i != 5})
+
+    last_edited = asyncio.run(probe_last_edited(request, BASE_URL, page_ids))
+
+    assert [len(batch) for batch in request.batches] == [PROBE_BATCH_SIZE, 1]
+    assert request.batches[1] == [dashed_uuid(page_ids[-1])]
+    assert len(last_edited) == PROBE_BATCH_SIZE
+    assert last_edited[page_ids[0]] == 1000 and last_edited[page_ids[-1]] == 1000 + PROBE_BATCH_SIZE
+    assert page_ids[5] not in last_edited
+
+
+def test_probe_failed_request() -> None:
+    """
+    Test that pages of a failed probe request are left out instead of raising.
+    """
+    request = _RequestContext({dashed_uuid(_page_id(1)): 1000}, status=500)
+    assert asyncio.run(probe_last_edited(request, BASE_URL, [_page_id(1)])) == {}
+
+
+def test_unchanged_urls_compares_fingerprints() -> None:
+    """
+    Test that only pages whose probed last-edited time is the recorded one are unchanged,
+    and that changed, unprobed and never fingerprinted pages are not.
+    """
+    unchanged, changed, unprobed, new, text_only = [BASE_URL + _page_id(i) for i in range(5)]
+    state = CrawlState(":memory:")
+    state.set_fingerprint(unchanged, 1000, text_fingerprint("a"))
+    state.set_fingerprint(changed, 1000, text_fingerprint("b"))
+    state.set_fingerprint(unprobed, 1000, text_fingerprint("c"))
+    state.set_fingerprint(text_only, None, text_fingerprint("d"))
+    last_edited = {_page_id(0): 1000, _page_id(1): 2000, _page_id(3): 1000, _page_id(4): 1000}
+
+    urls = [unchanged, changed, unprobed, new, text_only]
+    assert unchanged_urls(urls, last_edited, state.get_fingerprint) == [unchanged]
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
@@ -0,0 +1,86 @@
+"""Contain unit tests for the per-phase crawl instrumentation."""
+
+import asyncio
+import json
+
+from src.scraping.instrumentation import CrawlTracer, Histogram
+
+
+def test_histogram_percentiles_and_window() -> None:
+    """
+    Test nearest-rank percentiles, and that only the most recent samples are kept.
+    """
+    histogram = Histogram(size=100)
+    assert histogram.percentile(50) == 0.0
+    for value in range(1, 101):
+        histogram.add(value)
+    assert [histogram.percentile(p) for p in (0, 50, 95, 99, 100)] == [1, 50, 95, 99, 100]
+
+    for value in range(101, 151):
+        histogram.add(value)
+    assert len(histogram.samples) == 100
+    assert histogram.percentile(0) == 51
+
+
+def test_spans_of_concurrent_tasks_do_not_mix(tmp_path) -> None:
+    """
+    Test that spans of pages crawled by concurrent tasks are recorded in their own page's record,
+    that a phase entered twice for a page adds up, and that every span feeds the histograms.
+    """
+    tracer = CrawlTracer(tmp_path / "trace.jsonl")
+    tracer.open()
+
+    async def crawl(url: str, phases: list[str], num_bytes: int) -> None:
+        tracer.start_page(url)
+        for phase in phases:
+            with tracer.span(phase):
+                await asyncio.sleep(0.01)
+        tracer.add_bytes(num_bytes)
+        tracer.finish_page("ok")
+
+    async def crawl_all() -> None:
+        await asyncio.gather(crawl("a", ["goto", "settle", "settle"], 10),
+                             crawl("b", ["goto", "evaluate"], 5))
+
+    asyncio.run(crawl_all())
+    tracer.close()
+
+    with open(tmp_path / "trace.jsonl", encoding="utf-8") as f:
+        records = {record["url"]: record for record in map(json.loads, f)}
+    assert set(records["a"]["phases"]) == {"goto", "settle"}
+    assert set(records["b"]["phases"]) == {"goto", "evaluate"}
+    assert records["a"]["phases"]["settle"] >= 0.015    # two settle spans of 0.01s
+    assert (records["a"]["bytes"], records["b"]["bytes"]) == (10, 5)
+    assert len(tracer.histograms["settle"].samples) == 2
+    assert len(tracer.histograms["goto"].samples) == 2
+    assert tracer.pages == 2 and tracer.total_bytes == 15
+
+
+def test_trace_record_format(tmp_path) -> None:
+    """
+    Test that every trace line is a json record with the page's url, timestamp, phases,
+    bytes, total time and status, and that spans outside of a page are not recorded.
+    """
+    tracer = CrawlTracer(tmp_path / "trace.jsonl")
+    tracer.open()
+    with tracer.span("parse"):
+        pass
+    tracer.finish_page("ok")     # no page started: nothing is written
+    tracer.start_page("https://utat-ss.notion.site/a")
+    with tracer.span("save"):
+        pass
+    tracer.finish_page("retry")
+    tracer.close()
+
+    lines = (tmp_path / "trace.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert set(record) == {"url", "timestamp", "phases", "bytes", "total", "status"}
+    assert record["url"] == "https://utat-ss.notion.site/a"
+    assert set(record["phases"]) == {"save"} and record["status"] == "retry"
+    assert record["total"] >= record["phases"]["save"]
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
@@ -0,0 +1,78 @@
+"""Contain unit tests for the link graph recorded by the scraper."""
+
+from array import array
+
+from src.scraping.link_graph import LinkGraph
+
+ROOT = "https://utat-ss.notion.site/root"
+
+
+def _page(name: str) -> str:
+    """Return the url of the page with the given name."""
+    return f"https://utat-ss.notion.site/{name}"
+
+
+def _example_graph() -> LinkGraph:
+    """Return a graph: root -> a, b; a -> c; c -> a (a cycle); b -> c."""
+    graph = LinkGraph(":memory:")
+    graph.record_page(ROOT, [_page("a"), _page("b"), ROOT])
+    graph.record_page(_page("a"), [_page("c")])
+    graph.record_page(_page("b"), [_page("c")])
+    graph.record_page(_page("c"), [_page("a")])
+    return graph
+
+
+def test_record_depth_and_replace_links() -> None:
+    """
+    Test that pages get their depth and discovery order when first found, that self links are
+    dropped, and that crawling a page again replaces its links.
+    """
+    graph = _example_graph()
+    assert len(graph) == 4
+    assert graph.num_edges() == 5
+    assert graph.children(ROOT) == [_page("a"), _page("b")]
+    assert [graph.depth(url) for url in [ROOT, _page("a"), _page("c")]] == [0, 1, 2]
+
+    graph.record_page(ROOT, [_page("b"), _page("d")])
+    assert graph.children(ROOT) == [_page("b"), _page("d")]
+    assert graph.depth(_page("d")) == 1
+    assert graph.depth(_page("missing")) is None
+
+
+def test_subtree_with_cycle() -> None:
+    """
+    Test that subtree follows links (through a cycle) up to the given number of hops.
+    """
+    graph = _example_graph()
+    assert graph.subtree(_page("a")) == [_page("a"), _page("c")]
+    assert graph.subtree(ROOT, max_depth=1) == [ROOT, _page("a"), _page("b")]
+    assert graph.subtree(ROOT) == [ROOT, _page("a"), _page("b"), _page("c")]
+    assert graph.subtree(_page("missing")) == []
+
+
+def test_csr_export_and_pagerank(tmp_path) -> None:
+    """
+    Test the CSR arrays written by export_csr, and that PageRank sums to 1
+    and ranks the most linked-to page highest.
+    """
+    graph = _example_graph()
+    graph.export_csr(tmp_path)
+
+    urls = (tmp_path / "urls.txt").read_text(encoding="utf-8").split()
+    indptr, indices = array("I"), array("I")
+    indptr.frombytes((tmp_path / "indptr.bin").read_bytes())
+    indices.frombytes((tmp_path / "indices.bin").read_bytes())
+    assert urls == [ROOT, _page("a"), _page("b"), _page("c")]
+    children = {urls[i]: [urls[j] for j in indices[indptr[i]:indptr[i + 1]]] for i in range(len(urls))}
+    assert children[_page("b")] == [_page("c")]
+    assert children[ROOT] == [_page("a"), _page("b")]
+
+    rank = graph.pagerank()
+    assert abs(sum(rank.values()) - 1) < 1e-9
+    assert max(rank, key=rank.get) in {_page("a"), _page("c")}
+    assert rank[ROOT] == min(rank.values())
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
@@ -0,0 +1,120 @@
+"""Contain unit tests for incremental, idempotent embedding with the chunk manifest."""
+
+import pytest
+
+from src.processing.manifest import EmbedManifest, chunk_id
+
+PAGE_ID = "660068a07b694305b56c483962e927c5"
+
+
+def test_chunk_id_is_deterministic() -> None:
+    """
+    Test that chunk IDs only depend on the page, the position and the content of the chunk.
+    """
+    assert chunk_id(PAGE_ID, 0, "text") == chunk_id(PAGE_ID, 0, "text")
+    assert len({chunk_id(PAGE_ID, 0, "text"), chunk_id(PAGE_ID, 1, "text"),
+                chunk_id(PAGE_ID, 0, "edited"), chunk_id("1" * 32, 0, "text")}) == 4
+
+
+def test_manifest_diff_and_persistence(tmp_path) -> None:
+    """
+    Test that the manifest tells new and stale chunk IDs apart, and survives saving and loading.
+    """
+    manifest = EmbedManifest(tmp_path / "manifest.json")
+    assert manifest.diff(PAGE_ID, ["a", "b"]) == (["a", "b"], [])
+    manifest.set_page(PAGE_ID, ["a", "b"])
+    manifest.save()
+
+    reloaded = EmbedManifest(tmp_path / "manifest.json")
+    assert reloaded.diff(PAGE_ID, ["a", "c"]) == (["c"], ["b"])
+    reloaded.clear()
+    assert not (tmp_path / "manifest.json").exists()
+    assert EmbedManifest(tmp_path / "manifest.json").pages == {}
+
+
+class _MemoryVectorStore:
+    """An in-memory stand-in for the chroma vector store, counting embedded chunks and metadata reads."""
+
+    def __init__(self) -> None:
+        self.chunks = {}
+        self.embedded = 0
+        self.reads = 0
+
+    def add_documents(self, documents: list, ids: list[str]) -> None:
+        self.embedded += len(documents)
+        self.chunks.update({i: doc for i, doc in zip(ids, documents)})
+
+    def get(self, include: list[str]) -> dict[str, list]:
+        self.reads += 1
+        return {"ids": list(self.chunks), "metadatas": [doc.metadata for doc in self.chunks.values()]}
+
+    def delete(self, ids: list[str]) -> None:
+        for i in ids:
+            self.chunks.pop(i, None)
+
+
+class _Chunk:
+    """A stored chunk, with only its metadata."""
+
+    def __init__(self, metadata: dict) -> None:
+        self.metadata = metadata
+
+
+def test_unmanaged_chunks_are_read_once(tmp_path) -> None:
+    """
+    Test that chunks outside the manifest are matched to their page by page ID or by any url variant
+    of their source, that the vector store is read once, and that chunks in the manifest are left alone.
+    """
+    store, manifest = _MemoryVectorStore(), EmbedManifest(tmp_path / "manifest.json")
+    store.add_documents([_Chunk({"source": f"https://utat-ss.notion.site/Old-Title-{PAGE_ID}"}),
+                         _Chunk({"source": f"https://utat-ss.notion.site/{PAGE_ID}?pvs=4"}),
+                         _Chunk({"page_id": "1" * 32, "source": "https://utat-ss.notion.site/x"}),
+                         _Chunk({"page_id": PAGE_ID})],
+                        ids=["legacy1", "legacy2", "other", "managed"])
+    manifest.set_page(PAGE_ID, ["managed"])
+
+    assert manifest.pop_unmanaged([], store) == [] and store.reads == 0
+    assert sorted(manifest.pop_unmanaged([PAGE_ID], store)) == ["legacy1", "legacy2"]
+    assert manifest.pop_unmanaged([PAGE_ID, "2" * 32], store) == []
+    assert manifest.pop_unmanaged(["1" * 32], store) == ["other"]
+    assert store.reads == 1
+
+
+def test_sync_embeds_only_changes(tmp_path) -> None:
+    """
+    Test that syncing twice embeds nothing the second time, that an edit only embeds the changed
+    chunk, and that deleted pages and chunks stored before the manifest existed (with random IDs
+    and only a source url, of any url variant of their page) are removed, even if their page
+    has no chunks any more, reading the vector store once.
+    """
+    embed = pytest.importorskip("src.processing.embed_with_source")
+    from langchain_core.documents import Document
+    from src.scraping.doc_store import doc_key
+
+    page1, page2 = f"https://utat-ss.notion.site/Payload-{PAGE_ID}", "https://utat-ss.notion.site/" + "1" * 32
+
+    def docs(pages: dict[str, list[str]]) -> list:
+        return [Document(page_content=text, metadata={"source": url, "page_id": doc_key(url)})
+                for url, texts in pages.items() for text in texts]
+
+    store, manifest = _MemoryVectorStore(), EmbedManifest(tmp_path / "manifest.json")
+    legacy = Document(page_content="legacy", metadata={"source": f"https://utat-ss.notion.site/Old-{PAGE_ID}"})
+    emptied = Document(page_content="legacy", metadata={"source": "https://utat-ss.notion.site/" + "2" * 32})
+    store.add_documents([legacy, emptied], ids=["random-uuid", "random-uuid-2"])
+    workspace = {page1: ["a", "b", "c"], page2: ["d"]}
+
+    assert embed.sync_vector_store(docs(workspace), manifest, store, page_ids=["2" * 32]) == (4, 2)
+    assert "random-uuid" not in store.chunks and "random-uuid-2" not in store.chunks
+    assert len(store.chunks) == 4
+    assert embed.sync_vector_store(docs(workspace), manifest, store) == (0, 0)
+
+    workspace = {page1: ["a", "B", "c"]}
+    assert embed.sync_vector_store(docs(workspace), manifest, store) == (1, 2)
+    assert sorted(doc.page_content for doc in store.chunks.values()) == ["B", "a", "c"]
+    assert store.embedded == 2 + 4 + 1
+    assert store.reads == 1
+    assert EmbedManifest(tmp_path / "manifest.json").pages == manifest.pages
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,63 @@
+"""Contain unit tests for the retry policy and the two-lane crawl frontier."""
+
+import asyncio
+
+from src.scraping.frontier import Frontier
+from src.scraping.retry import RetryPolicy, TIMEOUT
+
+URL = "https://utat-ss.notion.site/661606034b8b4598bc5a13a822d27b7c"
+
+
+def test_transient_errors_retried_until_max_attempts() -> None:
+    """
+    Test that a timeout is retried with growing, jittered, capped delays,
+    and reported as failed with its full history after max_attempts.
+    """
+    policy = RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=3.0)
+
+    first = policy.record_failure(URL, TimeoutError("Timeout 30000ms exceeded."))
+    second = policy.record_failure(URL, TimeoutError("Timeout 30000ms exceeded."))
+    assert 1.0 <= first <= 2.0
+    assert 1.5 <= second <= 3.0   # 4 seconds, capped at max_delay
+
+    assert policy.record_failure(URL, TimeoutError("Timeout 30000ms exceeded.")) is None
+    assert [attempt.kind for attempt in policy.attempts(URL)] == [TIMEOUT] * 3
+    assert policy.describe(URL).count("attempt") == 3
+
+
+def test_other_errors_not_retried() -> None:
+    """
+    Test that deterministic errors (e.g. while parsing) fail immediately.
+    """
+    policy = RetryPolicy()
+    assert policy.record_failure(URL, ValueError("bad html")) is None
+
+
+def test_frontier_prefers_main_lane_and_joins_retries() -> None:
+    """
+    Test that the retry lane is only used when the main lane is empty,
+    and that join waits for scheduled retries.
+    """
+    async def crawl() -> list[str]:
+        frontier = Frontier()
+        frontier.put_nowait("a")
+        order = [await frontier.get()]
+        frontier.put_retry("a", 0.01)
+        frontier.task_done()
+        frontier.put_nowait("b")
+
+        await asyncio.sleep(0.05)   # the retry of "a" is now ready
+        frontier.put_nowait("c")
+        for _ in range(3):
+            order.append(await frontier.get())
+            frontier.task_done()
+
+        await asyncio.wait_for(frontier.join(), timeout=1)
+        return order
+
+    assert asyncio.run(crawl()) == ["a", "b", "c", "a"]
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
@@ -0,0 +1,52 @@
+"""Contain unit tests for the bookkeeping of the recursive web scraper."""
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from src.scraping import scrape
+from src.scraping.crawl_state import CrawlState
+from src.scraping.scrape import SoupsMaker
+
+BASE_URL = "https://utat-ss.notion.site/"
+PAGE_ID = "660068a07b694305b56c483962e927c5"
+
+
+def _soupsmaker(tmp_path, monkeypatch) -> SoupsMaker:
+    """Return a SoupsMaker that keeps its crawl state in memory and its link graph in tmp_path."""
+    monkeypatch.setattr(scrape, "CrawlState", lambda checkpoint_every: CrawlState(":memory:"))
+    return SoupsMaker(starting_url=(BASE_URL + "start", BASE_URL), incremental=True,
+                      graph_path=tmp_path / "graph.sqlite3")
+
+
+def test_each_duplicate_variant_is_counted_once(tmp_path, monkeypatch) -> None:
+    """
+    Test that url variants of a known page are canonicalised, that every distinct variant
+    is counted as a prevented duplicate once, and that only hashes of the variants are kept.
+    """
+    soupsmaker = _soupsmaker(tmp_path, monkeypatch)
+    variants = [BASE_URL + f"Payload-{PAGE_ID}", BASE_URL + f"Payload-v2-{PAGE_ID}", BASE_URL + PAGE_ID]
+
+    found = soupsmaker._canonicalise_links({(url, BASE_URL) for url in variants})
+    assert found == {(BASE_URL + PAGE_ID, BASE_URL)}
+    assert soupsmaker.duplicates_prevented == 2
+
+    soupsmaker._canonicalise_links({(url, BASE_URL) for url in variants})
+    assert soupsmaker.duplicates_prevented == 2
+    assert len(soupsmaker._variants) == 3 and all(len(key) == 16 for key in soupsmaker._variants)
+
+
+def test_found_links_are_interned(tmp_path, monkeypatch) -> None:
+    """
+    Test that the same link found on two pages (parsed into new strings, e.g. in the process pool)
+    is one string object, and that every found link shares one base url string.
+    """
+    soupsmaker = _soupsmaker(tmp_path, monkeypatch)
+    first, = soupsmaker._canonicalise_links({("".join([BASE_URL, PAGE_ID]), "".join([BASE_URL]))})
+    second, = soupsmaker._canonicalise_links({("".join([BASE_URL, "Payload-", PAGE_ID]), BASE_URL[:-1] + "/")})
+    assert first == second
+    assert first[0] is second[0] and first[1] is second[1]
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,64 @@
+"""Contain unit tests for the sharded crawl mode."""
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from src.scraping import scrape
+from src.scraping.crawl_state import CrawlState
+from src.scraping.sharding import ShardCoordinator, ShardWorker
+
+BASE_URL = "https://utat-ss.notion.site/"
+
+
+class _Queue:
+    """A stand-in for a shard's task queue."""
+
+    def __init__(self) -> None:
+        self.tasks = []
+
+    def put(self, task) -> None:
+        self.tasks.append(task)
+
+
+def test_shards_log_to_their_own_files(tmp_path) -> None:
+    """
+    Test that every shard writes its trace, tab lifecycle and concurrency logs to its own file,
+    next to the configured one.
+    """
+    shards = [ShardWorker(i, None, None, resume=True, concurrency_log_path=tmp_path / "concurrency.csv")
+              for i in range(2)]
+    paths = [(shard.tracer.trace_path, shard._tab_log_path, shard._concurrency_log_path) for shard in shards]
+    assert len(set(paths[0]) | set(paths[1])) == 6
+    assert shards[0]._concurrency_log_path == tmp_path / "concurrency_shard0.csv"
+    assert shards[1]._concurrency_log_path == tmp_path / "concurrency_shard1.csv"
+
+
+def test_coordinator_enforces_page_and_depth_budgets(tmp_path, monkeypatch) -> None:
+    """
+    Test that the coordinator dispatches at most max_pages urls and no url more than max_depth
+    links away from the starting url, that the budgets are not passed on to the shards,
+    and that links left undispatched stay pending for the next run.
+    """
+    monkeypatch.setattr(scrape, "CrawlState", lambda checkpoint_every: CrawlState(":memory:"))
+    coordinator = ShardCoordinator(2, starting_url=(BASE_URL + "start", BASE_URL), incremental=True,
+                                   max_pages=3, max_depth=1, graph_path=tmp_path / "graph.sqlite3")
+    assert not {"max_pages", "max_seconds", "max_depth"} & set(coordinator._shard_kwargs)
+
+    queues = [_Queue(), _Queue()]
+    coordinator._dispatch(coordinator.state.starting_url, queues)
+    found = [BASE_URL + page for page in ("a", "b", "c", "d")]
+    coordinator._merge((0, BASE_URL + "start", found, [], None), queues)
+    dispatched = [url for queue in queues for url, _ in queue.tasks]
+    assert len(dispatched) == 3
+    child = next(url for url in dispatched if url in found)
+    assert len(coordinator.state.to_visit) == 2
+    assert set(coordinator.state.crawl_state.pending()) == coordinator.state.to_visit
+
+    coordinator._merge((0, child, [BASE_URL + "e"], [], None), queues)
+    assert (BASE_URL + "e", BASE_URL) not in coordinator.state.to_visit
+    assert BASE_URL + "e" not in coordinator.state.links
+
+
+if __name__ == '__main__':
+    pytest.main()
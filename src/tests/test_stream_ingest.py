@@ -0,0 +1,81 @@
+"""Contain unit tests for streaming crawled pages into the vector store."""
+
+import asyncio
+
+import pytest
+
+stream_ingest = pytest.importorskip("src.processing.stream_ingest")
+
+from src.processing.manifest import EmbedManifest
+from src.scraping.parsing import ParsedPage
+
+BASE_URL = "https://utat-ss.notion.site/"
+
+
+class _MemoryVectorStore:
+    """An in-memory stand-in for the chroma vector store."""
+
+    def __init__(self) -> None:
+        self.chunks = {}
+
+    def add_documents(self, documents: list, ids: list[str]) -> None:
+        self.chunks.update(zip(ids, documents))
+
+    def get(self, include: list[str]) -> dict[str, list]:
+        return {"ids": list(self.chunks), "metadatas": [doc.metadata for doc in self.chunks.values()]}
+
+    def delete(self, ids: list[str]) -> None:
+        for i in ids:
+            self.chunks.pop(i, None)
+
+
+def test_page_that_cannot_be_split_does_not_stop_the_stream(tmp_path, monkeypatch) -> None:
+    """
+    Test that a page whose splitting raises is counted as failed, that the pages after it are
+    still ingested, and that more pages than the queue holds can be put without blocking.
+    """
+    split_content = stream_ingest.split_content
+
+    def split_or_fail(collection: list[dict], chunk_size: int = 512) -> list:
+        if collection[0]["text"] == "bad":
+            raise TypeError("text is not a string")
+        return split_content(collection, chunk_size)
+
+    monkeypatch.setattr(stream_ingest, "split_content", split_or_fail)
+    store = _MemoryVectorStore()
+    ingestor = stream_ingest.StreamIngestor(max_queued_pages=2, vector_store=store,
+                                            manifest=EmbedManifest(tmp_path / "manifest.json"))
+
+    async def run() -> None:
+        ingestor.start()
+        await ingestor.put(ParsedPage(BASE_URL + "a", "bad"))
+        for i in range(5):
+            await asyncio.wait_for(ingestor.put(ParsedPage(BASE_URL + f"page{i}", f"text {i}")), 1.0)
+        await asyncio.wait_for(ingestor.close(), 5.0)
+
+    asyncio.run(run())
+    assert ingestor.pages_failed == 1
+    assert ingestor.pages_ingested == 5
+    assert len(store.chunks) == 5
+
+
+def test_close_after_the_consumer_died(tmp_path) -> None:
+    """
+    Test that closing the ingestor returns even if its consumer task has already stopped.
+    """
+    ingestor = stream_ingest.StreamIngestor(max_queued_pages=1, vector_store=_MemoryVectorStore(),
+                                            manifest=EmbedManifest(tmp_path / "manifest.json"))
+
+    async def run() -> None:
+        ingestor.start()
+        ingestor._consumer.cancel()
+        await asyncio.sleep(0)
+        await ingestor.put(ParsedPage(BASE_URL + "a", "text"))
+        await asyncio.wait_for(ingestor.close(), 1.0)
+
+    asyncio.run(run())
+    assert ingestor.pages_failed == 1
+
+
+if __name__ == '__main__':
+    pytest.main()
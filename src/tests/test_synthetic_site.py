@@ -0,0 +1,69 @@
+"""Contain unit tests for the synthetic site used by the crawl benchmark."""
+
+import json
+import random
+import urllib.request
+
+from src.benchmarks.synthetic_site import SyntheticSite, SyntheticSiteServer
+from src.scraping.urls import canonical_url
+
+
+def test_every_page_is_reachable_from_the_root() -> None:
+    """
+    Test that following the links of every chunk from the root page reaches every page.
+    """
+    site = SyntheticSite(num_pages=200, extra_links=0)
+    num_chunks = -(-site.blocks_per_page // site.chunk_size)
+    seen = {0}
+    stack = [0]
+    while stack:
+        index = stack.pop()
+        for chunk_number in range(num_chunks):
+            for block in site.chunk(index, chunk_number)["blocks"]:
+                for link in block["links"]:
+                    child = site.index_of(link["href"].split("?")[0].split("#")[0])
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+    assert seen == set(range(site.num_pages))
+
+
+def test_slug_variants_share_a_canonical_url() -> None:
+    """
+    Test that every slug variant of a page has the page's canonical url.
+    """
+    site = SyntheticSite(num_pages=10, variant_rate=1.0)
+    base = "http://127.0.0.1:8000"
+    rng = random.Random(0)
+    variants = {canonical_url(base + site.link_href(3, rng)) for _ in range(20)}
+    assert variants == {canonical_url(base + site.path(3))}
+
+
+def test_server_serves_pages_interstitials_and_chunks() -> None:
+    """
+    Test that the server serves pages, the interstitial of gated pages, and loadPageChunk.
+    """
+    site = SyntheticSite(num_pages=50, interstitial_rate=0.5)
+    gated = next(i for i in range(site.num_pages) if site.is_interstitial(i))
+    with SyntheticSiteServer(site) as server:
+        with urllib.request.urlopen(server.root_url) as response:
+            assert 'id="notion-app"' in response.read().decode()
+
+        gated_url = server.base_url + site.path(gated).lstrip("/")
+        with urllib.request.urlopen(gated_url) as response:
+            assert "proceed anyway" in response.read().decode()
+        with urllib.request.urlopen(gated_url + "?proceed=1") as response:
+            assert 'id="notion-app"' in response.read().decode()
+
+        request = urllib.request.Request(
+            server.base_url + "api/v3/loadPageChunk", method="POST",
+            data=json.dumps({"pageId": site.page_ids[0], "chunkNumber": 0}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            assert len(json.loads(response.read())["blocks"]) == site.chunk_size
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
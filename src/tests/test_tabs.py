@@ -0,0 +1,157 @@
+"""Contain unit tests for the pool of browser tabs used while crawling."""
+
+import asyncio
+from typing import Awaitable, Callable
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from src.scraping import tabs
+from src.scraping.tabs import TabPool
+
+
+class _Page:
+    """A stand-in for a Playwright page. A hung page never answers evaluate."""
+
+    def __init__(self) -> None:
+        self.hung = False
+        self.closed = False
+
+    async def evaluate(self, script: str) -> int:
+        if self.closed:
+            raise RuntimeError("Target page has been closed")
+        if self.hung:
+            await asyncio.Event().wait()
+        return 1_000_000
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _Context:
+    """A stand-in for a Playwright browser context (a persistent one: it has no browser)."""
+
+    browser = None
+
+    def __init__(self) -> None:
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self) -> _Page:
+        assert not self.closed, "tab opened in a closed context"
+        self.pages.append(_Page())
+        return self.pages[-1]
+
+    def on(self, event: str, callback) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+        for page in self.pages:
+            page.closed = True
+
+
+def _launcher(contexts: list) -> Callable[[], Awaitable[_Context]]:
+    """Return a function that opens a new context and appends it to contexts."""
+    async def launch() -> _Context:
+        contexts.append(_Context())
+        return contexts[-1]
+    return launch
+
+
+def test_context_recycle_waits_for_tabs_in_use(tmp_path, monkeypatch) -> None:
+    """
+    Test that recycling the context never closes a tab in use: the old context is closed once its
+    last tab is checked in, and with an exclusive context (a persistent profile) the new context
+    is only opened after that.
+    """
+    monkeypatch.setattr(tabs, "RSS_CHECK_EVERY", 1)
+    monkeypatch.setattr(tabs, "process_tree_rss", lambda: 1)
+
+    async def run(exclusive: bool) -> list[_Context]:
+        contexts = []
+        pool = TabPool(_launcher(contexts), 2, max_rss=0, exclusive=exclusive, log_path=tmp_path / "tabs.csv")
+        await pool.start()
+        first, second = await pool.checkout(), await pool.checkout()
+
+        recycle = asyncio.create_task(pool.checkin(first))    # over max_rss: recycle the context
+        await asyncio.sleep(0.2)
+        assert not contexts[0].closed
+        assert recycle.done() != exclusive
+        assert len(contexts) == (1 if exclusive else 2)
+
+        await pool.checkin(second)
+        await asyncio.wait_for(recycle, 1.0)
+        assert contexts[0].closed and not contexts[1].closed
+        tab = await pool.checkout()
+        assert tab.context is contexts[1]
+        return contexts
+
+    for exclusive in (False, True):
+        assert len(asyncio.run(run(exclusive))) == 2
+    assert "crashed" not in (tmp_path / "tabs.csv").read_text()
+
+
+def test_crawl_with_persistent_profile(tmp_path) -> None:
+    """
+    Test that a crawl with a persistent browser profile (recycling its context on the way)
+    crawls every page of a synthetic site.
+    """
+    pytest.importorskip("bs4")
+    from src.benchmarks.crawl_benchmark import run_benchmark
+    from src.benchmarks.synthetic_site import SyntheticSite
+
+    site = SyntheticSite(num_pages=25, api_delay=0.0)
+    results = asyncio.run(run_benchmark(site, cap=2, user_data_dir=tmp_path / "profile", recycle_rss=1,
+                                        parse_workers=0))
+    assert results["pages_crawled"] == site.num_pages
+    assert results["pages_failed"] == 0
+    assert (tmp_path / "profile").is_dir()
+
+
+def test_hung_tab_is_retired_at_checkin(tmp_path, monkeypatch) -> None:
+    """
+    Test that checking in a tab whose page never answers does not block,
+    and that the tab is retired and its slot freed.
+    """
+    monkeypatch.setattr(tabs, "EVALUATE_GRACE", 0.05)
+
+    async def run() -> None:
+        pool = TabPool(_launcher([]), 1, log_path=tmp_path / "tabs.csv")
+        await pool.start()
+        tab = await pool.checkout()
+        tab.page.hung = True
+        await asyncio.wait_for(pool.checkin(tab), 1.0)
+        assert tab.page.closed
+        assert (await pool.checkout()).tab_id != tab.tab_id
+
+    asyncio.run(run())
+    assert "unresponsive" in (tmp_path / "tabs.csv").read_text()
+
+
+def test_open_tabs_are_logged_at_close(tmp_path) -> None:
+    """
+    Test that the telemetry of the tabs still open when the pool is closed is written to the tab log.
+    """
+    async def run() -> list[dict]:
+        pool = TabPool(_launcher([]), 2, log_path=tmp_path / "tabs.csv")
+        await pool.start()
+        tabs_out = [await pool.checkout() for _ in range(2)]
+        for tab in tabs_out:
+            await pool.checkin(tab)
+        telemetry = pool.telemetry()
+        await pool.close()
+        return telemetry
+
+    telemetry = asyncio.run(run())
+    assert [(row["navigations"], row["js_heap_mb"]) for row in telemetry] == [(1, 1.0), (1, 1.0)]
+    rows = (tmp_path / "tabs.csv").read_text().splitlines()[1:]
+    assert len(rows) == 2 and all(row.endswith("crawl finished") for row in rows)
+
+
+if __name__ == '__main__':
+    pytest.main()
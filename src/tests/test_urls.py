@@ -0,0 +1,40 @@
+"""Contain unit tests for the Notion url helpers used by the scraper."""
+
+from src.scraping.urls import canonical_url, notion_page_id, shard_of
+
+PAGE_ID = "661606034b8b4598bc5a13a822d27b7c"
+VARIANTS = [
+    f"https://utat-ss.notion.site/Data-Processing-{PAGE_ID}",
+    f"https://utat-ss.notion.site/Data-Processing-Renamed-{PAGE_ID}?pvs=4",
+    f"https://utat-ss.notion.site/{PAGE_ID}#section",
+    "https://utat-ss.notion.site/66160603-4b8b-4598-bc5a-13a822d27b7c",
+]
+
+
+def test_canonical_url_collapses_variants() -> None:
+    """
+    Test that every url variant of the same Notion page has the same canonical url.
+    """
+    assert {canonical_url(url) for url in VARIANTS} == {f"https://utat-ss.notion.site/{PAGE_ID}"}
+
+
+def test_notion_page_id_ignores_hex_looking_titles() -> None:
+    """
+    Test that hex digits in a title do not get mistaken for (part of) the page ID.
+    """
+    assert notion_page_id(f"https://utat-ss.notion.site/Cafe-Bead-Deadbeef-{PAGE_ID}") == PAGE_ID
+    assert notion_page_id("https://utat-ss.notion.site/Deadbeef-Cafe") is None
+
+
+def test_shard_of_is_stable_across_variants() -> None:
+    """
+    Test that all variants of a page map to the same shard, within range.
+    """
+    shards = {shard_of(url, 7) for url in VARIANTS}
+    assert len(shards) == 1
+    assert 0 <= shards.pop() < 7
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
@@ -0,0 +1,65 @@
+"""Contain unit tests for the compact visited set used by the scraper."""
+
+import random
+
+from src.scraping.visited import BloomFilter, KeySet, VisitedUrls, EMPTY
+
+PAGE_ID = "660068a07b694305b56c483962e927c5"
+
+
+def test_key_set_matches_python_set() -> None:
+    """
+    Test that random adds and discards (with growth and collisions in a small table)
+    leave the key set with the same members as a Python set.
+    """
+    rng = random.Random(0)
+    # Keys sharing their first bytes collide, exercising probing and backward-shift deletion
+    pool = [bytes([rng.randrange(4)]) * 8 + rng.randbytes(8) for _ in range(300)] + [EMPTY]
+    keys, expected = KeySet(expected=4), set()
+    for _ in range(3000):
+        key = rng.choice(pool)
+        if rng.random() < 0.6:
+            assert keys.add(key) == (key not in expected)
+            expected.add(key)
+        else:
+            keys.discard(key)
+            expected.discard(key)
+        assert len(keys) == len(expected)
+
+    assert set(keys) == expected
+    assert all((key in keys) == (key in expected) for key in pool)
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    """
+    Test that every added key is found, and that few unseen keys are, at capacity.
+    """
+    rng = random.Random(1)
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    added = [rng.randbytes(16) for _ in range(2000)]
+    for key in added:
+        bloom.add(key)
+
+    assert all(key in bloom for key in added)
+    assert sum(rng.randbytes(16) in bloom for _ in range(2000)) < 100
+
+
+def test_visited_urls_variants_are_one_page() -> None:
+    """
+    Test that url variants of the same Notion page are the same member, with or without
+    a Bloom filter, and that discarding a page removes every variant.
+    """
+    for visited in [VisitedUrls(), VisitedUrls(bloom_capacity=100)]:
+        visited.add(f"https://utat-ss.notion.site/UTAT-Space-Systems-{PAGE_ID}")
+        assert f"https://utat-ss.notion.site/Renamed-{PAGE_ID}" in visited
+        assert "https://utat-ss.notion.site/Other-" + "1" * 32 not in visited
+        assert len(visited) == 1
+
+        visited.discard(f"https://utat-ss.notion.site/{PAGE_ID}")
+        assert f"https://utat-ss.notion.site/UTAT-Space-Systems-{PAGE_ID}" not in visited
+        assert len(visited) == 0
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main()
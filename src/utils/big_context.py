@@ -1,25 +1,44 @@
-from src.scraping.scrape import scrape_single_page
+from src.scraping.scrape import scrape_pages
+from src.utils.files import atomic_write_text
+import asyncio
 import json
 import os
 
 from src.file_config import *
 
 
-def get_big_context() -> None:
-    """Scrape big-picture context from the URLs in key_urls.json
-    and write to another json file."""
-    
-    context = {}
+async def get_big_context_async(max_concurrency: int = 8) -> None:
+    """Scrape big-picture context from the URLs in key_urls.json concurrently
+    (in one shared browser) and atomically write it to another json file.
+    If a URL cannot be scraped, its previous context (if any) is kept.
+    """
     with open(KEY_URLS_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        if data == {}:
-            print("Warning: no key urls are specified. Big-picture context will be empty.")
-        for key in data:
-            url = data[key]
-            context[key] = scrape_single_page(url)
+        data = json.loads(f.read() or "{}")
+    if data == {}:
+        print("Warning: no key urls are specified. Big-picture context will be empty.")
+
+    previous = {}
+    if os.path.exists(BIG_CONTEXT_PATH):
+        with open(BIG_CONTEXT_PATH, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    keys = list(data)
+    texts = await scrape_pages([data[key] for key in keys], max_concurrency=max_concurrency)
 
-    with open(BIG_CONTEXT_PATH, "w") as f:
-        json.dump(context, f, indent=4)
+    context = {}
+    for key, text in zip(keys, texts):
+        if isinstance(text, BaseException):
+            print(f"Warning: could not scrape {data[key]} ({text}), keeping its previous context.")
+            text = previous.get(key, "")
+        context[key] = text
+
+    atomic_write_text(BIG_CONTEXT_PATH, json.dumps(context, indent=4))
+
+
+def get_big_context() -> None:
+    """Scrape big-picture context from the URLs in key_urls.json
+    and write to another json file (see `get_big_context_async`)."""
+    asyncio.run(get_big_context_async())
 
 
 def read_big_context() -> str:
@@ -35,4 +54,4 @@ def read_big_context() -> str:
         return context
 
 if __name__ == '__main__':
-    get_big_context()
\ No newline at end of file
+    get_big_context()
@@ -0,0 +1,27 @@
+"""Helpers for writing files safely."""
+
+import os
+import tempfile
+from pathlib import Path
+
+# The process umask (read once: it can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_text(path: str | Path, content: str) -> None:
+    """Write content to the file at path atomically: the content is written to a temporary file
+    in the same directory, which then replaces path. Readers never see a partially written file,
+    and concurrent writers never interleave.
+    The file gets the permissions a plain open() would give it (0o666 minus the umask).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".part")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)   # mkstemp creates owner-only files
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
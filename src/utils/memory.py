@@ -0,0 +1,75 @@
+"""Helpers for measuring memory usage of the current process and its child processes
+(e.g. the Playwright driver and the browser processes it launches)."""
+
+import os
+import resource
+import sys
+from typing import Optional
+
+
+def process_tree_rss(pid: Optional[int] = None) -> int:
+    """Return the total resident set size (in bytes) of the process with the given pid
+    (default: the current process) and all of its descendants.
+    Uses psutil if it is installed, otherwise /proc (Linux). On other platforms without psutil,
+    only the peak RSS of the current process is available, which is returned instead.
+    """
+    pid = os.getpid() if pid is None else pid
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return 0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    if os.path.isdir("/proc"):
+        return sum(_proc_rss(p) for p in _proc_descendants(pid) | {pid})
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024   # bytes on macOS, KB elsewhere
+
+
+def _proc_descendants(pid: int) -> set[int]:
+    """Return the pids of all descendants of the given pid, read from /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, so parse the fields after its closing parenthesis
+        ppid = int(stat[stat.rindex(b")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    descendants = set()
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            if child not in descendants:
+                descendants.add(child)
+                stack.append(child)
+    return descendants
+
+
+def _proc_rss(pid: int) -> int:
+    """Return the resident set size (in bytes) of the given pid, read from /proc, or 0 if it is gone."""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")